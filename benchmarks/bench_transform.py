@@ -0,0 +1,252 @@
+"""
+Offline micro-benchmarks for the parse -> transform -> serialize path of the tools.
+
+Recorded PA-API payloads (benchmarks/fixtures/*.json) are loaded into the
+amazon_paapi SDK models and every stage the search/get tools run per item is
+timed: SDK deserialization, extract_categories, item_to_pretty_response,
+extract_items, to_dict() and the JSON encoding FastMCP applies to tool output.
+
+No network access or credentials are needed. Results can be saved and
+compared with a previous run to spot regressions before they ship:
+
+    python benchmarks/bench_transform.py --save bench_before.json
+    # ... change code ...
+    python benchmarks/bench_transform.py --compare bench_before.json
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+import pydantic_core
+from amazon_paapi.sdk.api_client import ApiClient
+from libs.amazon.extractor import extract_items
+from tools.amazon.tool_amazon_search_items import extract_categories, item_to_pretty_response
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_SIZES = [10, 100, 1000]
+DEFAULT_ROUNDS = 15
+
+# Default slowdown percentage flagged as a regression by --compare
+DEFAULT_REGRESSION_THRESHOLD = 10.0
+
+# Response type of each fixture, by its top level key
+_RESPONSE_TYPES = {
+    'SearchResult': 'SearchItemsResponse',
+    'ItemsResult': 'GetItemsResponse',
+}
+
+
+class _RecordedResponse:
+    """Minimal stand-in for the urllib3 response the SDK deserializes."""
+
+    def __init__(self, data: str):
+        self.data = data
+
+
+def _api_client() -> ApiClient:
+    # Credentials are only used to sign requests, which never happens here
+    return ApiClient("benchmark", "benchmark", "webservices.amazon.es", "eu-west-1")
+
+
+def load_fixture(name: str, size: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Load a recorded payload and resize it to `size` items.
+
+    Items are repeated with a distinct ASIN suffix when the payload has fewer
+    items than requested.
+
+    Returns:
+        (response_type, payload): The SDK response type and the wire payload.
+    """
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding="utf-8") as fixture_file:
+        payload = json.load(fixture_file)
+    result_key = next(key for key in _RESPONSE_TYPES if key in payload)
+    recorded = payload[result_key]['Items']
+    items = []
+    for index in range(size):
+        item = json.loads(json.dumps(recorded[index % len(recorded)]))
+        if index >= len(recorded):
+            item['ASIN'] = f"{item['ASIN'][:-3]}{index:03d}"[-10:]
+        items.append(item)
+    payload[result_key]['Items'] = items
+    return _RESPONSE_TYPES[result_key], payload
+
+
+def _result_items(response: Any) -> List[Any]:
+    result = getattr(response, 'search_result', None) or getattr(response, 'items_result', None)
+    return result.items if result and result.items else []
+
+
+def _time(function: Callable[[], Any], rounds: int) -> List[float]:
+    timings = []
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _allocations(function: Callable[[], Any]) -> Tuple[int, int]:
+    """Return (memory blocks kept alive by the result, peak traced bytes) of one call."""
+    gc.collect()
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    result = function()
+    blocks = sys.getallocatedblocks() - blocks_before
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return max(blocks, 0), peak
+
+
+def run_benchmarks(fixtures: List[str], sizes: List[int], rounds: int) -> List[Dict[str, Any]]:
+    """
+    Time every stage for every fixture and size.
+
+    Returns:
+        List[Dict]: One result per (fixture, size, stage).
+    """
+    api_client = _api_client()
+    results = []
+    for fixture in fixtures:
+        for size in sizes:
+            response_type, payload = load_fixture(fixture, size)
+            raw = _RecordedResponse(json.dumps(payload))
+            items = _result_items(api_client.deserialize(raw, response_type))
+            records = extract_items(items)
+            dicts = [record.to_dict() for record in records]
+
+            stages: Dict[str, Callable[[], Any]] = {
+                'deserialize': lambda: api_client.deserialize(raw, response_type),
+                'extract_categories': lambda: [
+                    extract_categories(item.browse_node_info) for item in items
+                ],
+                'item_to_pretty_response': lambda: [item_to_pretty_response(item) for item in items],
+                'extract_items': lambda: extract_items(items),
+                'to_dict': lambda: [record.to_dict() for record in records],
+                # FastMCP encodes each element of a list result as its own text content
+                'json_encode': lambda: [
+                    pydantic_core.to_json(item, fallback=str, indent=2) for item in dicts
+                ],
+            }
+            for stage, function in stages.items():
+                timings = _time(function, rounds)
+                blocks, peak = _allocations(function)
+                best = min(timings)
+                results.append({
+                    'fixture': fixture,
+                    'size': size,
+                    'stage': stage,
+                    'best_seconds': best,
+                    'median_seconds': statistics.median(timings),
+                    'items_per_second': size / best if best > 0 else 0.0,
+                    'blocks_per_item': blocks / size,
+                    'peak_bytes_per_item': peak / size,
+                })
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _result_key(result: Dict[str, Any]) -> Tuple[str, int, str]:
+    return result['fixture'], result['size'], result['stage']
+
+
+def print_results(
+    results: List[Dict[str, Any]],
+    baseline: Optional[Dict[str, Any]] = None,
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD
+) -> int:
+    """Print the results table (with the change against `baseline`) and return the regressions count."""
+    baseline_by_key = {
+        _result_key(result): result for result in (baseline or {}).get('results', [])
+    }
+    header = f"{'fixture':<26} {'size':>6} {'stage':<24} {'items/s':>12} {'blocks/item':>12} {'peak B/item':>12}"
+    if baseline_by_key:
+        header += f" {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+
+    regressions = 0
+    for result in results:
+        line = (
+            f"{result['fixture']:<26} {result['size']:>6} {result['stage']:<24} "
+            f"{result['items_per_second']:>12,.0f} {result['blocks_per_item']:>12.1f} "
+            f"{result['peak_bytes_per_item']:>12,.0f}"
+        )
+        previous = baseline_by_key.get(_result_key(result))
+        if previous and previous['items_per_second'] > 0:
+            change = (result['items_per_second'] / previous['items_per_second'] - 1) * 100
+            line += f" {change:>+8.1f}%"
+            if change < -threshold:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+    return regressions
+
+
+def main() -> int:
+    available = sorted(name[:-5] for name in os.listdir(FIXTURES_DIR) if name.endswith(".json"))
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the item transform path.")
+    parser.add_argument("--fixtures", nargs="+", choices=available, default=available,
+                        help="Fixtures to run (default: all).")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES,
+                        help="Number of items per payload.")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS,
+                        help="Timed rounds per stage (the best one is reported).")
+    parser.add_argument("--save", metavar="PATH", help="Write the results as JSON.")
+    parser.add_argument("--compare", metavar="PATH", help="Compare with results saved by --save.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="Slowdown percentage reported as a regression (default: %(default)s).")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Baseline: commit {baseline.get('commit')} ({baseline.get('python')})")
+
+    results = run_benchmarks(args.fixtures, args.sizes, max(1, args.rounds))
+    regressions = print_results(results, baseline, args.threshold)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as output_file:
+            json.dump({
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'rounds': args.rounds,
+                'results': results,
+            }, output_file, indent=2)
+        print(f"Results saved to {args.save}")
+
+    if regressions:
+        print(f"{regressions} stage(s) are more than {args.threshold:.0f}% slower than the baseline.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""
+Local stand-in for the Amazon PA-API, used for load tests without spending quota.
+
+Serves SearchItems, GetItems and GetBrowseNodes with realistic bodies built from the recorded
+fixtures in benchmarks/fixtures, with configurable latency, throttling
+(HTTP 429 TooManyRequests), server errors and result counts. Point the MCP
+server at it with:
+
+    AMAZON_API_HOST=http://127.0.0.1:8750
+
+Request counters are available at GET /stats (reset with POST /stats/reset).
+
+    python benchmarks/fake_paapi_server.py --port 8750 --latency-ms 300 --throttle-rate 0.05
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Type
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+DEFAULT_PORT = 8750
+DEFAULT_LATENCY_MS = 250.0
+DEFAULT_JITTER_MS = 100.0
+DEFAULT_TOTAL_RESULTS = 100
+
+_ASIN_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ0123456789"
+
+_THROTTLED_BODY = json.dumps({
+    "__type": "com.amazon.paapi5#TooManyRequestsException",
+    "Errors": [{
+        "Code": "TooManyRequests",
+        "Message": "The request was denied due to request throttling.",
+    }],
+}).encode()
+
+_SERVER_ERROR_BODY = json.dumps({
+    "__type": "com.amazon.paapi5#InternalFailure",
+    "Errors": [{
+        "Code": "InternalFailure",
+        "Message": "The request processing has failed because of an unknown error.",
+    }],
+}).encode()
+
+
+def _load_templates() -> List[Dict[str, Any]]:
+    """Items of the recorded full-resource and discovery fixtures."""
+    templates = []
+    for name in ("search_items_discovery", "get_items_full"):
+        with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding="utf-8") as fixture_file:
+            payload = json.load(fixture_file)
+        result = payload.get('SearchResult') or payload.get('ItemsResult')
+        templates.extend(result['Items'])
+    return templates
+
+
+def _browse_node_tree(templates: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Browse nodes of the fixture items by id, with their ancestor chain and children."""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for item in templates:
+        for browse_node in (item.get('BrowseNodeInfo') or {}).get('BrowseNodes') or []:
+            node, child_id = browse_node, None
+            while node is not None:
+                entry = nodes.setdefault(node['Id'], {
+                    'Id': node['Id'],
+                    'ContextFreeName': node.get('ContextFreeName'),
+                    'DisplayName': node.get('DisplayName'),
+                    'Ancestor': node.get('Ancestor'),
+                    'Children': {},
+                })
+                if child_id is not None:
+                    entry['Children'][child_id] = nodes[child_id]
+                child_id, node = node['Id'], node.get('Ancestor')
+    return nodes
+
+
+def _asin_for(*parts: Any) -> str:
+    """Deterministic ASIN for a (query, page, position), so repeated queries return the same items."""
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).digest()
+    return "B0" + "".join(_ASIN_ALPHABET[byte % len(_ASIN_ALPHABET)] for byte in digest[:8])
+
+
+class FakePAAPIConfig:
+    """
+    Behaviour of the fake PA-API.
+
+    Args:
+        latency_ms (float): Mean response latency in milliseconds.
+        jitter_ms (float): Maximum random deviation of the latency in milliseconds.
+        throttle_rate (float): Probability (0-1) of answering 429 TooManyRequests.
+        error_rate (float): Probability (0-1) of answering 500 InternalFailure.
+        total_results (int): TotalResultCount of every search (limits the pages served).
+        seed (int, optional): Seed of the random generator, for repeatable runs.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = DEFAULT_LATENCY_MS,
+        jitter_ms: float = DEFAULT_JITTER_MS,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        total_results: int = DEFAULT_TOTAL_RESULTS,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.total_results = total_results
+        self.random = random.Random(seed)
+
+
+class FakePAAPIServer:
+    """
+    Threaded HTTP server answering PA-API SearchItems and GetItems requests.
+
+    Can run in a background thread of the caller (start/stop) or as a script.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on (0 picks a free port).
+        config (FakePAAPIConfig): Latency, throttling and result settings.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, config: Optional[FakePAAPIConfig] = None):
+        self.config = config or FakePAAPIConfig()
+        self.templates = _load_templates()
+        self.browse_nodes = _browse_node_tree(self.templates)
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self.reset_stats()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # ------------------------------------------------------------------ #
+    # Stats
+    # ------------------------------------------------------------------ #
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats = {'requests': 0, 'searchitems': 0, 'getitems': 0, 'getbrowsenodes': 0, 'throttled': 0, 'errors': 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    # ------------------------------------------------------------------ #
+    # Responses
+    # ------------------------------------------------------------------ #
+
+    def _item(self, asin: str, resources: List[str]) -> Dict[str, Any]:
+        template = self.templates[int(hashlib.sha1(asin.encode()).hexdigest(), 16) % len(self.templates)]
+        item = copy.deepcopy(template)
+        item['ASIN'] = asin
+        item['DetailPageURL'] = f"https://www.amazon.es/dp/{asin}?tag=fake-21&linkCode=ogi&th=1&psc=1"
+        # Price-only requests (no ItemInfo resources) get the offers only
+        if resources and not any(resource.startswith("ItemInfo.") for resource in resources):
+            item = {key: item[key] for key in ('ASIN', 'DetailPageURL', 'Offers') if key in item}
+        return item
+
+    def search_items(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        item_count = int(request.get('ItemCount') or 10)
+        item_page = int(request.get('ItemPage') or 1)
+        first = (item_page - 1) * item_count
+        count = max(0, min(item_count, self.config.total_results - first))
+        if count == 0:
+            return {"Errors": [{"Code": "NoResults", "Message": "No results found for your request."}]}
+        query = [request.get(key) for key in ('Keywords', 'SearchIndex', 'BrowseNodeId', 'MinPrice', 'MaxPrice', 'SortBy')]
+        resources = request.get('Resources') or []
+        return {
+            "SearchResult": {
+                "Items": [self._item(_asin_for(query, first + position), resources) for position in range(count)],
+                "SearchURL": "https://www.amazon.es/s?k=" + str(request.get('Keywords', '')).replace(' ', '+'),
+                "TotalResultCount": self.config.total_results,
+            }
+        }
+
+    def get_items(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        resources = request.get('Resources') or []
+        return {"ItemsResult": {"Items": [self._item(asin, resources) for asin in request.get('ItemIds') or []]}}
+
+    def get_browse_nodes(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        found = []
+        for node_id in request.get('BrowseNodeIds') or []:
+            node = self.browse_nodes.get(node_id)
+            if node is None:
+                continue
+            found.append({
+                'Id': node['Id'],
+                'ContextFreeName': node['ContextFreeName'],
+                'DisplayName': node['DisplayName'],
+                'IsRoot': node['Ancestor'] is None,
+                'Ancestor': node['Ancestor'],
+                'Children': [
+                    {key: child[key] for key in ('Id', 'ContextFreeName', 'DisplayName')}
+                    for child in node['Children'].values()
+                ],
+            })
+        if not found:
+            return {"Errors": [{"Code": "NoResults", "Message": "No results found for your request."}]}
+        return {"BrowseNodesResult": {"BrowseNodes": found}}
+
+    def _handler_class(self) -> Type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # Keep the load test output clean
+
+            def _send(self, status: int, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                if self.path == "/stats":
+                    self._send(200, json.dumps(server.stats()).encode())
+                else:
+                    self._send(404, b"{}")
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path == "/stats/reset":
+                    server.reset_stats()
+                    self._send(200, b"{}")
+                    return
+
+                operation = self.path.rstrip("/").rsplit("/", 1)[-1].lower()
+                if operation not in ("searchitems", "getitems", "getbrowsenodes"):
+                    self._send(404, b"{}")
+                    return
+                server._count('requests')
+                server._count(operation)
+
+                config = server.config
+                latency = config.latency_ms + config.random.uniform(-config.jitter_ms, config.jitter_ms)
+                time.sleep(max(latency, 0.0) / 1000)
+
+                roll = config.random.random()
+                if roll < config.throttle_rate:
+                    server._count('throttled')
+                    self._send(429, _THROTTLED_BODY)
+                    return
+                if roll < config.throttle_rate + config.error_rate:
+                    server._count('errors')
+                    self._send(500, _SERVER_ERROR_BODY)
+                    return
+
+                request = json.loads(body or b"{}")
+                if operation == "searchitems":
+                    response = server.search_items(request)
+                elif operation == "getbrowsenodes":
+                    response = server.get_browse_nodes(request)
+                else:
+                    response = server.get_items(request)
+                self._send(200, json.dumps(response, ensure_ascii=False).encode("utf-8"))
+
+        return Handler
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+
+    def start(self) -> "FakePAAPIServer":
+        """Serve from a daemon thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-paapi", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local fake Amazon PA-API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_JITTER_MS)
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Probability of answering 429 TooManyRequests.")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Probability of answering 500 InternalFailure.")
+    parser.add_argument("--total-results", type=int, default=DEFAULT_TOTAL_RESULTS,
+                        help="TotalResultCount of every search.")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakePAAPIServer(args.host, args.port, FakePAAPIConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        total_results=args.total_results,
+        seed=args.seed
+    ))
+    print(f"Fake PA-API listening on {server.url} (set AMAZON_API_HOST={server.url})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
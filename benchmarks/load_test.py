@@ -0,0 +1,290 @@
+"""
+End-to-end load generator for the MCP server against a local fake PA-API.
+
+Spawns N concurrent MCP clients, each one with its own server.py process over
+stdio (as Claude Desktop does), or all of them connected to one shared
+server.py process over streamable HTTP (--transport streamable-http), points
+the server(s) at the fake PA-API (benchmarks/fake_paapi_server.py) and calls
+a tool repeatedly. Reports p50, p95 and p99 tool latency, throughput and
+upstream PA-API calls per tool call.
+
+    python benchmarks/load_test.py --clients 8 --calls 20 --latency-ms 300
+    python benchmarks/load_test.py --clients 8 --calls 20 --transport streamable-http
+    python benchmarks/load_test.py --tool tool_amazon_get_items \\
+        --arguments '{"asins": ["B0{client:04d}{call:04d}"]}'
+
+String values of --arguments are formatted with {client} and {call}, so each
+call can use different keywords and miss the caches. Server processes start
+before the clock does; only tool calls are measured.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+import urllib.request
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_paapi_server import (
+    DEFAULT_JITTER_MS,
+    DEFAULT_LATENCY_MS,
+    FakePAAPIConfig,
+    FakePAAPIServer,
+)
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SERVER_SCRIPT = os.path.join(project_root, "server.py")
+
+DEFAULT_TOOL = "tool_amazon_search_discovery"
+DEFAULT_ARGUMENTS = {"keywords": "toalla playa {client} {call}", "item_count": 10}
+
+
+def _format_arguments(template: Any, client: int, call: int) -> Any:
+    if isinstance(template, str):
+        return template.format(client=client, call=call)
+    if isinstance(template, list):
+        return [_format_arguments(value, client, call) for value in template]
+    if isinstance(template, dict):
+        return {key: _format_arguments(value, client, call) for key, value in template.items()}
+    return template
+
+
+def _upstream_stats(upstream_url: str) -> Dict[str, int]:
+    with urllib.request.urlopen(f"{upstream_url}/stats", timeout=10) as response:
+        return json.load(response)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(percent / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _start_http_server(server_env: Dict[str, str], timeout: float = 30.0) -> Tuple[subprocess.Popen, str]:
+    """Start one shared server.py over streamable HTTP; return the process and its MCP URL."""
+    port = _free_port()
+    env = {**server_env, 'MCP_TRANSPORT': 'streamable-http', 'FASTMCP_HOST': '127.0.0.1', 'FASTMCP_PORT': str(port)}
+    process = subprocess.Popen(
+        [sys.executable, SERVER_SCRIPT], env=env, cwd=project_root, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server.py exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process, f"http://127.0.0.1:{port}/mcp"
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("server.py did not start listening in time")
+
+
+@asynccontextmanager
+async def _session(server_env: Dict[str, str], server_url: Optional[str]) -> AsyncIterator[ClientSession]:
+    """MCP session to the shared HTTP server, or to a server.py process of its own over stdio."""
+    if server_url:
+        async with streamablehttp_client(server_url) as (read_stream, write_stream, _):
+            async with ClientSession(read_stream, write_stream) as session:
+                yield session
+        return
+    parameters = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT], env=server_env, cwd=project_root)
+    with open(os.devnull, "w") as server_stderr:
+        async with stdio_client(parameters, errlog=server_stderr) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                yield session
+
+
+async def _run_client(
+    client: int,
+    calls: int,
+    tool: str,
+    arguments: Dict[str, Any],
+    server_env: Dict[str, str],
+    server_url: Optional[str],
+    ready: asyncio.Barrier,
+    start: asyncio.Event
+) -> List[Tuple[float, bool]]:
+    """Run one MCP client; return (latency seconds, failed) per tool call."""
+    timings: List[Tuple[float, bool]] = []
+    async with _session(server_env, server_url) as session:
+        await session.initialize()
+        await ready.wait()
+        await start.wait()
+        for call in range(calls):
+            started_at = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, _format_arguments(arguments, client, call))
+                failed = bool(result.isError)
+            except Exception:
+                failed = True
+            timings.append((time.perf_counter() - started_at, failed))
+    return timings
+
+
+async def run_load_test(
+    clients: int,
+    calls: int,
+    tool: str,
+    arguments: Dict[str, Any],
+    upstream_url: str,
+    extra_env: Optional[Dict[str, str]] = None,
+    transport: str = "stdio"
+) -> Dict[str, Any]:
+    """
+    Run the load test and return its report.
+
+    Args:
+        clients (int): Concurrent MCP clients (one server process each).
+        calls (int): Tool calls per client, made one after the other.
+        tool (str): Tool to call.
+        arguments (Dict): Tool arguments template.
+        upstream_url (str): URL of the fake PA-API.
+        extra_env (Dict[str, str], optional): Extra environment of the server processes.
+        transport (str): "stdio" (one server process per client) or "streamable-http" (one shared process).
+
+    Returns:
+        Dict: Latency percentiles (ms), throughput and upstream call counts.
+    """
+    server_env = {
+        **os.environ,
+        'AMAZON_API_KEY': 'load-test',
+        'AMAZON_SECRET_KEY': 'load-test',
+        'AMAZON_ASSOCIATE_TAG': 'loadtest-21',
+        'AMAZON_API_HOST': upstream_url,
+        # Every call should reach the (fake) upstream unless asked otherwise
+        'AMAZON_ITEM_STORE_PATH': 'off',
+        **(extra_env or {}),
+    }
+    http_server, server_url = None, None
+    if transport == "streamable-http":
+        http_server, server_url = _start_http_server(server_env)
+    try:
+        ready = asyncio.Barrier(clients + 1)
+        start = asyncio.Event()
+        tasks = [
+            asyncio.create_task(_run_client(client, calls, tool, arguments, server_env, server_url, ready, start))
+            for client in range(clients)
+        ]
+        await ready.wait()
+
+        upstream_before = _upstream_stats(upstream_url)
+        started_at = time.perf_counter()
+        start.set()
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started_at
+        upstream_after = _upstream_stats(upstream_url)
+    finally:
+        if http_server is not None:
+            http_server.terminate()
+            http_server.wait(timeout=60)
+
+    timings = [timing for client_timings in results for timing in client_timings]
+    latencies = [latency * 1000 for latency, _ in timings]
+    total_calls = len(timings)
+    upstream = {key: upstream_after.get(key, 0) - upstream_before.get(key, 0) for key in upstream_after}
+    return {
+        'tool': tool,
+        'transport': transport,
+        'clients': clients,
+        'calls': total_calls,
+        'failed_calls': sum(1 for _, failed in timings if failed),
+        'elapsed_seconds': elapsed,
+        'throughput_calls_per_second': total_calls / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'mean': statistics.fmean(latencies) if latencies else 0.0,
+            'max': max(latencies, default=0.0),
+        },
+        'upstream': upstream,
+        'upstream_calls_per_tool_call': upstream.get('requests', 0) / total_calls if total_calls else 0.0,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report['latency_ms']
+    upstream = report['upstream']
+    print(f"Tool:              {report['tool']} ({report['transport']})")
+    print(f"Clients x calls:   {report['clients']} x {report['calls'] // max(report['clients'], 1)}"
+          f" ({report['failed_calls']} failed)")
+    print(f"Elapsed:           {report['elapsed_seconds']:.2f} s")
+    print(f"Throughput:        {report['throughput_calls_per_second']:.2f} calls/s")
+    print(f"Latency (ms):      p50 {latency['p50']:.0f} | p95 {latency['p95']:.0f} | "
+          f"p99 {latency['p99']:.0f} | mean {latency['mean']:.0f} | max {latency['max']:.0f}")
+    print(f"Upstream calls:    {upstream.get('requests', 0)} "
+          f"({report['upstream_calls_per_tool_call']:.2f} per tool call, "
+          f"{upstream.get('throttled', 0)} throttled, {upstream.get('errors', 0)} errors)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the MCP server against a fake PA-API.")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent MCP clients.")
+    parser.add_argument("--calls", type=int, default=10, help="Tool calls per client.")
+    parser.add_argument("--tool", default=DEFAULT_TOOL)
+    parser.add_argument("--transport", choices=("stdio", "streamable-http"), default="stdio",
+                        help="One server process per client (stdio) or one shared server (streamable-http).")
+    parser.add_argument("--arguments", type=json.loads, default=DEFAULT_ARGUMENTS,
+                        help="Tool arguments as JSON; strings are formatted with {client} and {call}.")
+    parser.add_argument("--upstream", metavar="URL",
+                        help="Use a fake PA-API already running at URL instead of starting one.")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_JITTER_MS)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the server processes (e.g. AMAZON_API_RATE_LIMIT=10).")
+    parser.add_argument("--save", metavar="PATH", help="Write the report as JSON.")
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    fake_server = None
+    upstream_url = args.upstream
+    if upstream_url is None:
+        fake_server = FakePAAPIServer(port=0, config=FakePAAPIConfig(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            throttle_rate=args.throttle_rate,
+            error_rate=args.error_rate
+        )).start()
+        upstream_url = fake_server.url
+
+    try:
+        report = asyncio.run(run_load_test(
+            max(1, args.clients), max(1, args.calls), args.tool, args.arguments, upstream_url.rstrip("/"), extra_env,
+            args.transport
+        ))
+    finally:
+        if fake_server is not None:
+            fake_server.stop()
+
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Cold start measurement of the MCP server: time to the first list_tools answer.
+
+Claude Desktop starts a new server process (container) per session, so this is
+paid by every user. Each run spawns server.py over stdio, as the client does,
+and measures from the process spawn to the initialize and list_tools answers.
+
+    python benchmarks/startup_time.py --runs 10
+    python benchmarks/startup_time.py --runs 10 --save startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from typing import Any, Dict, List
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SERVER_SCRIPT = os.path.join(project_root, "server.py")
+
+
+async def measure_once(server_env: Dict[str, str]) -> Dict[str, float]:
+    """Spawn the server once; return the seconds to initialize and to list_tools."""
+    parameters = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT], env=server_env, cwd=project_root)
+    started_at = time.perf_counter()
+    with open(os.devnull, "w") as server_stderr:
+        async with stdio_client(parameters, errlog=server_stderr) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                initialized_at = time.perf_counter()
+                tools = await session.list_tools()
+                listed_at = time.perf_counter()
+    if not tools.tools:
+        raise RuntimeError("The server did not list any tool")
+    return {
+        'initialize_seconds': initialized_at - started_at,
+        'list_tools_seconds': listed_at - started_at,
+    }
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        'min': min(values),
+        'median': statistics.median(values),
+        'max': max(values),
+    }
+
+
+async def run(runs: int) -> Dict[str, Any]:
+    server_env = {
+        **os.environ,
+        # Credentials are not needed to list the tools; dummy ones avoid depending on a .env
+        'AMAZON_API_KEY': os.getenv('AMAZON_API_KEY', 'startup-test'),
+        'AMAZON_SECRET_KEY': os.getenv('AMAZON_SECRET_KEY', 'startup-test'),
+        'AMAZON_ASSOCIATE_TAG': os.getenv('AMAZON_ASSOCIATE_TAG', 'startup-21'),
+    }
+    # The first run also pays for writing the bytecode cache; it is reported apart
+    first = await measure_once(server_env)
+    samples = [await measure_once(server_env) for _ in range(runs)]
+    return {
+        'runs': runs,
+        'first_run': first,
+        'initialize_seconds': _summary([sample['initialize_seconds'] for sample in samples]),
+        'list_tools_seconds': _summary([sample['list_tools_seconds'] for sample in samples]),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the time to the first list_tools of server.py.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--save", metavar="PATH", help="Write the results as JSON.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(max(1, args.runs)))
+    list_tools = report['list_tools_seconds']
+    initialize = report['initialize_seconds']
+    print(f"Runs:                   {report['runs']} (+1 warm-up run: {report['first_run']['list_tools_seconds'] * 1000:.0f} ms)")
+    print(f"Time to initialize:     median {initialize['median'] * 1000:.0f} ms "
+          f"(min {initialize['min'] * 1000:.0f}, max {initialize['max'] * 1000:.0f})")
+    print(f"Time to first list_tools: median {list_tools['median'] * 1000:.0f} ms "
+          f"(min {list_tools['min'] * 1000:.0f}, max {list_tools['max'] * 1000:.0f})")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
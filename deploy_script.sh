@@ -159,7 +159,7 @@ generate_employee_config() {
       "command": "bash",
       "args": [
         "-c",
-        "docker images | grep -q ${FULL_IMAGE_NAME} || docker pull ${FULL_IMAGE_NAME} >/dev/null 2>&1; docker run -i --rm --init -e DOCKER_CONTAINER=true ${FULL_IMAGE_NAME}"
+        "docker images | grep -q ${FULL_IMAGE_NAME} || docker pull ${FULL_IMAGE_NAME} >/dev/null 2>&1; docker run -i --rm --init -e DOCKER_CONTAINER=true -v mcp_amazon_data:/app/data ${FULL_IMAGE_NAME}"
       ]
     }
   }
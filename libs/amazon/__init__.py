@@ -3,38 +3,80 @@ Amazon Product Advertising API Library
 Enhanced implementation with type safety and better error handling.
 """
 
-from .lib_amazon import (
-    # Main classes
-    AmazonPAAPI,
-    AmazonAPISingleton,  # Backward compatibility
-    
-    # Data classes
-    SearchResult,
-    
-    # Enums
-    SearchIndex,
-)
+import importlib
+from typing import Any, List
+
+# Imported eagerly: the registry has the same name as its module, and a lazy
+# export would be shadowed by the module as soon as anything imports it. It
+# only uses the standard library and the server needs it at startup anyway.
+from .metrics import metrics, MetricsRegistry
 
-__all__ = [
+# Every export is imported on first access (PEP 562), so `import libs.amazon`
+# (or one of its submodules) costs nothing at startup: the client module pulls
+# in the PA-API SDK, which the server only needs once the first tool is
+# called, and the stores, caches and indexes are only needed by the tools.
+_LAZY_EXPORTS = {
     # Main classes
-    'AmazonPAAPI',
-    'AmazonAPISingleton',
-    
+    'AmazonPAAPI': '.lib_amazon',
+    'AmazonAPISingleton': '.lib_amazon',  # Backward compatibility
+
     # Data classes
-    'AmazonAPIResponse',
-    'SearchResult', 
-    'ItemsResult',
-    'AmazonProduct',
-    'ProductItemInfo',
-    'ProductImages',
-    'ProductImage',
-    'ProductOffer',
-    'ProductPrice',
-    'APIError',
-    
+    'SearchResult': '.lib_amazon',
+    'ProductRecord': '.models',
+    'CategoryRef': '.models',
+
     # Enums
-    'SearchIndex',
-]
+    'SearchIndex': '.models',
+    'ResourceProfile': '.models',
+    'RESOURCE_PROFILES': '.models',
+
+    # Errors
+    'APIError': '.models',
+    'ThrottledError': '.models',
+    'UpstreamError': '.models',
+    'NetworkError': '.models',
+    'InvalidRequestError': '.models',
+    'AuthenticationError': '.models',
+    'CircuitOpenError': '.models',
+    'OverloadedError': '.models',
+
+    # Rate limiting, admission control and failure handling
+    'TokenBucketRateLimiter': '.rate_limiter',
+    'AdmissionScheduler': '.admission',
+    'PRIORITIES': '.admission',
+    'INTERACTIVE': '.admission',
+    'BATCH': '.admission',
+    'BACKGROUND': '.admission',
+    'RetryPolicy': '.resilience',
+    'CircuitBreaker': '.resilience',
+
+    # Caching
+    'ResponseCache': '.cache',
+    'ItemStore': '.item_store',
+
+    # Extraction
+    'extract_item': '.extractor',
+    'extract_items': '.extractor',
+
+    # Categories
+    'BrowseNodeIndex': '.browse_nodes',
+    'browse_node_index': '.browse_nodes',
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
+__all__ = list(_LAZY_EXPORTS) + ['metrics', 'MetricsRegistry']
 
 # Version info
 __version__ = '2.0.0'
@@ -0,0 +1,321 @@
+"""
+Priority-aware admission control for Amazon PA-API calls.
+
+Every upstream call of an AmazonPAAPI client needs a token of its rate
+limiter. Handing the tokens out first come, first served lets a bulk job
+that queued hundreds of calls starve a single interactive search, which then
+waits behind the whole job. The scheduler queues the calls per priority
+class instead, hands every free token to the highest class waiting, and
+sheds the calls that would wait longer than their class deadline.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import metrics
+from .models import OverloadedError
+from .rate_limiter import TokenBucketRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, highest first
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+BACKGROUND = 'background'
+PRIORITIES = (INTERACTIVE, BATCH, BACKGROUND)
+
+# Calls made outside a tool call (scripts, the CLI) keep the full priority
+_current_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "amazon_call_priority", default=INTERACTIVE
+)
+
+
+def current_priority() -> str:
+    """Priority class of the upstream calls made in the current context."""
+    return _current_priority.get()
+
+
+@contextmanager
+def priority(name: str) -> Iterator[None]:
+    """
+    Run the enclosed block (and the tasks and worker threads it starts) with
+    the given priority class.
+
+    Raises:
+        ValueError: If the class is unknown.
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"Priority must be one of: {', '.join(PRIORITIES)}.")
+    token = _current_priority.set(name)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _Waiter:
+    """A call queued for a token: woken through an Event (threads) or a future (asyncio)."""
+
+    __slots__ = ('priority', 'granted', 'event', 'future', 'loop')
+
+    def __init__(self, priority: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.priority = priority
+        self.granted = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def grant(self) -> None:
+        """Mark the token as handed over and wake the caller (lock must be held)."""
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            pass  # The loop is closed: nobody is waiting any more
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionScheduler:
+    """
+    Priority queues in front of a token bucket.
+
+    A call takes a token right away when nobody of its class or a higher one
+    is waiting; otherwise it joins the queue of its class. Every free token
+    goes to the oldest call of the highest class waiting, so interactive
+    calls overtake any batch or background backlog. Batch and background
+    calls also leave `interactive_reserve` tokens in the bucket, so an
+    interactive call arriving while a long job runs usually finds a token
+    without waiting at all. The reserve must leave room for at least one
+    token: it is clamped to `limiter.burst - 1` (with a warning), so with a
+    burst of 1 there is no reserve and interactive calls only get priority
+    in the queue.
+
+    Queues are bounded: a call is shed with OverloadedError when the queue of
+    its class is full, when its estimated wait is longer than the class
+    deadline, or when it has actually waited that long.
+
+    Args:
+        limiter (TokenBucketRateLimiter): The rate limiter the tokens come from.
+        max_queue (Dict[str, int]): Maximum calls waiting per priority class.
+        deadlines (Dict[str, float]): Maximum seconds a call of each class waits for a token.
+        interactive_reserve (float): Tokens batch and background calls leave for interactive ones.
+        name (str): Label of the metrics (the marketplace).
+    """
+
+    def __init__(
+        self,
+        limiter: TokenBucketRateLimiter,
+        max_queue: Dict[str, int],
+        deadlines: Dict[str, float],
+        interactive_reserve: float = 1.0,
+        name: str = ''
+    ):
+        self.limiter = limiter
+        self.max_queue = {level: max(0, int(max_queue[level])) for level in PRIORITIES}
+        self.deadlines = {level: float(deadlines[level]) for level in PRIORITIES}
+        # A reserve as large as the burst would never let a batch call through
+        interactive_reserve = max(float(interactive_reserve), 0.0)
+        self.interactive_reserve = min(interactive_reserve, limiter.burst - 1)
+        if self.interactive_reserve < interactive_reserve:
+            logger.warning(
+                "Interactive reserve lowered from %s to %s tokens for %s: it must be smaller than "
+                "the rate limiter burst (%d)", interactive_reserve, self.interactive_reserve,
+                name or 'the admission scheduler', limiter.burst
+            )
+        self.name = name
+        self._queues: Dict[str, Deque[_Waiter]] = {level: deque() for level in PRIORITIES}
+        self._shed: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _keep(self, priority: str) -> float:
+        return 0.0 if priority == INTERACTIVE else self.interactive_reserve
+
+    def _dispatch(self) -> Optional[float]:
+        """
+        Hand the free tokens to the waiting calls, highest class first (lock must be held).
+
+        Returns:
+            Optional[float]: Seconds until the next call can get a token (None if none is waiting).
+        """
+        while True:
+            waiter = next((queue[0] for queue in self._queues.values() if queue), None)
+            if waiter is None:
+                return None
+            keep = self._keep(waiter.priority)
+            if not self.limiter.try_acquire(keep):
+                return self.limiter.time_to_token(keep)
+            self._queues[waiter.priority].popleft()
+            waiter.grant()
+
+    def _ahead(self, priority: str) -> int:
+        """Calls that will get a token before a new call of `priority` (lock must be held)."""
+        total = 0
+        for name in PRIORITIES:
+            total += len(self._queues[name])
+            if name == priority:
+                return total
+        return total
+
+    def _shed_call(self, priority: str, reason: str, message: str, retry_after: float) -> OverloadedError:
+        """Count a shed call (lock must be held) and build its error."""
+        self._shed[(priority, reason)] = self._shed.get((priority, reason), 0) + 1
+        return OverloadedError(message, error_code='Overloaded', retry_after=round(retry_after, 3))
+
+    def _enqueue(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Tuple[Optional[_Waiter], str]:
+        """
+        Take a token right away or queue the caller.
+
+        Returns:
+            (waiter, priority): waiter is None when the token was taken right away.
+
+        Raises:
+            OverloadedError: If the call is shed on arrival.
+        """
+        priority = current_priority()
+        with self._lock:
+            ahead = self._ahead(priority)
+            if ahead == 0 and self.limiter.try_acquire(self._keep(priority)):
+                return None, priority
+            queued = len(self._queues[priority])
+            deadline = self.deadlines[priority]
+            estimate = self.limiter.time_to_token(self._keep(priority)) + ahead / self.limiter.rate
+            if queued >= self.max_queue[priority]:
+                raise self._shed_call(
+                    priority, 'queue_full',
+                    f"Too many {priority} PA-API calls waiting ({queued}); retry later", estimate
+                )
+            if estimate > deadline:
+                raise self._shed_call(
+                    priority, 'deadline',
+                    f"A {priority} PA-API call would wait {estimate:.1f} s for the rate limiter "
+                    f"(deadline {deadline:.1f} s); retry later", estimate - deadline
+                )
+            waiter = _Waiter(priority, loop)
+            self._queues[priority].append(waiter)
+            self._dispatch()
+            return waiter, priority
+
+    def _give_up(self, waiter: _Waiter) -> bool:
+        """Drop a waiter from its queue unless it got its token meanwhile (lock must be held)."""
+        if waiter.granted:
+            return False
+        try:
+            self._queues[waiter.priority].remove(waiter)
+        except ValueError:
+            pass
+        return True
+
+    def _timed_out(self, waiter: _Waiter) -> OverloadedError:
+        """Error of a call that waited its whole deadline (lock must be held)."""
+        deadline = self.deadlines[waiter.priority]
+        retry_after = self._ahead(waiter.priority) / self.limiter.rate
+        return self._shed_call(
+            waiter.priority, 'timeout',
+            f"A {waiter.priority} PA-API call waited {deadline:.1f} s for the rate limiter; retry later", retry_after
+        )
+
+    def _admitted(self, priority: str, started_at: float) -> float:
+        wait = time.monotonic() - started_at
+        metrics.observe('amazon_admission_wait_seconds', wait, priority=priority, marketplace=self.name)
+        metrics.add_queue_wait(wait)
+        return wait
+
+    def acquire(self) -> float:
+        """
+        Block the current thread until the call gets a token.
+
+        Returns:
+            float: Seconds the call waited in the queue.
+
+        Raises:
+            OverloadedError: If the call is shed.
+        """
+        started_at = time.monotonic()
+        waiter, priority = self._enqueue()
+        if waiter is None:
+            return self._admitted(priority, started_at)
+        deadline_at = started_at + self.deadlines[priority]
+        while True:
+            with self._lock:
+                next_token = self._dispatch()
+                if waiter.granted:
+                    break
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0 and self._give_up(waiter):
+                    raise self._timed_out(waiter)
+            waiter.event.wait(min(next_token if next_token is not None else remaining, max(remaining, 0.0)))
+        return self._admitted(priority, started_at)
+
+    async def acquire_async(self) -> float:
+        """Wait without blocking the event loop until the call gets a token (see `acquire`)."""
+        started_at = time.monotonic()
+        waiter, priority = self._enqueue(asyncio.get_running_loop())
+        if waiter is None:
+            return self._admitted(priority, started_at)
+        deadline_at = started_at + self.deadlines[priority]
+        try:
+            while True:
+                with self._lock:
+                    next_token = self._dispatch()
+                    if waiter.granted:
+                        break
+                    remaining = deadline_at - time.monotonic()
+                    if remaining <= 0 and self._give_up(waiter):
+                        raise self._timed_out(waiter)
+                timeout = min(next_token if next_token is not None else remaining, max(remaining, 0.0))
+                await asyncio.wait({waiter.future}, timeout=timeout)
+        except asyncio.CancelledError:
+            with self._lock:
+                self._give_up(waiter)
+            raise
+        return self._admitted(priority, started_at)
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token only if one is free and no call is waiting for it
+        (used for optional requests such as hedges).
+        """
+        priority = current_priority()
+        with self._lock:
+            if self._ahead(priority):
+                return False
+            return self.limiter.try_acquire(self._keep(priority))
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a token, every class included."""
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the queue depth per class and the shed calls per (class, reason)."""
+        with self._lock:
+            return {
+                'queue_depth': {name: len(queue) for name, queue in self._queues.items()},
+                'shed': dict(self._shed),
+            }
+
+    def collect_metrics(self) -> List[Tuple[str, Dict[str, Any], float, str]]:
+        """Queue depth and shed calls for the metrics registry."""
+        stats = self.stats()
+        samples: List[Tuple[str, Dict[str, Any], float, str]] = [
+            ('amazon_admission_queue_depth', {'priority': name, 'marketplace': self.name}, depth, 'gauge')
+            for name, depth in stats['queue_depth'].items()
+        ]
+        samples.extend(
+            ('amazon_admission_shed_total', {'priority': name, 'reason': reason, 'marketplace': self.name}, count, 'counter')
+            for (name, reason), count in stats['shed'].items()
+        )
+        return samples
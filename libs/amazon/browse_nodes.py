@@ -0,0 +1,341 @@
+"""
+Process-wide index of Amazon browse nodes (categories).
+
+Every item of a PA-API response carries its browse nodes as a linked list of
+ancestors. The index interns each node once per marketplace and caches the
+category path of every leaf node, so the extractor builds the path of a
+category the first time it is seen and then reuses the same tuple of
+CategoryRef objects for every item of every later response. The tree it
+learns (parents, children and names) can be browsed and searched without
+calling Amazon, and GetBrowseNodes answers complete it.
+
+Nothing here imports the PA-API SDK: nodes are read by attribute
+(id, context_free_name, display_name, ancestor, children, is_root).
+"""
+
+import logging
+import os
+import sys
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .metrics import metrics
+from .models import CategoryRef
+
+logger = logging.getLogger(__name__)
+
+CategoryPath = Tuple[CategoryRef, ...]
+
+_NO_PATH: CategoryPath = ()
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+def _fold(text: str) -> str:
+    """Lowercase without accents, for name search ("Electrónica" matches "electronica")."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@dataclass(slots=True)
+class BrowseNodeEntry:
+    """
+    A browse node known to the index.
+
+    `children` holds the child ids seen so far; `children_complete` is True
+    once a GetBrowseNodes answer listed all of them.
+    """
+    id: str
+    name: str
+    display_name: Optional[str] = None
+    parent_id: Optional[str] = None
+    is_root: bool = False
+    children: Set[str] = field(default_factory=set)
+    children_complete: bool = False
+
+
+class BrowseNodeIndex:
+    """
+    Thread-safe browse node tree per marketplace, with interned category paths.
+
+    Reads (cached paths, node lookups) are plain dictionary lookups; writes
+    take a lock. Once `max_nodes` nodes are indexed, new nodes are no longer
+    added (paths are still built, just not cached).
+
+    Args:
+        max_nodes (int, optional): Maximum number of nodes kept over all marketplaces
+            (default is AMAZON_BROWSE_NODE_INDEX_MAX_NODES or 100000, read on first insert).
+    """
+
+    DEFAULT_MAX_NODES = 100_000
+
+    def __init__(self, max_nodes: Optional[int] = None):
+        self.max_nodes = max_nodes
+        self._nodes: Dict[Tuple[str, str], BrowseNodeEntry] = {}
+        self._refs: Dict[Tuple[str, str], CategoryRef] = {}
+        # (marketplace, leaf id) -> category path of the items in that leaf (its ancestors, root first)
+        self._item_paths: Dict[Tuple[str, str], CategoryPath] = {}
+        self._path_hits = 0
+        self._path_misses = 0
+        self._full_logged = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    # ------------------------------------------------------------------ #
+    # Indexing
+    # ------------------------------------------------------------------ #
+
+    def _ref(self, marketplace: str, node_id: str, name: str) -> CategoryRef:
+        """Interned CategoryRef of a node (lock must be held)."""
+        key = (marketplace, node_id)
+        ref = self._refs.get(key)
+        if ref is None or ref.name != name:
+            ref = CategoryRef(name, node_id)
+            self._refs[key] = ref
+        return ref
+
+    def _add_node(
+        self,
+        marketplace: str,
+        node_id: Optional[str],
+        name: Optional[str],
+        display_name: Optional[str] = None,
+        parent_id: Optional[str] = None
+    ) -> Optional[BrowseNodeEntry]:
+        """Add or update a node and link it to its parent (lock must be held)."""
+        if not node_id:
+            return None
+        key = (marketplace, node_id)
+        entry = self._nodes.get(key)
+        if entry is None:
+            if self.max_nodes is None:
+                # Read on first use, after the server has loaded its .env
+                self.max_nodes = int(os.getenv('AMAZON_BROWSE_NODE_INDEX_MAX_NODES', self.DEFAULT_MAX_NODES))
+            if len(self._nodes) >= self.max_nodes:
+                if not self._full_logged:
+                    logger.warning("Browse node index is full (%d nodes), new categories are not cached", self.max_nodes)
+                    self._full_logged = True
+                return None
+            entry = BrowseNodeEntry(id=_intern(node_id), name=_intern(name or display_name or node_id))
+            self._nodes[key] = entry
+        if name:
+            entry.name = _intern(name)
+        if display_name:
+            entry.display_name = _intern(display_name)
+        if parent_id:
+            entry.parent_id = _intern(parent_id)
+            parent = self._nodes.get((marketplace, parent_id))
+            if parent is not None:
+                parent.children.add(entry.id)
+        return entry
+
+    def _add_chain(self, marketplace: str, node: Any) -> CategoryPath:
+        """
+        Index a node and its ancestors; return the path of its items (lock must be held).
+
+        The path is built from the ancestors of the node, root first, keeping
+        only the lowest node of each repeated name.
+        """
+        chain = []
+        ancestor = node.ancestor
+        while ancestor is not None:
+            chain.append(ancestor)
+            ancestor = ancestor.ancestor
+        # Root first, so every parent exists before its child links to it
+        parent_id = None
+        for ancestor in reversed(chain):
+            self._add_node(marketplace, ancestor.id, ancestor.context_free_name, ancestor.display_name, parent_id)
+            parent_id = ancestor.id or parent_id
+        entry = self._add_node(marketplace, node.id, node.context_free_name, node.display_name, parent_id)
+        if entry is not None and getattr(node, 'is_root', None):
+            entry.is_root = True
+
+        seen_names = set()
+        categories = []
+        for ancestor in chain:
+            name = ancestor.context_free_name
+            if name not in seen_names:       # evita duplicados
+                categories.append(self._ref(marketplace, ancestor.id, name))
+                seen_names.add(name)
+        categories.reverse()  # Root category first
+        path = tuple(categories)
+        if entry is not None:
+            self._item_paths[(marketplace, entry.id)] = path
+        return path
+
+    def item_path(self, node: Any, marketplace: Optional[str] = None) -> CategoryPath:
+        """
+        Category path of the items of a browse node (its ancestors, root first).
+
+        Args:
+            node: A BrowseNode of an item's BrowseNodeInfo.
+            marketplace (str, optional): Marketplace the node belongs to.
+
+        Returns:
+            CategoryPath: The path, shared by every item in the same node.
+        """
+        if node is None:
+            return _NO_PATH
+        marketplace = marketplace or ''
+        path = self._item_paths.get((marketplace, node.id))
+        if path is not None:
+            self._path_hits += 1  # Lock-free on the hot path: the count may miss a few concurrent hits
+            return path
+        with self._lock:
+            self._path_misses += 1
+            return self._add_chain(marketplace, node)
+
+    def add_item_nodes(self, browse_nodes: List[Any], marketplace: Optional[str] = None) -> CategoryPath:
+        """
+        Index every browse node of an item and return the path of the first one.
+
+        Args:
+            browse_nodes (list): BrowseNodeInfo.browse_nodes of an item.
+            marketplace (str, optional): Marketplace of the item.
+
+        Returns:
+            CategoryPath: Path of the first browse node (the item's categories).
+        """
+        path = self.item_path(browse_nodes[0], marketplace)
+        for node in browse_nodes[1:]:
+            if node is not None and ((marketplace or ''), node.id) not in self._item_paths:
+                self.item_path(node, marketplace)
+        return path
+
+    def add_browse_nodes(self, browse_nodes: List[Any], marketplace: Optional[str] = None) -> None:
+        """
+        Index GetBrowseNodes answers: the nodes, their ancestors and their full list of children.
+
+        Args:
+            browse_nodes (list): BrowseNodesResult.browse_nodes.
+            marketplace (str, optional): Marketplace of the request.
+        """
+        marketplace = marketplace or ''
+        with self._lock:
+            for node in browse_nodes or []:
+                if node is None or not node.id:
+                    continue
+                self._add_chain(marketplace, node)
+                entry = self._nodes.get((marketplace, node.id))
+                if entry is None:
+                    continue
+                children = node.children
+                if children is not None:
+                    for child in children:
+                        self._add_node(marketplace, child.id, child.context_free_name, child.display_name, entry.id)
+                    entry.children_complete = True
+
+    # ------------------------------------------------------------------ #
+    # Lookups
+    # ------------------------------------------------------------------ #
+
+    def get(self, node_id: str, marketplace: Optional[str] = None) -> Optional[BrowseNodeEntry]:
+        return self._nodes.get((marketplace or '', str(node_id)))
+
+    def path(self, node_id: str, marketplace: Optional[str] = None) -> CategoryPath:
+        """Full path of a known node, root first and the node itself last."""
+        marketplace = marketplace or ''
+        path = []
+        seen = set()
+        entry = self._nodes.get((marketplace, str(node_id)))
+        while entry is not None and entry.id not in seen:
+            seen.add(entry.id)
+            path.append(CategoryRef(entry.name, entry.id))
+            entry = self._nodes.get((marketplace, entry.parent_id)) if entry.parent_id else None
+        path.reverse()
+        return tuple(path)
+
+    def describe(self, node_id: str, marketplace: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Node summary for tool results.
+
+        Returns:
+            Dict: id, name, display_name, path, parent_id, is_root, children
+            (id and name) and children_complete; None if the node is unknown.
+        """
+        entry = self.get(node_id, marketplace)
+        if entry is None:
+            return None
+        children = []
+        for child_id in sorted(entry.children):
+            child = self.get(child_id, marketplace)
+            children.append({'id': child_id, 'name': child.name if child else None})
+        return {
+            'id': entry.id,
+            'name': entry.name,
+            'display_name': entry.display_name,
+            'path': [{'name': name, 'id': ref_id} for name, ref_id in self.path(entry.id, marketplace)],
+            'parent_id': entry.parent_id,
+            'is_root': entry.is_root or entry.parent_id is None,
+            'children': children,
+            'children_complete': entry.children_complete,
+        }
+
+    def roots(self, marketplace: Optional[str] = None) -> List[BrowseNodeEntry]:
+        """Known top-level nodes of a marketplace, by name."""
+        marketplace = marketplace or ''
+        with self._lock:
+            roots = [entry for (mp, _), entry in self._nodes.items() if mp == marketplace and entry.parent_id is None]
+        return sorted(roots, key=lambda entry: entry.name)
+
+    def search(self, query: str, marketplace: Optional[str] = None, limit: int = 20) -> List[BrowseNodeEntry]:
+        """
+        Known nodes whose name contains every word of `query` (case and accent insensitive).
+
+        Shallower nodes come first, so broad categories rank above their subcategories.
+        """
+        marketplace = marketplace or ''
+        words = _fold(query).split()
+        if not words:
+            return []
+        with self._lock:
+            candidates = [entry for (mp, _), entry in self._nodes.items() if mp == marketplace]
+        matches = []
+        for entry in candidates:
+            name = _fold(f"{entry.name} {entry.display_name or ''}")
+            if all(word in name for word in words):
+                matches.append(entry)
+        matches.sort(key=lambda entry: (len(self.path(entry.id, marketplace)), entry.name))
+        return matches[:max(0, limit)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._nodes.clear()
+            self._refs.clear()
+            self._item_paths.clear()
+            self._full_logged = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the index size and path cache usage."""
+        with self._lock:
+            by_marketplace: Dict[str, int] = {}
+            for marketplace, _ in self._nodes:
+                by_marketplace[marketplace] = by_marketplace.get(marketplace, 0) + 1
+            return {
+                'nodes': len(self._nodes),
+                'nodes_by_marketplace': by_marketplace,
+                'cached_paths': len(self._item_paths),
+                'path_hits': self._path_hits,
+                'path_misses': self._path_misses,
+            }
+
+    def _collect_metrics(self) -> List[Tuple[str, Dict[str, Any], float, str]]:
+        stats = self.stats()
+        samples = [
+            ('amazon_browse_node_path_lookups_total', {'result': 'hit'}, stats['path_hits'], 'counter'),
+            ('amazon_browse_node_path_lookups_total', {'result': 'miss'}, stats['path_misses'], 'counter'),
+        ]
+        for marketplace, count in stats['nodes_by_marketplace'].items():
+            samples.append(('amazon_browse_nodes_indexed', {'marketplace': marketplace or 'default'}, count, 'gauge'))
+        return samples
+
+
+# Process-wide index, shared by every client and tool
+browse_node_index = BrowseNodeIndex()
+metrics.register_collector('amazon_browse_node_index', browse_node_index._collect_metrics)
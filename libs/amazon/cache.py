@@ -0,0 +1,297 @@
+"""
+In-memory response cache for Amazon PA-API calls.
+TTL + LRU eviction with an entry/byte bound, request coalescing (single-flight)
+and stale-while-revalidate, so repeated queries do not spend PA-API quota.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+
+@dataclass
+class CacheEntry:
+    """A cached value with its storage time and estimated size in bytes."""
+    value: Any
+    stored_at: float
+    size: int
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache with single-flight loading.
+
+    - Entries younger than `ttl` are served directly.
+    - Entries between `ttl` and `ttl + stale_ttl` are served stale while a
+      single background refresh updates them (stale-while-revalidate).
+    - Concurrent misses for the same key share one loader call.
+    - The least recently used entries are evicted when `max_entries` or
+      `max_bytes` is exceeded.
+
+    Args:
+        ttl (float): Seconds an entry is considered fresh.
+        stale_ttl (float): Extra seconds an expired entry can be served while it
+            is refreshed. 0 disables stale-while-revalidate.
+        max_entries (int): Maximum number of cached entries.
+        max_bytes (int): Maximum estimated size of all cached entries.
+        executor (Executor, optional): Pool used for background refreshes of
+            blocking loaders. A daemon thread is used when not provided.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 900.0,
+        stale_ttl: float = 3600.0,
+        max_entries: int = 512,
+        max_bytes: int = 32 * 1024 * 1024,
+        executor: Optional[Executor] = None
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._executor = executor
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+        }
+
+    # ------------------------------------------------------------------ #
+    # Internal helpers (lock must be held)
+    # ------------------------------------------------------------------ #
+
+    def _lookup(self, key: Hashable, now: float) -> Tuple[Optional[CacheEntry], bool]:
+        """Return (entry, is_stale) for a usable entry or (None, False)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        age = now - entry.stored_at
+        if age <= self.ttl:
+            self._entries.move_to_end(key)
+            return entry, False
+        if age <= self.ttl + self.stale_ttl:
+            self._entries.move_to_end(key)
+            return entry, True
+        self._remove(key)
+        return None, False
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _store(self, key: Hashable, value: Any, size: int) -> None:
+        self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = CacheEntry(value=value, stored_at=time.monotonic(), size=size)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._stats['evictions'] += 1
+
+    def _begin(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return (future, is_leader) for the in-flight load of `key`."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats['coalesced'] += 1
+            return future, False
+        future = Future()
+        self._inflight[key] = future
+        return future, True
+
+    def _finish(
+        self,
+        key: Hashable,
+        future: Future,
+        value: Any = None,
+        error: Optional[BaseException] = None,
+        cacheable: bool = True,
+        size: int = 1
+    ) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None and cacheable:
+                self._store(key, value, size)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+        sizeof: Callable[[Any], int] = lambda value: 1
+    ) -> Any:
+        """
+        Return the cached value for `key` or call the blocking `loader` once.
+
+        Args:
+            key: Normalized cache key.
+            loader: Blocking function that fetches the value on a miss.
+            should_cache: Predicate deciding if a loaded value is stored.
+            sizeof: Function estimating the size in bytes of a value.
+        """
+        with self._lock:
+            entry, is_stale = self._lookup(key, time.monotonic())
+            if entry is not None:
+                if is_stale:
+                    self._stats['stale_hits'] += 1
+                    future, is_leader = self._begin(key)
+                    if is_leader:
+                        self._submit_refresh(key, future, loader, should_cache, sizeof)
+                else:
+                    self._stats['hits'] += 1
+                return entry.value
+            self._stats['misses'] += 1
+            future, is_leader = self._begin(key)
+
+        if not is_leader:
+            return future.result()
+        return self._load(key, future, loader, should_cache, sizeof)
+
+    async def get_or_load_async(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+        sizeof: Callable[[Any], int] = lambda value: 1
+    ) -> Any:
+        """Async version of `get_or_load` where `loader` returns an awaitable."""
+        with self._lock:
+            entry, is_stale = self._lookup(key, time.monotonic())
+            if entry is not None:
+                if is_stale:
+                    self._stats['stale_hits'] += 1
+                    future, is_leader = self._begin(key)
+                    if is_leader:
+                        task = asyncio.get_running_loop().create_task(
+                            self._refresh_async(key, future, loader, should_cache, sizeof)
+                        )
+                        self._refresh_tasks.add(task)
+                        task.add_done_callback(self._refresh_tasks.discard)
+                else:
+                    self._stats['hits'] += 1
+                return entry.value
+            self._stats['misses'] += 1
+            future, is_leader = self._begin(key)
+
+        if not is_leader:
+            return await asyncio.wrap_future(future)
+        return await self._load_async(key, future, loader, should_cache, sizeof)
+
+    def _load(
+        self,
+        key: Hashable,
+        future: Future,
+        loader: Callable[[], Any],
+        should_cache: Callable[[Any], bool],
+        sizeof: Callable[[Any], int]
+    ) -> Any:
+        try:
+            value = loader()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        cacheable = should_cache(value)
+        self._finish(
+            key, future, value=value, cacheable=cacheable,
+            size=sizeof(value) if cacheable else 0
+        )
+        return value
+
+    async def _load_async(
+        self,
+        key: Hashable,
+        future: Future,
+        loader: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool],
+        sizeof: Callable[[Any], int]
+    ) -> Any:
+        try:
+            value = await loader()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        cacheable = should_cache(value)
+        self._finish(
+            key, future, value=value, cacheable=cacheable,
+            size=sizeof(value) if cacheable else 0
+        )
+        return value
+
+    async def _refresh_async(
+        self,
+        key: Hashable,
+        future: Future,
+        loader: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool],
+        sizeof: Callable[[Any], int]
+    ) -> None:
+        """Refresh a stale entry from an asyncio task."""
+        try:
+            await self._load_async(key, future, loader, should_cache, sizeof)
+        except Exception:
+            pass  # The stale value keeps being served until it expires
+
+    def _submit_refresh(
+        self,
+        key: Hashable,
+        future: Future,
+        loader: Callable[[], Any],
+        should_cache: Callable[[Any], bool],
+        sizeof: Callable[[Any], int]
+    ) -> None:
+        """Refresh a stale entry in the background (lock must be held)."""
+        def refresh() -> None:
+            try:
+                self._load(key, future, loader, should_cache, sizeof)
+            except Exception:
+                pass  # The stale value keeps being served until it expires
+
+        if self._executor is not None:
+            self._executor.submit(refresh)
+        else:
+            threading.Thread(target=refresh, daemon=True).start()
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove a single entry from the cache."""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the cache counters and usage."""
+        with self._lock:
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'inflight': len(self._inflight),
+            }
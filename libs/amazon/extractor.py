@@ -0,0 +1,120 @@
+"""
+Batch extraction of PA-API items into compact ProductRecord objects.
+One pass per item over the SDK model tree, with the category paths taken from
+the process-wide browse node index, so search, bulk and feed tools convert
+thousands of items without re-walking the same attribute chains.
+"""
+
+from typing import Any, Iterable, List, Optional, Tuple
+
+from .browse_nodes import browse_node_index
+from .models import CategoryRef, ProductRecord
+
+_NO_CATEGORIES: Tuple[CategoryRef, ...] = ()
+_NO_EANS: Tuple[str, ...] = ()
+
+
+def extract_category_path(browse_node_info: Any, marketplace: Optional[str] = None) -> Tuple[CategoryRef, ...]:
+    """
+    Return the category path (root first) of the first browse node of an item.
+
+    The path is built from the ancestors of the node, skipping repeated names,
+    the first time the node is seen; later items in the same node share it.
+    Every browse node of the item is added to the browse node index.
+
+    Args:
+        browse_node_info: The BrowseNodeInfo of a PA-API item (may be None).
+        marketplace (str, optional): Marketplace of the item (browse node ids are per marketplace).
+
+    Returns:
+        Tuple[CategoryRef, ...]: The category path, empty when the item has no browse nodes.
+    """
+    if browse_node_info is None:
+        return _NO_CATEGORIES
+    browse_nodes = browse_node_info.browse_nodes
+    if not browse_nodes or browse_nodes[0] is None:
+        return _NO_CATEGORIES
+    return browse_node_index.add_item_nodes(browse_nodes, marketplace)
+
+
+def extract_item(item: Any, marketplace: Optional[str] = None) -> ProductRecord:
+    """
+    Convert a PA-API Item (SearchItems or GetItems) into a ProductRecord.
+
+    Args:
+        item: The SDK item.
+        marketplace (str, optional): Marketplace of the item, for the browse node index.
+
+    Returns:
+        ProductRecord: The compact product.
+    """
+    title = ""
+    description = ""
+    brand = None
+    eans = _NO_EANS
+    item_info = item.item_info
+    if item_info is not None:
+        title_info = item_info.title
+        if title_info is not None:
+            title = title_info.display_value or ""
+        features = item_info.features
+        if features is not None and features.display_values:
+            description = " ||| ".join(features.display_values)
+        by_line_info = item_info.by_line_info
+        if by_line_info is not None and by_line_info.brand is not None:
+            brand = by_line_info.brand.display_value or None
+        external_ids = item_info.external_ids
+        if external_ids is not None and external_ids.ea_ns is not None and external_ids.ea_ns.display_values:
+            eans = tuple(external_ids.ea_ns.display_values)
+
+    price = None
+    old_price = 0
+    discount = 0
+    offers = item.offers
+    if offers is not None and offers.listings:
+        listing = offers.listings[0]
+        listing_price = listing.price
+        if listing_price is not None:
+            price = listing_price.amount or None
+            savings = listing_price.savings
+            if savings is not None and savings.percentage and savings.percentage > 0:
+                discount = savings.percentage
+        saving_basis = listing.saving_basis
+        if saving_basis is not None and saving_basis.amount and saving_basis.amount > 0:
+            old_price = saving_basis.amount
+
+    image_url = None
+    images = item.images
+    if images is not None and images.primary is not None and images.primary.large is not None:
+        image_url = images.primary.large.url
+
+    return ProductRecord(
+        asin=item.asin or "",
+        title=title,
+        affiliate_link=item.detail_page_url or "",
+        price=price,
+        old_price=old_price,
+        image_url=image_url,
+        description=description,
+        brand=brand,
+        discount=discount,
+        categories=extract_category_path(item.browse_node_info, marketplace),
+        eans=eans
+    )
+
+
+def extract_items(items: Iterable, marketplace: Optional[str] = None) -> List[ProductRecord]:
+    """
+    Convert a batch of PA-API items (a SearchItems page or a GetItems result).
+
+    Category paths come from the browse node index and are built once per
+    browse node for the whole process.
+
+    Args:
+        items: SDK items.
+        marketplace (str, optional): Marketplace of the items.
+
+    Returns:
+        List[ProductRecord]: The records, in the same order as the items.
+    """
+    return [extract_item(item, marketplace) for item in items]
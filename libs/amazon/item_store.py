@@ -0,0 +1,360 @@
+"""
+Persistent on-disk store for Amazon PA-API items.
+SQLite database keyed by ASIN that survives container restarts, so items that
+were already fetched are not requested again while they are still fresh.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Project root (/app inside the Docker image)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_STORE_PATH = os.path.join(PROJECT_ROOT, "data", "amazon_items.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    asin TEXT PRIMARY KEY,
+    item_json TEXT NOT NULL,
+    source_query TEXT,
+    static_fetched_at REAL NOT NULL,
+    offers_fetched_at REAL NOT NULL,
+    profile_rank INTEGER NOT NULL DEFAULT 3
+);
+CREATE TABLE IF NOT EXISTS searches (
+    query_key TEXT PRIMARY KEY,
+    asins_json TEXT NOT NULL,
+    total_result_count INTEGER,
+    search_url TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+class ItemStore:
+    """
+    SQLite item store with per-field freshness rules.
+
+    Items are stored as PA-API wire JSON. Two timestamps are kept per ASIN:
+    the static data (title, EANs, brand, images, categories) is long-lived and
+    the offers (prices, availability) are short-lived. Search queries are
+    stored as the list of ASINs they returned, so a repeated search can be
+    answered from the store while every returned item is still fresh.
+
+    Each item also records the rank of the resource profile it was fetched
+    with (see RESOURCE_PROFILE_RANK), so a lookup only returns items that
+    contain at least the requested fields.
+
+    The database is opened lazily on first use and nothing is loaded into
+    memory at startup, so startup time does not depend on the store size.
+
+    Items are kept `max_age` seconds after their static data was fetched.
+    Older items and searches are pruned on a write, at most once every
+    `prune_interval` seconds (so on the first write after a start, and then
+    about once a day), and the file does not grow without bound.
+
+    Args:
+        path (str): SQLite database file path.
+        static_ttl (float): Seconds the static item data stays fresh.
+        offers_ttl (float): Seconds the offer data stays fresh.
+        search_ttl (float): Seconds a stored query -> ASINs list stays fresh.
+        max_age (float, optional): Seconds an item is kept (default is `static_ttl`; 0 keeps items forever).
+        prune_interval (float): Minimum seconds between two prunes.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_STORE_PATH,
+        static_ttl: float = 30 * 24 * 3600,
+        offers_ttl: float = 3600,
+        search_ttl: float = 24 * 3600,
+        max_age: Optional[float] = None,
+        prune_interval: float = 24 * 3600
+    ):
+        self.path = path
+        self.static_ttl = static_ttl
+        self.offers_ttl = offers_ttl
+        self.search_ttl = search_ttl
+        self.max_age = static_ttl if max_age is None else max_age
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Open the database on first use (lock must be held)."""
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._migrate(connection)
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection) -> None:
+        """Add the columns missing in stores created by older versions."""
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(items)")}
+        if 'profile_rank' not in columns:
+            # Older stores always fetched the full resource set
+            connection.execute(
+                "ALTER TABLE items ADD COLUMN profile_rank INTEGER NOT NULL DEFAULT 3"
+            )
+            connection.commit()
+
+    def _is_fresh(self, static_fetched_at: float, offers_fetched_at: float, now: float) -> bool:
+        return (now - static_fetched_at <= self.static_ttl
+                and now - offers_fetched_at <= self.offers_ttl)
+
+    # ------------------------------------------------------------------ #
+    # Items
+    # ------------------------------------------------------------------ #
+
+    def get_items(self, asins: Iterable[str], min_rank: int = 0) -> Dict[str, str]:
+        """
+        Return the wire JSON of every requested ASIN that is still fresh.
+
+        Args:
+            asins: ASINs to look up.
+            min_rank: Minimum resource profile rank the stored items must have.
+
+        Returns:
+            Dict[str, str]: ASIN -> item JSON for the fresh items only.
+        """
+        asins = list(dict.fromkeys(asins))
+        rows = []
+        now = time.time()
+        # Keep the number of SQL variables per query below the SQLite limit
+        for start in range(0, len(asins), 500):
+            chunk = asins[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows.extend(self.connection.execute(
+                    f"SELECT asin, item_json, static_fetched_at, offers_fetched_at "
+                    f"FROM items WHERE asin IN ({placeholders}) AND profile_rank >= ?",
+                    chunk + [min_rank]
+                ).fetchall())
+        return {
+            asin: item_json
+            for asin, item_json, static_fetched_at, offers_fetched_at in rows
+            if self._is_fresh(static_fetched_at, offers_fetched_at, now)
+        }
+
+    def put_items(
+        self,
+        items: List[Dict[str, Any]],
+        source_query: Optional[str] = None,
+        profile_rank: int = 3
+    ) -> None:
+        """
+        Insert or replace items given as PA-API wire dicts (with an 'ASIN' key).
+
+        Args:
+            items: Items serialized to PA-API wire format.
+            source_query: Query that returned these items.
+            profile_rank: Rank of the resource profile the items were fetched with.
+        """
+        now = time.time()
+        rows = [
+            (item['ASIN'], json.dumps(item, ensure_ascii=False), source_query, now, now, profile_rank)
+            for item in items
+            if item.get('ASIN')
+        ]
+        if not rows:
+            return
+        with self._lock:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO items "
+                    "(asin, item_json, source_query, static_fetched_at, offers_fetched_at, profile_rank) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        self._prune_if_due(now)
+
+    def update_offers(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Replace only the offers of already stored items (price-only refresh).
+
+        Items that are not in the store are ignored, since they lack the
+        static data.
+
+        Args:
+            items: Items serialized to PA-API wire format, with 'ASIN' and 'Offers'.
+
+        Returns:
+            int: Number of stored items updated.
+        """
+        offers_by_asin = {item['ASIN']: item.get('Offers') for item in items if item.get('ASIN')}
+        if not offers_by_asin:
+            return 0
+        now = time.time()
+        asins = list(offers_by_asin)
+        with self._lock:
+            with self.connection:
+                updates = []
+                for start in range(0, len(asins), 500):
+                    chunk = asins[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    for asin, item_json in self.connection.execute(
+                        f"SELECT asin, item_json FROM items WHERE asin IN ({placeholders})",
+                        chunk
+                    ):
+                        item = json.loads(item_json)
+                        if offers_by_asin[asin] is None:
+                            item.pop('Offers', None)
+                        else:
+                            item['Offers'] = offers_by_asin[asin]
+                        updates.append((json.dumps(item, ensure_ascii=False), now, asin))
+                self.connection.executemany(
+                    "UPDATE items SET item_json = ?, offers_fetched_at = ? WHERE asin = ?",
+                    updates
+                )
+        return len(updates)
+
+    def iter_items(
+        self,
+        min_rank: int = 0,
+        max_offers_age: Optional[float] = None,
+        batch_size: int = 500
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Stream every stored item, in ASIN order.
+
+        Items are read in pages of `batch_size` by ASIN (keyset paging), so
+        memory stays constant whatever the store size and the lock is only
+        held while a page is read.
+
+        Args:
+            min_rank: Minimum resource profile rank of the items.
+            max_offers_age: Only items whose offers are at most this many seconds old (None for all).
+            batch_size: Items read per query.
+
+        Yields:
+            (asin, item_json) pairs.
+        """
+        conditions = "asin > ? AND profile_rank >= ?"
+        cutoff = None
+        if max_offers_age is not None:
+            conditions += " AND offers_fetched_at >= ?"
+            cutoff = time.time() - max_offers_age
+        last_asin = ""
+        while True:
+            parameters: List[Any] = [last_asin, min_rank]
+            if cutoff is not None:
+                parameters.append(cutoff)
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT asin, item_json FROM items WHERE {conditions} ORDER BY asin LIMIT ?",
+                    parameters + [batch_size]
+                ).fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_asin = rows[-1][0]
+
+    # ------------------------------------------------------------------ #
+    # Searches
+    # ------------------------------------------------------------------ #
+
+    def get_search(
+        self,
+        query_key: str,
+        min_rank: int = 0
+    ) -> Optional[Tuple[List[str], Dict[str, str], int, str]]:
+        """
+        Return a stored search if the query and all its items are still fresh.
+
+        Returns:
+            (asins, items_json_by_asin, total_result_count, search_url) or None.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT asins_json, total_result_count, search_url, fetched_at "
+                "FROM searches WHERE query_key = ?",
+                (query_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        asins_json, total_result_count, search_url, fetched_at = row
+        if time.time() - fetched_at > self.search_ttl:
+            return None
+        asins = json.loads(asins_json)
+        items = self.get_items(asins, min_rank=min_rank)
+        if len(items) < len(asins):
+            return None
+        return asins, items, total_result_count, search_url
+
+    def put_search(
+        self,
+        query_key: str,
+        items: List[Dict[str, Any]],
+        total_result_count: Optional[int],
+        search_url: Optional[str],
+        source_query: Optional[str] = None,
+        profile_rank: int = 3
+    ) -> None:
+        """Store a search result: its items and the query -> ASINs mapping."""
+        self.put_items(items, source_query=source_query, profile_rank=profile_rank)
+        asins = [item['ASIN'] for item in items if item.get('ASIN')]
+        with self._lock:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO searches "
+                    "(query_key, asins_json, total_result_count, search_url, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (query_key, json.dumps(asins), total_result_count, search_url, time.time())
+                )
+
+    # ------------------------------------------------------------------ #
+    # Maintenance
+    # ------------------------------------------------------------------ #
+
+    def _prune_if_due(self, now: float) -> None:
+        """Prune the items older than `max_age` if the last prune was `prune_interval` ago."""
+        if self.max_age <= 0 or now - self._pruned_at < self.prune_interval:
+            return
+        self._pruned_at = now
+        try:
+            removed = self.prune(self.max_age)
+        except sqlite3.Error as e:
+            logger.warning("Item store prune failed: %s", e)
+            return
+        if removed:
+            logger.info("Item store pruned: %d items older than %.0f s", removed, self.max_age)
+
+    def count(self) -> int:
+        """Number of stored items."""
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def prune(self, older_than: float) -> int:
+        """Delete items whose static data is older than `older_than` seconds."""
+        cutoff = time.time() - older_than
+        with self._lock:
+            with self.connection:
+                cursor = self.connection.execute(
+                    "DELETE FROM items WHERE static_fetched_at < ?", (cutoff,)
+                )
+                self.connection.execute(
+                    "DELETE FROM searches WHERE fetched_at < ?", (cutoff,)
+                )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
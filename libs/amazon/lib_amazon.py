@@ -4,38 +4,178 @@ Enhanced singleton implementation for better error handling, caching, and functi
 """
 
 import os
+import asyncio
+import contextvars
+import functools
+import json
 import logging
-import sys
-from typing import List, Dict, Any, Optional, Union
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterator, Optional, Tuple, TypeVar, Union
 from dataclasses import asdict
 from amazon_paapi import AmazonApi
-from amazon_paapi.models.regions import Country
+from amazon_paapi.models.regions import DOMAINS
 from amazon_paapi.models import SearchResult, SortBy, Item, Availability
-import dotenv
+from amazon_paapi.errors import AmazonError, AssociateValidationError, InvalidArgument, MalformedRequest
+from amazon_paapi.helpers import arguments as paapi_arguments
+from amazon_paapi.helpers import requests as paapi_requests
+from amazon_paapi.sdk.api_client import ApiClient
+from amazon_paapi.sdk.rest import ApiException
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 
 # Import models from separate models module
-from .models import SearchIndex
+from .models import (
+    SearchIndex, ResourceProfile, RESOURCE_PROFILES, RESOURCE_PROFILE_RANK, ProductRecord,
+    APIError, AuthenticationError, InvalidRequestError, NetworkError, ThrottledError, UpstreamError
+)
+from .rate_limiter import TokenBucketRateLimiter
+from .admission import AdmissionScheduler, INTERACTIVE, BATCH, BACKGROUND
+from .resilience import CircuitBreaker, RetryPolicy
+from .browse_nodes import browse_node_index
+from .cache import ResponseCache
+from .item_store import ItemStore, DEFAULT_STORE_PATH
+from .product_index import ProductIndex, DEFAULT_INDEX_PATH
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def _has_items(result: SearchResult) -> bool:
+    """Only non-empty search results are cached (errors also return empty results)."""
+    return bool(result and result.items)
+
+
+# ASINs are 10 uppercase alphanumeric characters
+ASIN_PATTERN = re.compile(r'^[A-Z0-9]{10}$')
+
+
+def _chunks(values: List[str], size: int) -> List[List[str]]:
+    """Split a list into consecutive chunks of at most `size` elements."""
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _resource_profile(resources: Union[str, ResourceProfile]) -> ResourceProfile:
+    """Accept a ResourceProfile or its name (e.g. 'price-refresh')."""
+    return resources if isinstance(resources, ResourceProfile) else ResourceProfile(resources)
+
+
+class _JsonPayload:
+    """Minimal response wrapper so the SDK deserializer can read stored JSON."""
+
+    def __init__(self, data: str):
+        self.data = data
+
+
+# SDK client used only to rebuild stored items: it never signs nor sends a request
+_store_deserializer: Optional[ApiClient] = None
+_store_deserializer_lock = threading.Lock()
+
+
+def iter_store_items(
+    item_store: ItemStore,
+    resources: Union[str, ResourceProfile] = ResourceProfile.DISCOVERY,
+    max_offers_age: Optional[float] = None
+) -> Iterator[Item]:
+    """
+    Stream every item of an item store as SDK items, in ASIN order and in constant memory.
+
+    No credentials are needed, so stores can be read offline (e.g. by the feed export).
+
+    Args:
+        item_store (ItemStore): The store to read.
+        resources: Only items fetched with at least the fields of this resource profile.
+        max_offers_age (float, optional): Only items whose offers are at most this many seconds old.
+
+    Yields:
+        Item: The stored items. Items that cannot be read are logged and skipped.
+    """
+    global _store_deserializer
+    if _store_deserializer is None:
+        with _store_deserializer_lock:
+            if _store_deserializer is None:
+                _store_deserializer = ApiClient(None, None, None, None)
+    min_rank = RESOURCE_PROFILE_RANK[_resource_profile(resources)]
+    for asin, item_json in item_store.iter_items(min_rank=min_rank, max_offers_age=max_offers_age):
+        try:
+            yield _store_deserializer.deserialize(_JsonPayload(item_json), 'Item')
+        except Exception as e:
+            logger.warning("Skipping unreadable stored item %s: %s", asin, e)
+
 
-# Load environment variables from .env file
-dotenv.load_dotenv()
+def _estimate_size(result: SearchResult) -> int:
+    """Estimate the size in bytes of a search result for the cache byte bound."""
+    try:
+        return len(json.dumps(result.to_dict(), default=str))
+    except Exception:
+        return 4096 * max(len(result.items or []), 1)
 
-# Configure logging to stderr ONLY - critical for MCP servers
-logging.basicConfig(
-    level=logging.ERROR,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stderr,
-    force=True
+
+# PA-API error codes that mean "the request is fine, there is just nothing to return"
+NO_RESULTS_CODES = ('NoResults', 'ItemNotAccessible', 'InvalidParameterValue.ItemId')
+# PA-API error codes caused by the credentials, the signature or the associate tag
+AUTHENTICATION_CODES = (
+    'InvalidSignature', 'UnrecognizedClient', 'IncompleteSignature', 'InvalidPartnerTag',
+    'InvalidAssociate', 'AccessDenied', 'AccessDeniedAwsUsers', 'MissingAuthenticationToken',
 )
-logger = logging.getLogger(__name__)
 
-# Ensure this module's logger goes to stderr
-logger.handlers.clear()
-stderr_handler = logging.StreamHandler(sys.stderr)
-stderr_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logger.addHandler(stderr_handler)
-logger.setLevel(logging.ERROR)
-logger.propagate = False
 
+def _error_code(body: Any) -> Optional[str]:
+    """First error code of a PA-API error body ({"Errors": [{"Code": ...}]})."""
+    try:
+        errors = json.loads(body).get('Errors') or []
+        return errors[0].get('Code') if errors else None
+    except Exception:
+        return None
+
+
+def _is_no_results(errors: Any) -> bool:
+    """Whether the errors of a 200/404 answer only say that nothing was found."""
+    codes = [getattr(error, 'code', None) for error in errors or []]
+    return bool(codes) and all(code in NO_RESULTS_CODES for code in codes)
+
+
+def classify_error(error: BaseException) -> APIError:
+    """
+    Map an SDK or transport exception to a typed APIError.
+
+    Args:
+        error (BaseException): Exception raised while calling PA-API.
+
+    Returns:
+        APIError: ThrottledError, UpstreamError and NetworkError are retryable;
+        InvalidRequestError, AuthenticationError and plain APIError are not.
+    """
+    if isinstance(error, APIError):
+        return error
+    if isinstance(error, ApiException):
+        status = error.status or 0
+        code = _error_code(error.body)
+        message = f"PA-API answered {status} {error.reason or ''}".strip()
+        if code:
+            message += f" ({code})"
+        if status == 429 or code == 'TooManyRequests':
+            return ThrottledError(message, error_code=code or 'TooManyRequests', status=status)
+        if status == 0:
+            return NetworkError(f"PA-API request failed: {error.reason}", status=status)
+        if status >= 500:
+            return UpstreamError(message, error_code=code, status=status)
+        if status in (401, 403) or code in AUTHENTICATION_CODES:
+            return AuthenticationError(message, error_code=code, status=status)
+        return InvalidRequestError(message, error_code=code, status=status)
+    if isinstance(error, (Urllib3HTTPError, OSError)):
+        return NetworkError(f"PA-API request failed: {error}")
+    if isinstance(error, AssociateValidationError):
+        return AuthenticationError(str(error), error_code='InvalidAssociate')
+    if isinstance(error, (InvalidArgument, MalformedRequest)):
+        return InvalidRequestError(str(error))
+    if isinstance(error, AmazonError):
+        return APIError(str(error))
+    return APIError(f"Unexpected PA-API client error: {error!r}")
 
 
 
@@ -45,38 +185,189 @@ class AmazonPAAPI:
     Enhanced Amazon Product Advertising API client with singleton pattern.
     
     Features:
-    - Singleton pattern for efficient API usage
+    - Thread-safe pool of clients, one per marketplace (AmazonPAAPI('DE')),
+      each with its own credentials, rate limiter, worker pool, cache and
+      item store, so marketplaces do not queue behind each other
+    - Async execution path backed by a bounded worker pool, so a slow PA-API
+      round trip does not block the event loop of the MCP server
+    - Token bucket rate limiter shared by every outgoing call of a marketplace
     - Enhanced error handling and logging
     - Data class responses for better type safety
-    - Caching capabilities
+    - Caching capabilities: TTL + LRU search cache with request coalescing
+      and stale-while-revalidate
+    - Persistent SQLite item store that survives restarts (read/write through)
+    - Named resource profiles so each call only requests the fields it uses
+    - Configurable PA-API host (AMAZON_API_HOST), e.g. a local stand-in for load tests
     - Multiple search and retrieval methods
     - Configuration validation
     """
     
+    # Client of the default marketplace (backward compatibility) and pool of
+    # every marketplace client created, keyed by marketplace code
     _instance: Optional['AmazonPAAPI'] = None
+    _instances: Dict[str, 'AmazonPAAPI'] = {}
     _initialized: bool = False
+    _instance_lock = threading.RLock()
+    # Set by __new__: the code of the marketplace the client belongs to
+    marketplace: str
+
+    # Marketplace used when none is given (AMAZON_MARKETPLACE)
+    DEFAULT_MARKETPLACE = 'ES'
+
+    # Maximum number of PA-API calls running at the same time in the worker pool
+    DEFAULT_MAX_WORKERS = 4
+    # PA-API quota: about 1 request/second per associate tag
+    DEFAULT_RATE_LIMIT = 1.0
+    # Tokens any call can take at once. When AMAZON_API_RATE_BURST is unset the
+    # bucket also holds the interactive reserve on top of them, otherwise the
+    # reserve would not fit in it and interactive calls would queue like the rest
+    DEFAULT_RATE_BURST = 1
+    # Admission control: calls waiting for a token per priority class
+    # (AMAZON_ADMISSION_MAX_QUEUE_<CLASS>) and the seconds they may wait
+    # before being shed (AMAZON_ADMISSION_DEADLINE_<CLASS>)
+    DEFAULT_ADMISSION_MAX_QUEUE = {INTERACTIVE: 32, BATCH: 256, BACKGROUND: 256}
+    DEFAULT_ADMISSION_DEADLINE = {INTERACTIVE: 10.0, BATCH: 120.0, BACKGROUND: 300.0}
+    # Tokens batch and background calls leave for interactive ones (AMAZON_ADMISSION_INTERACTIVE_RESERVE)
+    DEFAULT_ADMISSION_INTERACTIVE_RESERVE = 1.0
+    # Extra back-off applied to the limiter when Amazon answers TooManyRequests
+    THROTTLE_PENALTY_SECONDS = 2.0
+    # Upstream request timeouts in seconds: connect, read
+    DEFAULT_CONNECT_TIMEOUT = 3.0
+    DEFAULT_READ_TIMEOUT = 10.0
+    # Retries of throttled, 5xx and network failures (jittered exponential backoff)
+    DEFAULT_RETRY_MAX_ATTEMPTS = 3
+    DEFAULT_RETRY_BASE_DELAY = 0.5
+    DEFAULT_RETRY_MAX_DELAY = 8.0
+    # Circuit breaker: consecutive upstream failures that pause the requests, and for how long
+    DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+    DEFAULT_CIRCUIT_RESET_TIMEOUT = 30.0
+    # Hedged reads: seconds before a second copy of a slow request is sent (0 disables it)
+    DEFAULT_HEDGE_DELAY = 0.0
+    # GetItems accepts at most 10 ASINs per request
+    GET_ITEMS_BATCH_SIZE = 10
+    # GetBrowseNodes accepts at most 10 browse node ids per request
+    GET_BROWSE_NODES_BATCH_SIZE = 10
+    # SearchItems returns at most 10 items per page and 10 pages per query
+    SEARCH_PAGE_SIZE = 10
+    SEARCH_MAX_PAGES = 10
+    # Search cache: offers are served fresh for 15 minutes and stale (while
+    # revalidating) for one more hour
+    DEFAULT_CACHE_TTL = 900
+    DEFAULT_CACHE_STALE_TTL = 3600
+    DEFAULT_CACHE_MAX_ENTRIES = 512
+    DEFAULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    # Item store freshness: static data (title, EANs...) 30 days, offers 1 hour,
+    # query -> ASINs lists 1 day
+    DEFAULT_STORE_STATIC_TTL = 30 * 24 * 3600
+    DEFAULT_STORE_OFFERS_TTL = 3600
+    DEFAULT_STORE_SEARCH_TTL = 24 * 3600
+    # Items are deleted from the store once their static data is this old
+    # (AMAZON_STORE_MAX_AGE, 0 keeps them forever); they would be fetched again anyway
+    DEFAULT_STORE_MAX_AGE = DEFAULT_STORE_STATIC_TTL
+    # Seconds a product stays eligible for local search results (AMAZON_PRODUCT_INDEX_MAX_AGE)
+    DEFAULT_PRODUCT_INDEX_MAX_AGE = 24 * 3600
     
-    def __new__(cls) -> 'AmazonPAAPI':
-        """Singleton pattern implementation."""
-        if cls._instance is None:
-            cls._instance = super(AmazonPAAPI, cls).__new__(cls)
-        return cls._instance
+    @classmethod
+    def default_marketplace(cls) -> str:
+        """Marketplace code used when none is given (AMAZON_MARKETPLACE, default ES)."""
+        return (os.getenv('AMAZON_MARKETPLACE') or cls.DEFAULT_MARKETPLACE).strip().upper()
+
+    @classmethod
+    def resolve_marketplace(cls, marketplace: Optional[str] = None) -> str:
+        """
+        Normalize a marketplace code ("de", "UK"...), or return the default one.
+
+        Raises:
+            ValueError: If the code is not a PA-API marketplace.
+        """
+        code = (marketplace or cls.default_marketplace()).strip().upper()
+        if code == 'GB':
+            code = 'UK'
+        if code not in DOMAINS:
+            raise ValueError(f"Unknown marketplace '{marketplace}'. Valid values: {', '.join(sorted(DOMAINS))}")
+        return code
+
+    def __new__(cls, marketplace: Optional[str] = None) -> 'AmazonPAAPI':
+        """Thread-safe singleton per marketplace."""
+        code = cls.resolve_marketplace(marketplace)
+        instance = cls._instances.get(code)
+        if instance is None:
+            with cls._instance_lock:
+                instance = cls._instances.get(code)
+                if instance is None:
+                    instance = super(AmazonPAAPI, cls).__new__(cls)
+                    instance.marketplace = code
+                    cls._instances[code] = instance
+                    if code == cls.default_marketplace():
+                        cls._instance = instance
+        return instance
     
-    def __init__(self):
-        """Initialize the Amazon PA-API client."""
-        if not self._initialized:
+    def __init__(self, marketplace: Optional[str] = None):
+        """
+        Initialize the Amazon PA-API client of a marketplace.
+
+        Args:
+            marketplace (str, optional): Marketplace code, e.g. "ES" or "DE" (default AMAZON_MARKETPLACE or ES).
+        """
+        if self._initialized:
+            return
+        with self._instance_lock:
+            if self._initialized:
+                return
             self._load_credentials()
             self._validate_credentials()
             self._initialize_api()
+            self._initialize_executor()
+            self._initialize_rate_limiter()
+            self._initialize_resilience()
+            self._initialize_cache()
+            self._initialize_item_store()
+            self._initialize_product_index()
+            metrics.register_collector(f'amazon_paapi_client_{self.marketplace}', self._collect_metrics)
             self._initialized = True
-            logger.info("Amazon PA-API client initialized successfully")
+            logger.info("Amazon PA-API client for marketplace %s initialized successfully", self.marketplace)
+
+    @property
+    def is_default_marketplace(self) -> bool:
+        return self.marketplace == self.default_marketplace()
+
+    def _setting(self, name: str, default: Any = None) -> Any:
+        """
+        Read a setting of this marketplace: NAME_<MARKETPLACE> (e.g.
+        AMAZON_API_RATE_LIMIT_DE), falling back to NAME and then to `default`.
+        """
+        value = os.getenv(f"{name}_{self.marketplace}")
+        if value is None:
+            value = os.getenv(name)
+        return default if value is None else value
     
     def _load_credentials(self) -> None:
-        """Load credentials from environment variables."""
-        self.api_key = os.getenv('AMAZON_API_KEY') or dotenv.get_key('.env', 'AMAZON_API_KEY')
-        self.secret_key = os.getenv('AMAZON_SECRET_KEY') or dotenv.get_key('.env', 'AMAZON_SECRET_KEY')
-        self.associate_tag = os.getenv('AMAZON_ASSOCIATE_TAG') or dotenv.get_key('.env', 'AMAZON_ASSOCIATE_TAG')
-        self.country = Country.ES  # Default to Spain, can be made configurable
+        """
+        Load the credentials of this marketplace from environment variables.
+
+        Every marketplace has its own associate account: AMAZON_API_KEY_DE,
+        AMAZON_SECRET_KEY_DE and AMAZON_ASSOCIATE_TAG_DE. Key and secret fall
+        back to the global AMAZON_API_KEY/AMAZON_SECRET_KEY; the associate tag
+        only does for the default marketplace (tags are per marketplace).
+
+        server.py loads the .env file once at startup; the .env of the working
+        directory is only read here (once) when a credential is still missing,
+        e.g. when the library is used on its own.
+        """
+        names = ('AMAZON_API_KEY', 'AMAZON_SECRET_KEY', 'AMAZON_ASSOCIATE_TAG')
+        values = {name: self._setting(name) for name in names}
+        if not self.is_default_marketplace:
+            values['AMAZON_ASSOCIATE_TAG'] = os.getenv(f"AMAZON_ASSOCIATE_TAG_{self.marketplace}")
+        elif not all(values.values()):
+            import dotenv
+            env_file = dotenv.dotenv_values('.env')
+            values = {name: value or env_file.get(name) for name, value in values.items()}
+        self.api_key = values['AMAZON_API_KEY']
+        self.secret_key = values['AMAZON_SECRET_KEY']
+        self.associate_tag = values['AMAZON_ASSOCIATE_TAG']
+        self.country = self.marketplace
+        # Optional PA-API endpoint override, e.g. "http://127.0.0.1:8750" for a local stand-in
+        self.api_host = self._setting('AMAZON_API_HOST') or None
     
     def _validate_credentials(self) -> None:
         """Validate that all required credentials are present."""
@@ -87,23 +378,619 @@ class AmazonPAAPI:
         if not self.secret_key:
             missing_credentials.append('AMAZON_SECRET_KEY')
         if not self.associate_tag:
-            missing_credentials.append('AMAZON_ASSOCIATE_TAG')
+            missing_credentials.append(
+                'AMAZON_ASSOCIATE_TAG' if self.is_default_marketplace else f'AMAZON_ASSOCIATE_TAG_{self.marketplace}'
+            )
         
         if missing_credentials:
-            raise ValueError(f"Missing required environment variables: {', '.join(missing_credentials)}")
+            raise ValueError(
+                f"Missing required environment variables for marketplace {self.marketplace}: "
+                f"{', '.join(missing_credentials)}"
+            )
     
     def _initialize_api(self) -> None:
         """Initialize the Amazon API client."""
         try:
+            # throttling=0: the shared rate limiter paces the requests instead of
+            # the SDK sleep, which is not thread-safe
             self.amazon_api = AmazonApi(
                 key=self.api_key,
                 secret=self.secret_key,
                 tag=self.associate_tag,
-                country=self.country
+                country=self.country,
+                throttling=0
             )
+            self.api_scheme = 'https'
+            if self.api_host:
+                self._configure_api_host(self.api_host)
+            self._instrument_api_client()
         except Exception as e:
-            logger.error(f"Failed to initialize Amazon API: {str(e)}")
+            logger.error("Failed to initialize Amazon API: %s", e)
             raise
+
+    def _instrument_api_client(self) -> None:
+        """
+        Time the stages of every SDK call: request signing, HTTP round trip
+        and response deserialization, and count the upstream requests.
+        """
+        api_client = self.amazon_api.api.api_client
+        marketplace = self.marketplace
+        sign = api_client.update_params_for_auth
+        send_request = api_client.request
+        deserialize = api_client.deserialize
+
+        def timed_sign(headers: Any, querys: Any, auth_settings: Any, api_name: str, *args: Any, **kwargs: Any) -> Any:
+            with metrics.timer('amazon_paapi_stage_seconds', stage='sign', operation=api_name.lower()):
+                return sign(headers, querys, auth_settings, api_name, *args, **kwargs)
+
+        def timed_request(method: str, url: str, *args: Any, **kwargs: Any) -> Any:
+            operation = url.rstrip('/').rsplit('/', 1)[-1]
+            metrics.add_upstream_call()
+            status = 'network_error'
+            try:
+                with metrics.timer('amazon_paapi_stage_seconds', stage='http', operation=operation):
+                    response = send_request(method, url, *args, **kwargs)
+                status = response.status
+                return response
+            except ApiException as e:
+                status = e.status
+                if e.status == 429:
+                    metrics.inc('amazon_paapi_throttled_total', operation=operation, marketplace=marketplace)
+                raise
+            finally:
+                metrics.inc('amazon_paapi_requests_total', operation=operation, status=status, marketplace=marketplace)
+
+        def timed_deserialize(response: Any, response_type: Any, *args: Any, **kwargs: Any) -> Any:
+            operation = str(response_type).replace('Response', '').lower()
+            with metrics.timer('amazon_paapi_stage_seconds', stage='deserialize', operation=operation):
+                return deserialize(response, response_type, *args, **kwargs)
+
+        api_client.update_params_for_auth = timed_sign
+        api_client.request = timed_request
+        api_client.deserialize = timed_deserialize
+
+    def _configure_api_host(self, api_host: str) -> None:
+        """
+        Send the PA-API requests to `api_host` instead of the marketplace host.
+
+        Accepts a bare host ("webservices.amazon.es") or a URL with scheme and
+        port ("http://127.0.0.1:8750"). The SDK always builds https:// URLs, so
+        for plain http hosts the scheme is rewritten before each request.
+        """
+        scheme, separator, host = api_host.rstrip('/').partition('://')
+        if not separator:
+            scheme, host = 'https', api_host.rstrip('/')
+        api_client = self.amazon_api.api.api_client
+        # The host is also signed and sent in the Host header
+        api_client.host = host
+        self.amazon_api._host = host
+        self.api_scheme = scheme
+
+        if scheme == 'http':
+            send_request = api_client.request
+
+            def plain_http_request(method: str, url: str, *args: Any, **kwargs: Any) -> Any:
+                if url.startswith('https://'):
+                    url = 'http://' + url[len('https://'):]
+                return send_request(method, url, *args, **kwargs)
+
+            api_client.request = plain_http_request
+        logger.info("PA-API requests are sent to %s://%s", scheme, host)
+
+    def warm_up(self, timeout: float = 5.0) -> bool:
+        """
+        Open a keep-alive connection to the PA-API host before the first request.
+
+        Sends an unsigned HEAD request through the SDK connection pool, so the
+        DNS lookup and the TCP/TLS handshakes are already done when the first
+        tool call arrives. The answer is ignored; it is not a PA-API operation
+        and does not use quota.
+
+        Args:
+            timeout (float): Connection and read timeout in seconds.
+
+        Returns:
+            bool: True if the host answered (the connection stays in the pool).
+        """
+        pool_manager = self.amazon_api.api.api_client.rest_client.pool_manager
+        url = f"{self.api_scheme}://{self.amazon_api._host}/"
+        try:
+            with metrics.timer('amazon_paapi_warmup_seconds'):
+                pool_manager.request('HEAD', url, timeout=timeout, retries=False)
+        except Exception as e:
+            logger.warning("PA-API connection warm-up to %s failed: %s", url, e)
+            return False
+        logger.info("PA-API connection to %s warmed up", url)
+        return True
+
+    def _initialize_executor(self) -> None:
+        """
+        Initialize the bounded worker pool used by the async methods.
+
+        The PA-API SDK is blocking (urllib3), so async calls are offloaded to
+        these threads. The SDK keeps a urllib3 PoolManager per client, so the
+        workers reuse keep-alive HTTPS connections to the PA-API host.
+        """
+        max_workers = int(self._setting('AMAZON_API_MAX_WORKERS', self.DEFAULT_MAX_WORKERS))
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"amazon-paapi-{self.marketplace.lower()}"
+        )
+
+    def _initialize_rate_limiter(self) -> None:
+        """
+        Initialize the token bucket shared by every request of this client (its
+        own quota budget) and the admission scheduler that hands its tokens out
+        by priority class.
+        """
+        interactive_reserve = max(float(self._setting(
+            'AMAZON_ADMISSION_INTERACTIVE_RESERVE', self.DEFAULT_ADMISSION_INTERACTIVE_RESERVE
+        )), 0.0)
+        burst = self._setting('AMAZON_API_RATE_BURST')
+        self.rate_limiter = TokenBucketRateLimiter(
+            rate=float(self._setting('AMAZON_API_RATE_LIMIT', self.DEFAULT_RATE_LIMIT)),
+            burst=int(burst) if burst is not None else self.DEFAULT_RATE_BURST + math.ceil(interactive_reserve)
+        )
+        self.admission = AdmissionScheduler(
+            self.rate_limiter,
+            max_queue={
+                level: int(self._setting(f'AMAZON_ADMISSION_MAX_QUEUE_{level.upper()}', default))
+                for level, default in self.DEFAULT_ADMISSION_MAX_QUEUE.items()
+            },
+            deadlines={
+                level: float(self._setting(f'AMAZON_ADMISSION_DEADLINE_{level.upper()}', default))
+                for level, default in self.DEFAULT_ADMISSION_DEADLINE.items()
+            },
+            interactive_reserve=interactive_reserve,
+            name=self.marketplace
+        )
+
+    def _initialize_resilience(self) -> None:
+        """
+        Initialize the timeouts, the retry policy, the circuit breaker and request hedging.
+
+        Hedging (AMAZON_HEDGE_DELAY > 0) sends a second copy of an async read
+        that has not answered after that many seconds, only when the rate
+        limiter has a spare token, and keeps the first answer.
+        """
+        self.request_timeout = (
+            float(self._setting('AMAZON_API_CONNECT_TIMEOUT', self.DEFAULT_CONNECT_TIMEOUT)),
+            float(self._setting('AMAZON_API_TIMEOUT', self.DEFAULT_READ_TIMEOUT))
+        )
+        self.retry_policy = RetryPolicy(
+            max_attempts=int(self._setting('AMAZON_RETRY_MAX_ATTEMPTS', self.DEFAULT_RETRY_MAX_ATTEMPTS)),
+            base_delay=float(self._setting('AMAZON_RETRY_BASE_DELAY', self.DEFAULT_RETRY_BASE_DELAY)),
+            max_delay=float(self._setting('AMAZON_RETRY_MAX_DELAY', self.DEFAULT_RETRY_MAX_DELAY))
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(self._setting('AMAZON_CIRCUIT_FAILURE_THRESHOLD', self.DEFAULT_CIRCUIT_FAILURE_THRESHOLD)),
+            reset_timeout=float(self._setting('AMAZON_CIRCUIT_RESET_TIMEOUT', self.DEFAULT_CIRCUIT_RESET_TIMEOUT))
+        )
+        self.hedge_delay = float(self._setting('AMAZON_HEDGE_DELAY', self.DEFAULT_HEDGE_DELAY))
+
+    def _initialize_cache(self) -> None:
+        """Initialize the in-memory search response cache (AMAZON_CACHE_* settings, per marketplace)."""
+        self.search_cache = ResponseCache(
+            ttl=float(self._setting('AMAZON_CACHE_TTL', self.DEFAULT_CACHE_TTL)),
+            stale_ttl=float(self._setting('AMAZON_CACHE_STALE_TTL', self.DEFAULT_CACHE_STALE_TTL)),
+            max_entries=int(self._setting('AMAZON_CACHE_MAX_ENTRIES', self.DEFAULT_CACHE_MAX_ENTRIES)),
+            max_bytes=int(self._setting('AMAZON_CACHE_MAX_BYTES', self.DEFAULT_CACHE_MAX_BYTES)),
+            executor=self._executor
+        )
+
+    @classmethod
+    def item_store_path(cls, marketplace: Optional[str] = None) -> Optional[str]:
+        """
+        Item store file of a marketplace (None if the store is disabled).
+
+        Set AMAZON_ITEM_STORE_PATH to an empty string or 'off' to disable it.
+        Items differ per marketplace (prices, titles), so the other
+        marketplaces use their own file next to it (e.g. items_de.sqlite3)
+        unless AMAZON_ITEM_STORE_PATH_<MARKETPLACE> is set.
+        """
+        code = cls.resolve_marketplace(marketplace)
+        path = os.getenv(f'AMAZON_ITEM_STORE_PATH_{code}')
+        if path is None:
+            path = os.getenv('AMAZON_ITEM_STORE_PATH', DEFAULT_STORE_PATH)
+            if path and path.lower() not in ('off', 'none') and code != cls.default_marketplace():
+                root, extension = os.path.splitext(path)
+                path = f"{root}_{code.lower()}{extension}"
+        if not path or path.lower() in ('off', 'none'):
+            return None
+        return path
+
+    def _initialize_item_store(self) -> None:
+        """
+        Initialize the persistent item store (see `item_store_path`). The
+        freshness settings (AMAZON_STORE_*_TTL) and the retention
+        (AMAZON_STORE_MAX_AGE) can be set per marketplace.
+        """
+        path = self.item_store_path(self.marketplace)
+        if path is None:
+            self.item_store = None
+            return
+        self.item_store = ItemStore(
+            path=path,
+            static_ttl=float(self._setting('AMAZON_STORE_STATIC_TTL', self.DEFAULT_STORE_STATIC_TTL)),
+            offers_ttl=float(self._setting('AMAZON_STORE_OFFERS_TTL', self.DEFAULT_STORE_OFFERS_TTL)),
+            search_ttl=float(self._setting('AMAZON_STORE_SEARCH_TTL', self.DEFAULT_STORE_SEARCH_TTL)),
+            max_age=float(self._setting('AMAZON_STORE_MAX_AGE', self.DEFAULT_STORE_MAX_AGE))
+        )
+
+    def _initialize_product_index(self) -> None:
+        """
+        Initialize the local full-text product index.
+
+        Set AMAZON_PRODUCT_INDEX_PATH to an empty string or 'off' to disable
+        it. Like the item store, the other marketplaces use their own file
+        (e.g. amazon_products_de.sqlite3) unless AMAZON_PRODUCT_INDEX_PATH_<MARKETPLACE> is set.
+        """
+        path = os.getenv(f'AMAZON_PRODUCT_INDEX_PATH_{self.marketplace}')
+        if path is None:
+            path = os.getenv('AMAZON_PRODUCT_INDEX_PATH', DEFAULT_INDEX_PATH)
+            if path and path.lower() not in ('off', 'none') and not self.is_default_marketplace:
+                root, extension = os.path.splitext(path)
+                path = f"{root}_{self.marketplace.lower()}{extension}"
+        if not path or path.lower() in ('off', 'none'):
+            self.product_index = None
+            return
+        self.product_index = ProductIndex(
+            path=path,
+            max_age=float(self._setting('AMAZON_PRODUCT_INDEX_MAX_AGE', self.DEFAULT_PRODUCT_INDEX_MAX_AGE))
+        )
+
+    @staticmethod
+    def _search_cache_key(
+        keywords: str,
+        search_index: Union[str, SearchIndex],
+        item_count: int,
+        sort_by: SortBy,
+        min_price: Optional[int],
+        max_price: Optional[int],
+        browse_node_id: Optional[str],
+        availability: Optional[Availability],
+        item_page: Optional[int] = None,
+        resources: Union[str, ResourceProfile] = ResourceProfile.DISCOVERY
+    ) -> tuple:
+        """Build a normalized cache key from the search parameters."""
+        if isinstance(search_index, SearchIndex):
+            search_index = search_index.value
+        return (
+            'search_items',
+            " ".join((keywords or "").lower().split()),
+            str(search_index),
+            min(int(item_count), 10),
+            str(sort_by),
+            int(min_price) if min_price else None,
+            int(max_price) if max_price else None,
+            str(browse_node_id) if browse_node_id else None,
+            str(availability) if availability else None,
+            int(item_page) if item_page else 1,
+            _resource_profile(resources).value,
+        )
+
+    @staticmethod
+    def split_asins(item_asins: Union[str, List[str]]) -> Tuple[List[str], List[str]]:
+        """
+        Normalize ASINs and split them into valid and invalid ones.
+
+        ASINs are stripped and uppercased, and duplicates are removed keeping
+        the input order.
+
+        Args:
+            item_asins: Single ASIN, comma separated ASINs or list of ASINs
+
+        Returns:
+            Tuple with the list of valid ASINs and the list of invalid values
+        """
+        if isinstance(item_asins, str):
+            item_asins = item_asins.split(',')
+        valid, invalid = [], []
+        for value in dict.fromkeys(str(asin).strip().upper() for asin in item_asins):
+            if not value:
+                continue
+            (valid if ASIN_PATTERN.match(value) else invalid).append(value)
+        return valid, invalid
+
+    @classmethod
+    def _normalize_asins(cls, item_asins: Union[str, List[str]]) -> List[str]:
+        """Return the valid, de-duplicated ASINs of the input."""
+        valid, invalid = cls.split_asins(item_asins)
+        if invalid:
+            logger.warning("Ignoring invalid ASINs: %s", invalid)
+        return valid
+
+    # ------------------------------------------------------------------ #
+    # Item store helpers
+    # ------------------------------------------------------------------ #
+
+    def _serialize_item(self, item: Item) -> Dict[str, Any]:
+        """Serialize an SDK item to PA-API wire format."""
+        return self.amazon_api.api.api_client.sanitize_for_serialization(item)
+
+    def _deserialize_item(self, item_json: str) -> Item:
+        """Rebuild an SDK item from its stored PA-API wire JSON."""
+        return self.amazon_api.api.api_client.deserialize(_JsonPayload(item_json), 'Item')
+
+    def iter_stored_items(
+        self,
+        resources: Union[str, ResourceProfile] = ResourceProfile.DISCOVERY,
+        max_offers_age: Optional[float] = None
+    ) -> Iterator[Item]:
+        """
+        Stream every item of the item store (no API call), in ASIN order and in constant memory.
+
+        Args:
+            resources: Only items fetched with at least the fields of this resource profile.
+            max_offers_age (float, optional): Only items whose offers are at most this many seconds old.
+
+        Yields:
+            Item: The stored items. Items that cannot be read are logged and skipped.
+        """
+        if self.item_store is None:
+            return
+        yield from iter_store_items(self.item_store, resources, max_offers_age)
+
+    def _search_from_store(self, cache_key: tuple, profile: ResourceProfile) -> Optional[SearchResult]:
+        """Return a stored search result if it and all its items are still fresh."""
+        if self.item_store is None:
+            return None
+        try:
+            stored = self.item_store.get_search(
+                json.dumps(cache_key),
+                min_rank=RESOURCE_PROFILE_RANK[profile]
+            )
+            metrics.inc('amazon_item_store_lookups_total', kind='search', result='miss' if stored is None else 'hit')
+            if stored is None:
+                return None
+            asins, items_json, total_result_count, search_url = stored
+            return SearchResult(
+                items=[self._deserialize_item(items_json[asin]) for asin in asins],
+                total_result_count=total_result_count,
+                search_url=search_url
+            )
+        except Exception as e:
+            logger.error("Item store read failed: %s", e)
+            return None
+
+    def _items_from_store(self, item_asins: List[str], profile: ResourceProfile) -> Dict[str, Item]:
+        """
+        Return the fresh stored items for the given ASINs.
+
+        Price refreshes always go upstream: the point is to get new offers.
+        """
+        if self.item_store is None or profile is ResourceProfile.PRICE_REFRESH:
+            return {}
+        try:
+            stored = self.item_store.get_items(item_asins, min_rank=RESOURCE_PROFILE_RANK[profile])
+            metrics.inc('amazon_item_store_lookups_total', len(stored), kind='item', result='hit')
+            metrics.inc('amazon_item_store_lookups_total', len(set(item_asins)) - len(stored), kind='item', result='miss')
+            return {
+                asin: self._deserialize_item(item_json)
+                for asin, item_json in stored.items()
+            }
+        except Exception as e:
+            logger.error("Item store read failed: %s", e)
+            return {}
+
+    def _save_items(self, items: List[Item], source_query: str, profile: ResourceProfile) -> None:
+        """
+        Write fetched items to the item store.
+
+        Price refreshes only carry offers, so they update the offers of the
+        stored items instead of replacing them.
+        """
+        if self.item_store is None or not items:
+            return
+        try:
+            serialized = [self._serialize_item(item) for item in items]
+            if profile is ResourceProfile.PRICE_REFRESH:
+                self.item_store.update_offers(serialized)
+            else:
+                self.item_store.put_items(
+                    serialized,
+                    source_query=source_query,
+                    profile_rank=RESOURCE_PROFILE_RANK[profile]
+                )
+        except Exception as e:
+            logger.error("Item store write failed: %s", e)
+
+    def _save_search(
+        self,
+        cache_key: tuple,
+        keywords: str,
+        result: SearchResult,
+        profile: ResourceProfile
+    ) -> None:
+        """Write a search result and its items to the item store."""
+        if self.item_store is None or not _has_items(result):
+            return
+        try:
+            if profile is ResourceProfile.PRICE_REFRESH:
+                self.item_store.update_offers([self._serialize_item(item) for item in result.items])
+                return
+            self.item_store.put_search(
+                json.dumps(cache_key),
+                [self._serialize_item(item) for item in result.items],
+                total_result_count=result.total_result_count,
+                search_url=result.search_url,
+                source_query=keywords,
+                profile_rank=RESOURCE_PROFILE_RANK[profile]
+            )
+        except Exception as e:
+            logger.error("Item store write failed: %s", e)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for a rate limiter token."""
+        return self.admission.queue_depth
+
+    def _collect_metrics(self) -> List[Tuple[str, Dict[str, Any], float, str]]:
+        """Cache and rate limiter state of this marketplace for the metrics registry."""
+        cache_stats = self.search_cache.stats()
+        limiter_stats = self.rate_limiter.stats()
+        breaker_stats = self.circuit_breaker.stats()
+        marketplace = self.marketplace
+        return [
+            ('amazon_cache_requests_total', {'result': 'hit', 'marketplace': marketplace}, cache_stats['hits'], 'counter'),
+            ('amazon_cache_requests_total', {'result': 'stale_hit', 'marketplace': marketplace}, cache_stats['stale_hits'], 'counter'),
+            ('amazon_cache_requests_total', {'result': 'miss', 'marketplace': marketplace}, cache_stats['misses'], 'counter'),
+            ('amazon_cache_requests_total', {'result': 'coalesced', 'marketplace': marketplace}, cache_stats['coalesced'], 'counter'),
+            ('amazon_cache_evictions_total', {'marketplace': marketplace}, cache_stats['evictions'], 'counter'),
+            ('amazon_cache_entries', {'marketplace': marketplace}, cache_stats['entries'], 'gauge'),
+            ('amazon_cache_bytes', {'marketplace': marketplace}, cache_stats['bytes'], 'gauge'),
+            ('amazon_rate_limiter_available_tokens', {'marketplace': marketplace}, limiter_stats['available_tokens'], 'gauge'),
+            ('amazon_rate_limiter_queue_depth', {'marketplace': marketplace}, self.queue_depth, 'gauge'),
+            ('amazon_circuit_open', {'marketplace': marketplace}, int(breaker_stats['state'] != CircuitBreaker.CLOSED), 'gauge'),
+            ('amazon_circuit_rejected_total', {'marketplace': marketplace}, breaker_stats['rejected'], 'counter'),
+            ('amazon_circuit_opened_total', {'marketplace': marketplace}, breaker_stats['opened'], 'counter'),
+        ] + self.admission.collect_metrics()
+
+    def _handle_failure(self, error: APIError, operation: str) -> None:
+        """Count a failed request and back off the shared rate limiter when Amazon throttles it."""
+        metrics.inc(
+            'amazon_paapi_errors_total', operation=operation, reason=type(error).__name__, marketplace=self.marketplace
+        )
+        if isinstance(error, ThrottledError):
+            logger.warning("PA-API throttled the request, backing off the rate limiter")
+            self.rate_limiter.penalize(self.THROTTLE_PENALTY_SECONDS)
+        else:
+            logger.error("PA-API %s failed: %s", operation, error)
+
+    # ------------------------------------------------------------------ #
+    # Upstream calls: circuit breaker, retries and hedging
+    # ------------------------------------------------------------------ #
+
+    def _attempt(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run one upstream attempt and report its outcome to the circuit breaker."""
+        try:
+            result = func(*args, **kwargs)
+        except (UpstreamError, NetworkError):
+            self.circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            # Throttling and invalid requests say nothing about the upstream health
+            self.circuit_breaker.record_success()
+            raise
+        self.circuit_breaker.record_success()
+        return result
+
+    def _retry_delay(self, operation: str, error: APIError, attempt: int) -> float:
+        delay = self.retry_policy.delay(attempt, error)
+        metrics.inc('amazon_paapi_retries_total', operation=operation, reason=type(error).__name__, marketplace=self.marketplace)
+        logger.warning("PA-API %s attempt %d failed (%s), retrying in %.2f s", operation, attempt, error, delay)
+        return delay
+
+    def _call_upstream(self, operation: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Call `func` (one PA-API request) with a rate limiter token per attempt,
+        retrying retryable failures with jittered exponential backoff.
+
+        The circuit breaker is checked before taking a token, so requests
+        rejected while the circuit is open do not use up the quota. Tokens are
+        handed out by the admission scheduler, by the priority class of the
+        calling context (see admission.priority); a call that would wait too
+        long is shed with OverloadedError and not retried; if it was the
+        circuit breaker's half-open probe, the probe slot is given back.
+        """
+        attempt = 1
+        while True:
+            probe = self.circuit_breaker.before_call()
+            try:
+                self.admission.acquire()
+            except BaseException:
+                if probe:
+                    self.circuit_breaker.release_probe()
+                raise
+            try:
+                return self._attempt(func, *args, **kwargs)
+            except APIError as error:
+                if not self.retry_policy.should_retry(error, attempt):
+                    raise
+                time.sleep(self._retry_delay(operation, error, attempt))
+                attempt += 1
+
+    async def _call_upstream_async(self, operation: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Async version of `_call_upstream`: attempts run in the worker pool and
+        may be hedged. A half-open probe that is shed or cancelled before its
+        attempt reports back gives its slot back.
+        """
+        attempt = 1
+        while True:
+            probe = self.circuit_breaker.before_call()
+            try:
+                await self.admission.acquire_async()
+            except BaseException:
+                if probe:
+                    self.circuit_breaker.release_probe()
+                raise
+            try:
+                return await self._hedged(operation, func, *args, **kwargs)
+            except asyncio.CancelledError:
+                # The worker may not have started the attempt, so nothing would report the probe
+                if probe:
+                    self.circuit_breaker.release_probe()
+                raise
+            except APIError as error:
+                if not self.retry_policy.should_retry(error, attempt):
+                    raise
+                await asyncio.sleep(self._retry_delay(operation, error, attempt))
+                attempt += 1
+
+    async def _hedged(self, operation: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run one attempt in the worker pool; if it has not answered after
+        `hedge_delay` seconds and a rate limiter token is free, send a second
+        copy and return the first successful answer.
+
+        `func` must only fetch: the caller stores the winning answer. The
+        hedge is not counted as an upstream call of the tool invocation (it
+        repeats one already counted); amazon_paapi_requests_total and
+        amazon_paapi_hedged_total still account its quota use.
+        """
+        primary: 'asyncio.Future[T]' = asyncio.ensure_future(self._run_in_executor(self._attempt, func, *args, **kwargs))
+        if self.hedge_delay <= 0:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+        if not self.admission.try_acquire():
+            metrics.inc('amazon_paapi_hedged_total', operation=operation, result='no_token', marketplace=self.marketplace)
+            return await primary
+        hedge: 'asyncio.Future[T]' = asyncio.ensure_future(self._run_in_executor(self._hedge_attempt, func, *args, **kwargs))
+        pending = {primary, hedge}
+        errors: List[BaseException] = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    winner = 'hedge' if future is hedge else 'primary'
+                    metrics.inc('amazon_paapi_hedged_total', operation=operation, result=f'{winner}_won', marketplace=self.marketplace)
+                    for other in pending:
+                        # The worker thread cannot be interrupted; just drop its answer
+                        other.add_done_callback(lambda f: f.cancelled() or f.exception())
+                    return future.result()
+                errors.append(error)
+        raise errors[0]
+
+    def _hedge_attempt(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a hedged copy of an attempt outside the tool invocation accounting."""
+        with metrics.detached_invocation():
+            return self._attempt(func, *args, **kwargs)
+
+    async def _run_in_executor(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking client method in the worker pool and await its result."""
+        loop = asyncio.get_running_loop()
+        # Propagate the context (like asyncio.to_thread) so upstream calls are
+        # accounted to the tool invocation that made them
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(context.run, func, *args, **kwargs)
+        )
     
 
     def search_items(
@@ -115,7 +1002,9 @@ class AmazonPAAPI:
         min_price: int = None,
         max_price: int = None,
         browse_node_id: Optional[str] = None,
-        availability: Optional[Availability] = Availability.AVAILABLE  # Optional filter for item availability
+        availability: Optional[Availability] = Availability.AVAILABLE,  # Optional filter for item availability
+        item_page: Optional[int] = None,
+        resources: Union[str, ResourceProfile] = ResourceProfile.DISCOVERY
     ) -> SearchResult:
         """
         Search for items on Amazon.
@@ -127,99 +1016,490 @@ class AmazonPAAPI:
             sort_by: Sort criteria (e.g., 'Relevance')
             min_price: Minimum price filter (in cents)
             max_price: Maximum price filter (in cents)
+            item_page: Page of results to return (1-10, default 1)
+            resources: Resource profile to request (discovery, feed, price-refresh, full)
         
         Returns:
             AmazonAPIResponse containing search results
         """
+        params = dict(
+            keywords=keywords,
+            search_index=search_index,
+            item_count=item_count,
+            sort_by=sort_by,
+            min_price=min_price,
+            max_price=max_price,
+            browse_node_id=browse_node_id,
+            availability=availability,
+            item_page=item_page,
+            resources=_resource_profile(resources)
+        )
+
+        cache_key = self._search_cache_key(**params)
+
+        def loader() -> SearchResult:
+            stored = self._search_from_store(cache_key, params['resources'])
+            if stored is not None:
+                return stored
+            return self._call_upstream('searchitems', self._search_and_store, cache_key, **params)
+
+        return self.search_cache.get_or_load(
+            cache_key,
+            loader,
+            should_cache=_has_items,
+            sizeof=_estimate_size
+        )
+
+    def _search_and_store(self, cache_key: tuple, **params: Any) -> SearchResult:
+        """Execute a SearchItems request and write its result to the item store."""
+        result = self._search_items(**params)
+        self._save_search(cache_key, params['keywords'], result, params['resources'])
+        return result
+
+    def _search_items(
+        self,
+        keywords: str,
+        search_index: Union[str, SearchIndex],
+        item_count: int,
+        sort_by: SortBy,
+        min_price: Optional[int],
+        max_price: Optional[int],
+        browse_node_id: Optional[str],
+        availability: Optional[Availability],
+        item_page: Optional[int] = None,
+        resources: ResourceProfile = ResourceProfile.DISCOVERY
+    ) -> SearchResult:
+        """
+        Execute a SearchItems request once a rate limiter token is held.
+
+        Raises:
+            APIError: Typed error of the failed request. "No results" is not an
+            error: it returns an empty SearchResult.
+        """
+        # Convert enum to string if needed
+        if isinstance(search_index, SearchIndex):
+            search_index = search_index.value
+        
+        # Limit item count to API maximum
+        item_count = min(item_count, 10)
+        
+        logger.info("Searching Amazon for: '%s' in category '%s'", keywords, search_index)
+        
+        request_params = dict(
+            keywords=keywords,
+            search_index=search_index,
+            item_count=item_count,
+            sort_by=sort_by,
+            min_price=min_price,
+            max_price=max_price,
+            browse_node_id=browse_node_id,  # Optional, can be used for more specific searches
+            availability=availability,  # Optional filter for item availability
+            item_page=item_page
+        )
+
         try:
-            # Convert enum to string if needed
-            if isinstance(search_index, SearchIndex):
-                search_index = search_index.value
-            
-            # Limit item count to API maximum
-            item_count = min(item_count, 10)
-            
-            logger.info(f"Searching Amazon for: '{keywords}' in category '{search_index}'")
-            
-            
-            # Execute search
-            response = self.amazon_api.search_items(
-                keywords=keywords,
-                search_index=search_index,
-                item_count=item_count,
-                sort_by=sort_by,
-                min_price=min_price,
-                max_price=max_price,
-                browse_node_id=browse_node_id,  # Optional, can be used for more specific searches
-                availability=availability  # Optional filter for item availability
-            )
-            
-            # Parse response
-            if response.items and len(response.items) > 0:
-                return response
-            else:
-                logger.warning("No items found for the given search criteria")
-                return SearchResult(items=[], total_result_count=0, search_url="")
-            
+            # Build the request with the SDK helpers to choose the resources
+            paapi_arguments.check_search_args(**request_params)
+            request = paapi_requests.get_search_items_request(self.amazon_api, **request_params)
+            if RESOURCE_PROFILES[resources] is not None:
+                request.resources = RESOURCE_PROFILES[resources]
+
+            # Execute search (called directly: the SDK helper hides the HTTP status)
+            response = self.amazon_api.api.search_items(request, _request_timeout=self.request_timeout)
         except Exception as e:
-            logger.error(f"Search failed: {str(e)}")
-            return SearchResult(items=[], total_result_count=0, search_url="")
+            if isinstance(e, ApiException) and _error_code(e.body) in NO_RESULTS_CODES:
+                response = None
+            else:
+                error = classify_error(e)
+                self._handle_failure(error, 'searchitems')
+                raise error from e
+
+        # Parse response
+        result = response.search_result if response is not None else None
+        if result is not None and result.items:
+            return result
+        if response is not None and response.errors and not _is_no_results(response.errors):
+            logger.warning("Search answered with errors: %s", response.errors)
+        logger.warning("No items found for the given search criteria")
+        return SearchResult(items=[], total_result_count=0, search_url="")
     
     def get_items(self,
         item_asins: Union[str, List[str]],
-        languages_of_preference: List[str] = ['es']  # Default to Spanish
+        languages_of_preference: List[str] = ['es'],  # Default to Spanish
+        resources: Union[str, ResourceProfile] = ResourceProfile.DISCOVERY
     ) -> List[Item]:
         """
         Get specific items by ASIN.
+
+        Any number of ASINs is accepted: the ones not in the item store are
+        requested in GetItems batches of 10, one after another.
         
         Args:
             item_asins: Single ASIN or list of ASINs
+            resources: Resource profile to request (discovery, feed, price-refresh, full)
         
         Returns:
-            AmazonAPIResponse containing item details
+            AmazonAPIResponse containing item details, in input order. Invalid
+            ASINs and items not returned by Amazon are left out.
         """
+        profile = _resource_profile(resources)
+        item_asins = self._normalize_asins(item_asins)
+        found = self._items_from_store(item_asins, profile)
+        missing = [asin for asin in item_asins if asin not in found]
+        for chunk in _chunks(missing, self.GET_ITEMS_BATCH_SIZE):
+            found.update(self._call_upstream('getitems', self._get_and_store_items, chunk, languages_of_preference, profile))
+        return [found[asin] for asin in item_asins if asin in found]
+
+    def _get_and_store_items(
+        self,
+        item_asins: List[str],
+        languages_of_preference: List[str],
+        profile: ResourceProfile = ResourceProfile.DISCOVERY
+    ) -> Dict[str, Item]:
+        """Execute a GetItems request and write the items to the item store."""
+        items = self._get_items(item_asins, languages_of_preference, profile)
+        self._save_items(items, source_query='get_items', profile=profile)
+        return {item.asin: item for item in items}
+
+    def _get_items(
+        self,
+        item_asins: List[str],
+        languages_of_preference: List[str],
+        resources: ResourceProfile = ResourceProfile.DISCOVERY
+    ) -> List[Item]:
+        """
+        Execute a GetItems request once a rate limiter token is held.
+
+        Raises:
+            APIError: Typed error of the failed request. ASINs that do not
+            exist or are not accessible are left out, they are not an error.
+        """
+        logger.info("Getting items: %s", item_asins)
+
         try:
-            # Convert single ASIN to list
-            if isinstance(item_asins, str):
-                item_asins = [item_asins]
-            
-            # Limit to API maximum
-            item_asins = item_asins[:10]
-            
-            logger.info(f"Getting items: {item_asins}")
-            
-            
-            # Execute request
-            amazon_items = self.amazon_api.get_items(
-                items=item_asins,
-                # languages_of_preference=languages_of_preference
-            )
-            
-            if amazon_items and len(amazon_items) > 0:
-                return amazon_items
+            # Build the request with the SDK helpers to choose the resources
+            request = paapi_requests.get_items_request(self.amazon_api, item_asins)
+            if RESOURCE_PROFILES[resources] is not None:
+                request.resources = RESOURCE_PROFILES[resources]
+
+            # Execute request (called directly: the SDK helper hides the HTTP status)
+            response = self.amazon_api.api.get_items(request, _request_timeout=self.request_timeout)
+        except Exception as e:
+            if isinstance(e, ApiException) and _error_code(e.body) in NO_RESULTS_CODES:
+                response = None
             else:
-                logger.warning("No items found for the given ASINs")
+                error = classify_error(e)
+                self._handle_failure(error, 'getitems')
+                raise error from e
+
+        # Unavailable items come back without ASIN
+        result = response.items_result if response is not None else None
+        amazon_items = [item for item in (result.items or []) if item.asin] if result is not None else []
+        if not amazon_items:
+            logger.warning("No items found for the given ASINs")
+        return amazon_items
+    
+    
+    async def search_items_async(
+        self,
+        keywords: str,
+        search_index: Union[str, SearchIndex] = SearchIndex.ALL,
+        item_count: int = 10,
+        sort_by: SortBy = SortBy.RELEVANCE,
+        min_price: int = None,
+        max_price: int = None,
+        browse_node_id: Optional[str] = None,
+        availability: Optional[Availability] = Availability.AVAILABLE,
+        item_page: Optional[int] = None,
+        resources: Union[str, ResourceProfile] = ResourceProfile.DISCOVERY
+    ) -> SearchResult:
+        """
+        Async version of `search_items`.
+
+        The request runs in the client worker pool, so concurrent callers
+        overlap instead of blocking the event loop one after another. Waiting
+        for a rate limiter token happens on the event loop, so queued requests
+        do not hold worker threads. Identical concurrent searches share one
+        upstream request through the search cache.
+        """
+        params = dict(
+            keywords=keywords,
+            search_index=search_index,
+            item_count=item_count,
+            sort_by=sort_by,
+            min_price=min_price,
+            max_price=max_price,
+            browse_node_id=browse_node_id,
+            availability=availability,
+            item_page=item_page,
+            resources=_resource_profile(resources)
+        )
+
+        cache_key = self._search_cache_key(**params)
+
+        async def loader() -> SearchResult:
+            stored = await self._run_in_executor(self._search_from_store, cache_key, params['resources'])
+            if stored is not None:
+                return stored
+            # Stored once, after the call: a hedged request must not write its result twice
+            result = await self._call_upstream_async('searchitems', self._search_items, **params)
+            await self._run_in_executor(self._save_search, cache_key, params['keywords'], result, params['resources'])
+            return result
+
+        return await self.search_cache.get_or_load_async(
+            cache_key,
+            loader,
+            should_cache=_has_items,
+            sizeof=_estimate_size
+        )
+
+    async def get_items_async(
+        self,
+        item_asins: Union[str, List[str]],
+        languages_of_preference: List[str] = ['es'],
+        resources: Union[str, ResourceProfile] = ResourceProfile.DISCOVERY
+    ) -> List[Item]:
+        """
+        Async version of `get_items`, executed in the client worker pool.
+
+        The GetItems batches of 10 ASINs are dispatched in parallel (at most
+        `max_workers` at a time) and paced by the shared rate limiter.
+        """
+        profile = _resource_profile(resources)
+        item_asins = self._normalize_asins(item_asins)
+        found = await self._run_in_executor(self._items_from_store, item_asins, profile)
+        missing = [asin for asin in item_asins if asin not in found]
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def fetch_batch(chunk: List[str]) -> Dict[str, Item]:
+            async with semaphore:
+                items = await self._call_upstream_async(
+                    'getitems', self._get_items, chunk, languages_of_preference, profile
+                )
+            await self._run_in_executor(self._save_items, items, source_query='get_items', profile=profile)
+            return {item.asin: item for item in items}
+
+        batches = await asyncio.gather(*(
+            fetch_batch(chunk) for chunk in _chunks(missing, self.GET_ITEMS_BATCH_SIZE)
+        ))
+        for batch in batches:
+            found.update(batch)
+        return [found[asin] for asin in item_asins if asin in found]
+
+    @staticmethod
+    def _normalize_browse_node_ids(browse_node_ids: Union[str, List[str]]) -> List[str]:
+        """Strip and de-duplicate browse node ids, keeping their order."""
+        if isinstance(browse_node_ids, str):
+            browse_node_ids = [browse_node_ids]
+        return list(dict.fromkeys(str(node_id).strip() for node_id in browse_node_ids if str(node_id).strip()))
+
+    def _get_browse_nodes(self, browse_node_ids: List[str], languages_of_preference: Optional[List[str]]) -> List[Any]:
+        """
+        Execute a GetBrowseNodes request and add the nodes to the browse node index.
+
+        Raises:
+            APIError: Typed error of the failed request. Unknown ids are left out.
+        """
+        logger.info("Getting browse nodes: %s", browse_node_ids)
+        try:
+            request = paapi_requests.get_browse_nodes_request(
+                self.amazon_api,
+                browse_node_ids=browse_node_ids,
+                languages_of_preference=languages_of_preference
+            )
+            response = self.amazon_api.api.get_browse_nodes(request, _request_timeout=self.request_timeout)
+        except Exception as e:
+            if isinstance(e, ApiException) and _error_code(e.body) in NO_RESULTS_CODES:
                 return []
-            
+            error = classify_error(e)
+            self._handle_failure(error, 'getbrowsenodes')
+            raise error from e
+
+        result = response.browse_nodes_result
+        browse_nodes = [node for node in (result.browse_nodes or []) if node.id] if result is not None else []
+        browse_node_index.add_browse_nodes(browse_nodes, self.marketplace)
+        return browse_nodes
+
+    def get_browse_nodes(
+        self,
+        browse_node_ids: Union[str, List[str]],
+        languages_of_preference: Optional[List[str]] = None
+    ) -> List[Any]:
+        """
+        Get browse nodes (categories) with their ancestors and children.
+
+        The nodes are added to the process-wide browse node index, so they can
+        be browsed afterwards without calling Amazon.
+
+        Args:
+            browse_node_ids: Single id or list of browse node ids (requested in batches of 10).
+            languages_of_preference (List[str], optional): Languages of the node names.
+
+        Returns:
+            List[BrowseNode]: The nodes Amazon returned, unknown ids are left out.
+        """
+        browse_node_ids = self._normalize_browse_node_ids(browse_node_ids)
+        browse_nodes = []
+        for chunk in _chunks(browse_node_ids, self.GET_BROWSE_NODES_BATCH_SIZE):
+            browse_nodes.extend(self._call_upstream('getbrowsenodes', self._get_browse_nodes, chunk, languages_of_preference))
+        return browse_nodes
+
+    async def get_browse_nodes_async(
+        self,
+        browse_node_ids: Union[str, List[str]],
+        languages_of_preference: Optional[List[str]] = None
+    ) -> List[Any]:
+        """Async version of `get_browse_nodes`, executed in the client worker pool."""
+        browse_node_ids = self._normalize_browse_node_ids(browse_node_ids)
+        batches = await asyncio.gather(*(
+            self._call_upstream_async('getbrowsenodes', self._get_browse_nodes, chunk, languages_of_preference)
+            for chunk in _chunks(browse_node_ids, self.GET_BROWSE_NODES_BATCH_SIZE)
+        ))
+        return [node for batch in batches for node in batch]
+    
+    def index_products(
+        self,
+        records: List[ProductRecord],
+        search_index: Optional[Union[str, SearchIndex]] = None,
+        browse_node_id: Optional[str] = None
+    ) -> None:
+        """
+        Add products returned by a search to the local product index.
+
+        Index failures are logged and never fail the search.
+        """
+        if self.product_index is None or not records:
+            return
+        if isinstance(search_index, SearchIndex):
+            search_index = search_index.value
+        try:
+            self.product_index.add(records, search_index=search_index, browse_node_id=browse_node_id)
         except Exception as e:
-            logger.error(f"Get items failed: {str(e)}")
+            logger.warning("Product index write failed: %s", e)
+
+    async def index_products_async(self, records: List[ProductRecord], **kwargs: Any) -> None:
+        """Async version of `index_products`, executed in the client worker pool."""
+        if self.product_index is not None and records:
+            await self._run_in_executor(self.index_products, records, **kwargs)
+
+    def search_local(self, keywords: str, **filters: Any) -> List[ProductRecord]:
+        """
+        Search the local product index (no API call).
+
+        Args:
+            keywords (str): Words to look for.
+            filters: `ProductIndex.search` filters (limit, search_index, browse_node_id,
+                min_price, max_price, min_discount, only_with_ean, sort_by).
+
+        Returns:
+            List[ProductRecord]: Matching products, empty if the index is disabled or fails.
+        """
+        if self.product_index is None:
             return []
-    
+        if isinstance(filters.get('search_index'), SearchIndex):
+            filters['search_index'] = filters['search_index'].value
+        try:
+            with metrics.timer('amazon_local_search_seconds', marketplace=self.marketplace):
+                return self.product_index.search(keywords, **filters)
+        except Exception as e:
+            logger.warning("Product index search failed: %s", e)
+            return []
+
+    async def search_local_async(self, keywords: str, **filters: Any) -> List[ProductRecord]:
+        """Async version of `search_local`, executed in the client worker pool."""
+        if self.product_index is None:
+            return []
+        return await self._run_in_executor(self.search_local, keywords, **filters)
+
+    def _is_last_page(self, result: SearchResult, item_page: int) -> bool:
+        """Check whether a search page is the last one available."""
+        return (
+            len(result.items) < self.SEARCH_PAGE_SIZE
+            or item_page >= self.SEARCH_MAX_PAGES
+            or bool(result.total_result_count
+                    and item_page * self.SEARCH_PAGE_SIZE >= result.total_result_count)
+        )
+
+    def iter_search_pages(self, keywords: str, max_pages: int = SEARCH_MAX_PAGES, **search_params: Any) -> Iterator[SearchResult]:
+        """
+        Lazily iterate over the SearchItems result pages of a query.
+
+        Each page is requested only when the consumer asks for it, with the
+        maximum page size, so callers can stop as soon as they have enough
+        items. Iteration ends at the last available page or after `max_pages`.
+
+        Args:
+            keywords: Search keywords
+            max_pages: Maximum number of pages to request (1-10)
+            search_params: Other `search_items` parameters (except item_count/item_page)
+        """
+        for item_page in range(1, min(max_pages, self.SEARCH_MAX_PAGES) + 1):
+            result = self.search_items(
+                keywords=keywords,
+                item_count=self.SEARCH_PAGE_SIZE,
+                item_page=item_page,
+                **search_params
+            )
+            if not result.items:
+                return
+            yield result
+            if self._is_last_page(result, item_page):
+                return
+
+    async def iter_search_pages_async(self, keywords: str, max_pages: int = SEARCH_MAX_PAGES, **search_params: Any) -> AsyncIterator[SearchResult]:
+        """Async version of `iter_search_pages`."""
+        for item_page in range(1, min(max_pages, self.SEARCH_MAX_PAGES) + 1):
+            result = await self.search_items_async(
+                keywords=keywords,
+                item_count=self.SEARCH_PAGE_SIZE,
+                item_page=item_page,
+                **search_params
+            )
+            if not result.items:
+                return
+            yield result
+            if self._is_last_page(result, item_page):
+                return
     
     @classmethod
-    def get_instance(cls) -> 'AmazonPAAPI':
-        """Get singleton instance."""
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._instance
+    def get_instance(cls, marketplace: Optional[str] = None) -> 'AmazonPAAPI':
+        """Get the singleton instance of a marketplace (default one if not given)."""
+        return cls(marketplace)
+
+    @classmethod
+    def pool(cls) -> Dict[str, 'AmazonPAAPI']:
+        """Initialized clients by marketplace code."""
+        with cls._instance_lock:
+            return {code: client for code, client in cls._instances.items() if client._initialized}
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Close every initialized client of the pool."""
+        for client in cls.pool().values():
+            client.close()
     
+    def close(self) -> None:
+        """
+        Release the client on shutdown: wait for the PA-API calls in flight,
+        drop the queued ones and close the item store and the product index.
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self.item_store is not None:
+            self.item_store.close()
+        if self.product_index is not None:
+            self.product_index.close()
+        logger.info("Amazon PA-API client closed")
+
     def reload_credentials(self) -> None:
         """Reload credentials and reinitialize API."""
+        import dotenv
         logger.info("Reloading Amazon API credentials")
         dotenv.load_dotenv(override=True)
         self._load_credentials()
         self._validate_credentials()
         self._initialize_api()
+        self._initialize_rate_limiter()
+        self.search_cache.clear()
         logger.info("Amazon API credentials reloaded successfully")
 
 
@@ -0,0 +1,358 @@
+"""
+Process-wide metrics for the Amazon PA-API client and the MCP tools.
+Latency histograms per stage (signing, HTTP round trip, SDK deserialization,
+transform, MCP serialization), counters (throttles, errors, dropped items) and
+upstream calls per tool invocation, readable as a dict or as Prometheus text.
+"""
+
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds (PA-API round trips are usually 0.1-2 s)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upstream PA-API calls made by one tool invocation
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _plain_labels(labels: LabelKey) -> str:
+    return ",".join(f"{name}={value}" for name, value in labels)
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative bucket histogram with count and sum (Prometheus semantics)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> List[int]:
+        total = 0
+        cumulative = []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when empty or above the last bucket)."""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        for bound, cumulative in zip(self.buckets, self.cumulative_counts()):
+            if cumulative >= target:
+                return bound
+        return None
+
+
+class ToolInvocation:
+    """Per tool call accounting, shared with the worker threads through a ContextVar."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.upstream_calls = 0
+        self.tool_seconds: Optional[float] = None
+        # Seconds spent waiting for a tool slot and for rate limiter tokens
+        self.queue_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_upstream_call(self) -> None:
+        with self._lock:
+            self.upstream_calls += 1
+
+    def add_queue_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.queue_seconds += seconds
+
+
+_current_invocation: contextvars.ContextVar[Optional[ToolInvocation]] = contextvars.ContextVar(
+    "amazon_tool_invocation", default=None
+)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of counters and histograms.
+
+    Collectors are callables returning extra (name, labels, value, type) samples
+    at read time, used for state owned by other objects (cache, rate limiter).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: Dict[str, Callable[[], List[Tuple[str, Dict[str, Any], float, str]]]] = {}
+
+    def describe(self, name: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None) -> None:
+        """Set the help text (and the histogram buckets) of a metric."""
+        with self._lock:
+            self._help[name] = help_text
+            if buckets is not None:
+                self._buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increase a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a value in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Time the enclosed block into a histogram (also when it raises)."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+    def register_collector(self, name: str, collector: Callable[[], List[Tuple[str, Dict[str, Any], float, str]]]) -> None:
+        """Register (or replace) a collector of (metric, labels, value, 'counter'|'gauge') samples."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    # ------------------------------------------------------------------ #
+    # Tool invocations
+    # ------------------------------------------------------------------ #
+
+    @contextmanager
+    def tool_invocation(self, tool: str) -> Iterator[ToolInvocation]:
+        """
+        Account one MCP tool call: total latency, MCP serialization time and
+        upstream PA-API calls made while it runs.
+        """
+        invocation = ToolInvocation(tool)
+        token = _current_invocation.set(invocation)
+        started_at = time.perf_counter()
+        failed = False
+        try:
+            yield invocation
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            _current_invocation.reset(token)
+            self.observe('mcp_tool_seconds', elapsed, tool=tool)
+            self.observe('mcp_tool_upstream_calls', invocation.upstream_calls, tool=tool)
+            self.observe('mcp_tool_queue_seconds', invocation.queue_seconds, tool=tool)
+            self.inc('mcp_tool_calls_total', tool=tool, status='error' if failed else 'ok')
+            if invocation.tool_seconds is not None:
+                self.observe('mcp_stage_seconds', invocation.tool_seconds, stage='tool', tool=tool)
+                self.observe(
+                    'mcp_stage_seconds', max(elapsed - invocation.tool_seconds, 0.0),
+                    stage='serialize', tool=tool
+                )
+
+    @contextmanager
+    def tool_body(self) -> Iterator[None]:
+        """Time the body of a tool function inside the current invocation."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            invocation = _current_invocation.get()
+            if invocation is not None:
+                invocation.tool_seconds = time.perf_counter() - started_at
+
+    def timed_tool(self, func: Callable) -> Callable:
+        """Wrap a tool function (sync or async) so its body is timed by tool_body()."""
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.tool_body():
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with self.tool_body():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def add_upstream_call(self) -> None:
+        """Count one upstream PA-API call for the current tool invocation (if any)."""
+        invocation = _current_invocation.get()
+        if invocation is not None:
+            invocation.add_upstream_call()
+
+    def current_invocation(self) -> Optional[ToolInvocation]:
+        """The tool invocation of the current context (None outside a tool call)."""
+        return _current_invocation.get()
+
+    @contextmanager
+    def detached_invocation(self) -> Iterator[None]:
+        """Run the enclosed block outside the current tool invocation (its upstream calls are not counted)."""
+        token = _current_invocation.set(None)
+        try:
+            yield
+        finally:
+            _current_invocation.reset(token)
+
+    def add_queue_wait(self, seconds: float) -> None:
+        """Add queue wait time (tool slot or rate limiter token) to the current tool invocation (if any)."""
+        invocation = _current_invocation.get()
+        if invocation is not None:
+            invocation.add_queue_wait(seconds)
+
+    # ------------------------------------------------------------------ #
+    # Export
+    # ------------------------------------------------------------------ #
+
+    def _collect(self) -> List[Tuple[str, Dict[str, Any], float, str]]:
+        samples = []
+        with self._lock:
+            collectors = list(self._collectors.values())
+        for collector in collectors:
+            try:
+                samples.extend(collector())
+            except Exception:
+                continue  # A broken collector must not break the metrics endpoint
+        return samples
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return every metric as plain data.
+
+        Returns:
+            Dict: {'counters': {...}, 'histograms': {...}, 'gauges': {...}} keyed by metric
+            name and then by a 'label=value,...' string (e.g. 'operation=searchitems,stage=http').
+        """
+        collected = self._collect()
+        with self._lock:
+            counters = {
+                name: {_plain_labels(key): value for key, value in series.items()}
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: {
+                    _plain_labels(key): {
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'avg': histogram.sum / histogram.count if histogram.count else None,
+                        'p50': histogram.quantile(0.5),
+                        'p95': histogram.quantile(0.95),
+                        'p99': histogram.quantile(0.99),
+                    }
+                    for key, histogram in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+        gauges: Dict[str, Dict[str, float]] = {}
+        for name, labels, value, metric_type in collected:
+            target = counters if metric_type == 'counter' else gauges
+            target.setdefault(name, {})[_plain_labels(_label_key(labels))] = value
+        return {'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        collected = self._collect()
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(lines, name, 'counter')
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, histogram_series in sorted(self._histograms.items()):
+                self._header(lines, name, 'histogram')
+                for key, histogram in histogram_series.items():
+                    for bound, cumulative in zip(histogram.buckets, histogram.cumulative_counts()):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', repr(float(bound))))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+            declared = set()
+            for name, labels, value, metric_type in collected:
+                if name not in declared:
+                    self._header(lines, name, metric_type)
+                    declared.add(name)
+                lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, metric_type: str) -> None:
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    def reset(self) -> None:
+        """Drop every recorded counter and histogram (collectors are kept)."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
+
+metrics.describe('amazon_paapi_stage_seconds', "Time spent per PA-API call stage (sign, http, deserialize).")
+metrics.describe('amazon_paapi_warmup_seconds', "Time spent opening the PA-API connection in the background at startup.")
+metrics.describe('amazon_paapi_requests_total', "Upstream PA-API HTTP requests by operation and status.")
+metrics.describe('amazon_paapi_throttled_total', "PA-API requests answered with TooManyRequests.")
+metrics.describe('amazon_paapi_errors_total', "Failed PA-API requests by operation and reason.")
+metrics.describe('amazon_paapi_retries_total', "PA-API requests retried after a throttled, 5xx or network failure.")
+metrics.describe('amazon_paapi_hedged_total', "Hedged PA-API reads by outcome (primary_won, hedge_won, no_token).")
+metrics.describe('amazon_circuit_open', "1 while the PA-API circuit breaker of a marketplace is open or half-open.")
+metrics.describe('amazon_circuit_rejected_total', "PA-API calls rejected by an open circuit breaker.")
+metrics.describe('amazon_circuit_opened_total', "Times the PA-API circuit breaker opened.")
+metrics.describe('amazon_browse_nodes_indexed', "Browse nodes (categories) known to the process-wide index, by marketplace.")
+metrics.describe('amazon_browse_node_path_lookups_total', "Category path lookups of the browse node index by result (hit/miss).")
+metrics.describe('amazon_item_store_lookups_total', "Item store lookups of searches and items by result (hit/miss).")
+metrics.describe('amazon_local_search_seconds', "Time spent searching the local product index.")
+metrics.describe('amazon_local_search_total', "Searches served from the local product index by source mode and result (hit, partial, miss).")
+metrics.describe('amazon_price_refresh_items_total', "Tracked products polled by the price refresh, by result (changed, unchanged, baseline, failed).")
+metrics.describe('amazon_price_refresh_tracked', "Products tracked by the price refresh, by marketplace.")
+metrics.describe('amazon_price_refresh_due', "Tracked products due for a price refresh poll, by marketplace.")
+metrics.describe('amazon_admission_wait_seconds', "Time PA-API calls waited for a rate limiter token, by priority class.")
+metrics.describe('amazon_admission_queue_depth', "PA-API calls waiting for a rate limiter token, by priority class.")
+metrics.describe('amazon_admission_shed_total', "PA-API calls shed by admission control, by priority class and reason (queue_full, deadline, timeout).")
+metrics.describe('amazon_transform_seconds', "Time spent converting PA-API items into product records.")
+metrics.describe('amazon_items_dropped_total', "Items dropped by tool filters (e.g. only_with_ean).")
+metrics.describe('mcp_tool_seconds', "Total MCP tool call latency, including result serialization.")
+metrics.describe('mcp_stage_seconds', "MCP tool call time split into the tool body and the MCP layer (argument validation and result serialization).")
+metrics.describe('mcp_tool_queue_seconds', "Time MCP tool calls waited for a tool slot and for PA-API rate limiter tokens.")
+metrics.describe('mcp_tool_calls_total', "MCP tool calls by tool and status.")
+metrics.describe('mcp_tool_upstream_calls', "Upstream PA-API calls per MCP tool call.", buckets=CALL_COUNT_BUCKETS)
@@ -1,14 +1,71 @@
 from enum import Enum
 from dataclasses import dataclass
-from typing import List, Optional, Any
+from typing import Dict, List, NamedTuple, Optional, Any, Tuple
 
 class APIError(Exception):
-    """Custom exception class for Amazon API errors."""
-    def __init__(self, message: str, error_code: Optional[str] = None):
+    """
+    Custom exception class for Amazon API errors.
+
+    Subclasses tell apart the failures worth retrying (throttling, upstream
+    5xx, network) from the ones that will fail again (invalid request,
+    credentials).
+
+    Args:
+        message (str): Error description.
+        error_code (str, optional): PA-API error code (e.g. "TooManyRequests").
+        status (int, optional): HTTP status of the upstream answer.
+        retry_after (float, optional): Seconds after which a new attempt makes sense.
+    """
+    retryable = False
+
+    def __init__(
+        self,
+        message: str,
+        error_code: Optional[str] = None,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
         self.message = message
         self.error_code = error_code
+        self.status = status
+        self.retry_after = retry_after
         super().__init__(self.message)
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Error summary for tool results."""
+        return {
+            'type': type(self).__name__,
+            'message': self.message,
+            'error_code': self.error_code,
+            'retryable': self.retryable,
+            'retry_after': self.retry_after,
+        }
+
+class ThrottledError(APIError):
+    """PA-API answered TooManyRequests (HTTP 429): the quota is exhausted for now."""
+    retryable = True
+
+class UpstreamError(APIError):
+    """PA-API failed on its side (HTTP 5xx)."""
+    retryable = True
+
+class NetworkError(APIError):
+    """The request did not get an answer (connection error or timeout)."""
+    retryable = True
+
+class InvalidRequestError(APIError):
+    """PA-API rejected the request parameters (HTTP 4xx other than throttling and credentials)."""
+
+class AuthenticationError(APIError):
+    """Credentials, signature or associate tag not valid for the marketplace."""
+
+class CircuitOpenError(APIError):
+    """Rejected without calling PA-API because the upstream is failing (circuit breaker open)."""
+
+class OverloadedError(APIError):
+    """Shed by admission control: the queue of the call's priority class is full or too slow."""
+    retryable = True
+
 class SearchIndex(Enum):
     """Amazon search categories enum for better type safety."""
     ALL= "All"
@@ -51,6 +108,61 @@ class SearchIndex(Enum):
     VIDEO_GAMES = "VideoGames"
     WATCHES = "Watches"
 
+class ResourceProfile(Enum):
+    """Named sets of PA-API resources, so each call only downloads what it uses."""
+    DISCOVERY = "discovery"          # Fields used by the search/get tools
+    FEED = "feed"                    # Discovery fields + offer availability for Merchant feeds
+    PRICE_REFRESH = "price-refresh"  # Offer prices and availability only
+    FULL = "full"                    # Every resource (SDK default)
+
+_DISCOVERY_RESOURCES = [
+    "ItemInfo.Title",
+    "ItemInfo.Features",
+    "ItemInfo.ByLineInfo",
+    "ItemInfo.ExternalIds",
+    "Images.Primary.Large",
+    "Offers.Listings.Price",
+    "Offers.Listings.SavingBasis",
+    "BrowseNodeInfo.BrowseNodes",
+    "BrowseNodeInfo.BrowseNodes.Ancestor",
+]
+
+# None means the full resource set of the SDK
+RESOURCE_PROFILES: Dict[ResourceProfile, Optional[List[str]]] = {
+    ResourceProfile.DISCOVERY: _DISCOVERY_RESOURCES,
+    ResourceProfile.FEED: _DISCOVERY_RESOURCES + [
+        "Offers.Listings.Availability.Type",
+    ],
+    ResourceProfile.PRICE_REFRESH: [
+        "Offers.Listings.Price",
+        "Offers.Listings.SavingBasis",
+        "Offers.Listings.Availability.Type",
+    ],
+    ResourceProfile.FULL: None,
+}
+
+# How much item data each profile covers: a stored item can answer a request
+# made with a profile of the same or lower rank
+RESOURCE_PROFILE_RANK: Dict[ResourceProfile, int] = {
+    ResourceProfile.PRICE_REFRESH: 0,
+    ResourceProfile.DISCOVERY: 1,
+    ResourceProfile.FEED: 2,
+    ResourceProfile.FULL: 3,
+}
+
+@dataclass
+class SearchSpec:
+    """Parameters of one search inside a bulk search (prices in the marketplace currency)."""
+    keywords: str
+    search_index: str = SearchIndex.ALL.value
+    sort_by: str = "Relevance"
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    item_count: int = 10
+    browse_node_id: Optional[str] = None
+    availability: str = "Available"
+    marketplace: Optional[str] = None
+
 @dataclass
 class PrettyCategoryModel:
     name: str
@@ -127,4 +239,81 @@ class AmazonProductPrettyResponse:
             lines.append(f"Description: {self.description}")
         
         return " | ".join(lines)
-    
+
+
+class CategoryRef(NamedTuple):
+    """A browse node of a category path (tuple-backed, shared between records)."""
+    name: str
+    id: str
+
+@dataclass(slots=True)
+class ProductRecord:
+    """
+    Compact product record produced by libs.amazon.extractor.
+
+    Same fields as AmazonProductPrettyResponse, stored in __slots__ with the
+    categories and EANs as tuples, so thousands of records stay cheap to build
+    and hold in memory.
+    """
+    asin: str
+    title: str
+    affiliate_link: str
+    price: Optional[float]
+    old_price: float
+    image_url: Optional[str]
+    description: str
+    brand: Optional[str]
+    discount: float
+    categories: Tuple[CategoryRef, ...]
+    eans: Tuple[str, ...]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same dictionary as AmazonProductPrettyResponse.to_dict()."""
+        return {
+            'title': self.title,
+            'asin': self.asin,
+            'affiliate_link': self.affiliate_link,
+            'price': self.price,
+            'old_price': self.old_price,
+            'image_url': self.image_url,
+            'description': self.description,
+            'features': "",
+            'brand': self.brand,
+            'discount': self.discount,
+            'categories': [{'name': name, 'id': node_id} for name, node_id in self.categories],
+            'eans': list(self.eans),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ProductRecord':
+        """Rebuild a record from its to_dict() output."""
+        return cls(
+            asin=data.get('asin') or "",
+            title=data.get('title') or "",
+            affiliate_link=data.get('affiliate_link') or "",
+            price=data.get('price'),
+            old_price=data.get('old_price') or 0,
+            image_url=data.get('image_url'),
+            description=data.get('description') or "",
+            brand=data.get('brand'),
+            discount=data.get('discount') or 0,
+            categories=tuple(CategoryRef(category['name'], category['id']) for category in data.get('categories') or []),
+            eans=tuple(data.get('eans') or ())
+        )
+
+    def to_pretty(self) -> AmazonProductPrettyResponse:
+        """Convert to the AmazonProductPrettyResponse dataclass."""
+        return AmazonProductPrettyResponse(
+            title=self.title,
+            asin=self.asin,
+            affiliate_link=self.affiliate_link,
+            price=self.price,
+            old_price=self.old_price,
+            image_url=self.image_url,
+            description=self.description,
+            features="",
+            brand=self.brand,
+            discount=self.discount,
+            categories=[PrettyCategoryModel(name=name, id=node_id) for name, node_id in self.categories],
+            eans=list(self.eans)
+        )
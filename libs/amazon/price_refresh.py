@@ -0,0 +1,708 @@
+"""
+Incremental price and availability refresh of tracked products.
+
+Products published in a feed are tracked by ASIN with the offer they were
+published with (price, sale price and availability). A refresh re-polls the
+tracked products that are due with GetItems batches of the price-only
+resource profile, compares each answer with the last snapshot and records
+only the products whose offer changed, so the feed is updated with a
+supplemental feed of the changed rows instead of re-running every search.
+
+Polling is adaptive: a product whose offer did not change waits twice as
+long before its next poll (up to `max_interval`), one that changed is polled
+again after `min_interval`. Stable products settle at one poll every
+`max_interval` and the rest of the quota goes to the products that move.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Project root (/app inside the Docker image)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_REFRESH_PATH = os.path.join(PROJECT_ROOT, "data", "amazon_price_refresh.sqlite3")
+
+# GetItems accepts at most 10 ASINs: a due batch is topped up to 10 with the products due next
+REFRESH_BATCH_SIZE = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+    marketplace TEXT NOT NULL,
+    asin TEXT NOT NULL,
+    price REAL,
+    sale_price REAL,
+    availability TEXT,
+    checked_at REAL,
+    changed_at REAL,
+    next_check_at REAL NOT NULL,
+    interval REAL NOT NULL,
+    PRIMARY KEY (marketplace, asin)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS offers_next_check ON offers (marketplace, next_check_at);
+CREATE TABLE IF NOT EXISTS tracked (
+    feed TEXT NOT NULL,
+    marketplace TEXT NOT NULL,
+    asin TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (feed, marketplace, asin)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tracked_product ON tracked (marketplace, asin);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    marketplace TEXT NOT NULL,
+    asin TEXT NOT NULL,
+    price REAL,
+    sale_price REAL,
+    availability TEXT,
+    previous_price REAL,
+    previous_sale_price REAL,
+    previous_availability TEXT,
+    detected_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_detected ON changes (detected_at);
+"""
+
+# Google Merchant Center availability of each PA-API listing availability type
+AVAILABILITY_TYPES = {
+    'Now': "in_stock",
+    'Preorder': "preorder",
+    'Backorder': "backorder",
+}
+IN_STOCK = "in_stock"
+OUT_OF_STOCK = "out_of_stock"
+
+
+class OfferSnapshot(NamedTuple):
+    """Published offer of a product: regular price, sale price (None without a deal) and availability."""
+    price: Optional[float]
+    sale_price: Optional[float]
+    availability: str
+
+
+def offer_prices(price: Optional[float], old_price: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Regular and sale price of an offer.
+
+    With a saving basis above the current price, the saving basis is the
+    regular price and the current price the sale price.
+    """
+    if price and old_price and old_price > price:
+        return old_price, price
+    return price or None, None
+
+
+def offer_snapshot(item: Any) -> OfferSnapshot:
+    """
+    Offer of a PA-API Item (its first listing), read by attribute.
+
+    An item without a priced listing is out of stock; a priced listing
+    without availability type is in stock, like the Merchant feed rows.
+    """
+    offers = item.offers if item is not None else None
+    listing = offers.listings[0] if offers is not None and offers.listings else None
+    if listing is None or listing.price is None or not listing.price.amount:
+        return OfferSnapshot(None, None, OUT_OF_STOCK)
+    saving_basis = listing.saving_basis
+    price, sale_price = offer_prices(listing.price.amount, saving_basis.amount if saving_basis is not None else None)
+    availability = listing.availability.type if listing.availability is not None else None
+    return OfferSnapshot(price, sale_price, AVAILABILITY_TYPES.get(availability, IN_STOCK) if availability else IN_STOCK)
+
+
+def _cents(amount: Optional[float]) -> Optional[int]:
+    return round(amount * 100) if amount else None
+
+
+def _changed_fields(previous: OfferSnapshot, current: OfferSnapshot) -> List[str]:
+    changed = []
+    if _cents(previous.price) != _cents(current.price):
+        changed.append('price')
+    if _cents(previous.sale_price) != _cents(current.sale_price):
+        changed.append('sale_price')
+    if previous.availability != current.availability:
+        changed.append('availability')
+    return changed
+
+
+class PriceRefresher:
+    """
+    SQLite-backed set of tracked products with their last offer snapshot.
+
+    Products are tracked per feed (any name, usually the Merchant feed name)
+    and marketplace. A product tracked by several feeds is polled once. Every
+    detected change is appended to a change log; readers page through it with
+    the id of the last change they saw, so a scheduled refresh and the tool
+    calls that read its results do not need to run together.
+
+    Settings are read on first use, after the server has loaded its .env.
+
+    Args:
+        path (str, optional): SQLite database file path (default is AMAZON_PRICE_REFRESH_PATH
+            or data/amazon_price_refresh.sqlite3; 'off' disables tracking).
+        min_interval (float, optional): Seconds before re-polling a product whose offer
+            changed (default is AMAZON_PRICE_REFRESH_MIN_INTERVAL or 1 hour).
+        max_interval (float, optional): Longest wait between two polls of a stable product
+            (default is AMAZON_PRICE_REFRESH_MAX_INTERVAL or 24 hours, the maximum age of a
+            price shown under the Associates program policies).
+        max_items (int, optional): Products polled per marketplace and refresh
+            (default is AMAZON_PRICE_REFRESH_MAX_ITEMS or 1000).
+        changes_ttl (float, optional): Seconds changes are kept in the change log
+            (default is AMAZON_PRICE_REFRESH_CHANGES_TTL or 7 days).
+    """
+
+    DEFAULT_MIN_INTERVAL = 3600.0
+    DEFAULT_MAX_INTERVAL = 24 * 3600.0
+    DEFAULT_MAX_ITEMS = 1000
+    DEFAULT_CHANGES_TTL = 7 * 24 * 3600.0
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        max_items: Optional[int] = None,
+        changes_ttl: Optional[float] = None
+    ):
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_items = max_items
+        self.changes_ttl = changes_ttl
+        self._configured = False
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _configure(self) -> None:
+        if self._configured:
+            return
+        if self.path is None:
+            self.path = os.getenv('AMAZON_PRICE_REFRESH_PATH', DEFAULT_REFRESH_PATH)
+        if self.min_interval is None:
+            self.min_interval = float(os.getenv('AMAZON_PRICE_REFRESH_MIN_INTERVAL', self.DEFAULT_MIN_INTERVAL))
+        if self.max_interval is None:
+            self.max_interval = float(os.getenv('AMAZON_PRICE_REFRESH_MAX_INTERVAL', self.DEFAULT_MAX_INTERVAL))
+        self.max_interval = max(self.max_interval, self.min_interval)
+        if self.max_items is None:
+            self.max_items = int(os.getenv('AMAZON_PRICE_REFRESH_MAX_ITEMS', self.DEFAULT_MAX_ITEMS))
+        if self.changes_ttl is None:
+            self.changes_ttl = float(os.getenv('AMAZON_PRICE_REFRESH_CHANGES_TTL', self.DEFAULT_CHANGES_TTL))
+        self._configured = True
+
+    @property
+    def enabled(self) -> bool:
+        self._configure()
+        return bool(self.path) and self.path.lower() not in ('off', 'none')
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Open the database on first use (lock must be held)."""
+        if self._connection is None:
+            if not self.enabled:
+                raise ValueError("Price refresh is disabled (AMAZON_PRICE_REFRESH_PATH is off).")
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    # ------------------------------------------------------------------ #
+    # Tracked set
+    # ------------------------------------------------------------------ #
+
+    def track(
+        self,
+        feed: str,
+        marketplace: str,
+        products: Iterable[Union[str, Tuple[str, OfferSnapshot]]]
+    ) -> int:
+        """
+        Track products of a feed.
+
+        Products given with the offer they were published with are first
+        polled after `min_interval`; bare ASINs are polled on the next
+        refresh, which records their offer without reporting it as a change.
+
+        Args:
+            feed (str): Feed (or any list) name.
+            marketplace (str): Marketplace of the products.
+            products: ASINs, or (asin, OfferSnapshot) pairs.
+
+        Returns:
+            int: Number of products the feed was not tracking yet.
+        """
+        now = time.time()
+        added = 0
+        with self._lock:
+            connection = self.connection
+            with connection:
+                for product in products:
+                    asin, snapshot = product if isinstance(product, tuple) else (product, None)
+                    if not asin:
+                        continue
+                    if snapshot is None:
+                        connection.execute(
+                            "INSERT OR IGNORE INTO offers (marketplace, asin, next_check_at, interval) VALUES (?, ?, ?, ?)",
+                            (marketplace, asin, now, self.min_interval)
+                        )
+                    else:
+                        # A published offer is the new baseline, whatever was polled before
+                        connection.execute(
+                            "INSERT OR REPLACE INTO offers (marketplace, asin, price, sale_price, availability, "
+                            "checked_at, changed_at, next_check_at, interval) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (marketplace, asin, snapshot.price, snapshot.sale_price, snapshot.availability,
+                             now, now, now + self.min_interval, self.min_interval)
+                        )
+                    added += connection.execute(
+                        "INSERT OR IGNORE INTO tracked (feed, marketplace, asin, added_at) VALUES (?, ?, ?, ?)",
+                        (feed, marketplace, asin, now)
+                    ).rowcount
+        return added
+
+    def untrack(self, feed: str, marketplace: Optional[str] = None, asins: Optional[Iterable[str]] = None) -> int:
+        """
+        Stop tracking products of a feed (all of them without `asins`).
+
+        Products no other feed tracks are no longer polled.
+
+        Returns:
+            int: Number of products removed from the feed.
+        """
+        conditions = ["feed = ?"]
+        parameters: List[Any] = [feed]
+        if marketplace:
+            conditions.append("marketplace = ?")
+            parameters.append(marketplace)
+        with self._lock:
+            connection = self.connection
+            with connection:
+                if asins is None:
+                    removed = connection.execute(f"DELETE FROM tracked WHERE {' AND '.join(conditions)}", parameters).rowcount
+                else:
+                    removed = 0
+                    for asin in asins:
+                        removed += connection.execute(
+                            f"DELETE FROM tracked WHERE {' AND '.join(conditions)} AND asin = ?", parameters + [asin]
+                        ).rowcount
+                connection.execute(
+                    "DELETE FROM offers WHERE NOT EXISTS (SELECT 1 FROM tracked t "
+                    "WHERE t.marketplace = offers.marketplace AND t.asin = offers.asin)"
+                )
+        return removed
+
+    # ------------------------------------------------------------------ #
+    # Refresh
+    # ------------------------------------------------------------------ #
+
+    def plan(
+        self,
+        marketplace: Optional[str] = None,
+        feed: Optional[str] = None,
+        force: bool = False,
+        limit: Optional[int] = None
+    ) -> Dict[str, List[List[str]]]:
+        """
+        GetItems batches of the products due for a poll, per marketplace.
+
+        The products whose next poll time has passed (every tracked product
+        with force=True) go first, oldest first, up to `limit` per
+        marketplace. The last batch is topped up to REFRESH_BATCH_SIZE with
+        the products due next: a GetItems request costs the same for 1 or 10
+        ASINs.
+
+        Args:
+            marketplace (str, optional): Only this marketplace.
+            feed (str, optional): Only the products of this feed.
+            force (bool): Poll every product, due or not.
+            limit (int, optional): Products per marketplace (default is `max_items`).
+
+        Returns:
+            Dict[str, List[List[str]]]: Marketplace -> batches of ASINs.
+        """
+        self._configure()
+        limit = self.max_items if limit is None else limit
+        now = time.time()
+        scope = ["1 = 1"]
+        scope_parameters: List[Any] = []
+        if feed:
+            scope.append(
+                "EXISTS (SELECT 1 FROM tracked t WHERE t.feed = ? AND t.marketplace = o.marketplace AND t.asin = o.asin)"
+            )
+            scope_parameters.append(feed)
+        plan: Dict[str, List[List[str]]] = {}
+        with self._lock:
+            connection = self.connection
+            if marketplace:
+                marketplaces = [marketplace]
+            else:
+                marketplaces = [mp for (mp,) in connection.execute("SELECT DISTINCT marketplace FROM offers")]
+            for mp in marketplaces:
+                where = " AND ".join(scope + ["o.marketplace = ?"])
+                due_condition = "" if force else " AND o.next_check_at <= ?"
+                due = [asin for (asin,) in connection.execute(
+                    f"SELECT o.asin FROM offers o WHERE {where}{due_condition} ORDER BY o.next_check_at LIMIT ?",
+                    scope_parameters + [mp] + ([] if force else [now]) + [int(limit)]
+                )]
+                if not due:
+                    continue
+                padding = -len(due) % REFRESH_BATCH_SIZE
+                if padding and not force:
+                    due.extend(asin for (asin,) in connection.execute(
+                        f"SELECT o.asin FROM offers o WHERE {where} AND o.next_check_at > ? "
+                        f"ORDER BY o.next_check_at LIMIT ?",
+                        scope_parameters + [mp, now, padding]
+                    ))
+                plan[mp] = [due[start:start + REFRESH_BATCH_SIZE] for start in range(0, len(due), REFRESH_BATCH_SIZE)]
+        return plan
+
+    def record(self, marketplace: str, asins: List[str], items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """
+        Compare a GetItems answer with the snapshots and record what changed.
+
+        ASINs of the batch that Amazon did not return are out of stock (their
+        last price is kept). Each product is scheduled again: after
+        `min_interval` if it changed, after twice its last interval (up to
+        `max_interval`) if not.
+
+        Args:
+            marketplace (str): Marketplace of the request.
+            asins (List[str]): ASINs requested.
+            items: PA-API Items returned (price-only profile is enough).
+
+        Returns:
+            List[Dict]: The changes (see `changes`), in request order.
+        """
+        self._configure()
+        current = {asin: OfferSnapshot(None, None, OUT_OF_STOCK) for asin in asins}
+        for item in items:
+            if item.asin in current:
+                current[item.asin] = offer_snapshot(item)
+        now = time.time()
+        recorded: List[Dict[str, Any]] = []
+        counts = {'changed': 0, 'unchanged': 0, 'baseline': 0}
+        with self._lock:
+            connection = self.connection
+            with connection:
+                for asin, snapshot in current.items():
+                    row = connection.execute(
+                        "SELECT price, sale_price, availability, interval FROM offers WHERE marketplace = ? AND asin = ?",
+                        (marketplace, asin)
+                    ).fetchone()
+                    if row is None:
+                        continue  # Untracked while it was being polled
+                    price, sale_price, availability, interval = row
+                    if availability is None:
+                        result, changed = 'baseline', []
+                    else:
+                        if snapshot.availability == OUT_OF_STOCK and snapshot.price is None:
+                            # Keep the last price: Merchant still needs one for an out of stock row
+                            snapshot = OfferSnapshot(price, sale_price, OUT_OF_STOCK)
+                        previous = OfferSnapshot(price, sale_price, availability)
+                        changed = _changed_fields(previous, snapshot)
+                        result = 'changed' if changed else 'unchanged'
+                    counts[result] += 1
+                    interval = min(interval * 2, self.max_interval) if result == 'unchanged' else self.min_interval
+                    connection.execute(
+                        "UPDATE offers SET price = ?, sale_price = ?, availability = ?, checked_at = ?, "
+                        "changed_at = CASE WHEN ? THEN ? ELSE changed_at END, next_check_at = ?, interval = ? "
+                        "WHERE marketplace = ? AND asin = ?",
+                        (snapshot.price, snapshot.sale_price, snapshot.availability, now,
+                         bool(changed), now, now + interval, interval, marketplace, asin)
+                    )
+                    if not changed:
+                        continue
+                    cursor = connection.execute(
+                        "INSERT INTO changes (marketplace, asin, price, sale_price, availability, previous_price, "
+                        "previous_sale_price, previous_availability, detected_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (marketplace, asin, snapshot.price, snapshot.sale_price, snapshot.availability,
+                         price, sale_price, availability, now)
+                    )
+                    recorded.append(self._change(
+                        cursor.lastrowid, marketplace, asin, snapshot, OfferSnapshot(price, sale_price, availability), now
+                    ))
+        for result, count in counts.items():
+            if count:
+                metrics.inc('amazon_price_refresh_items_total', count, result=result, marketplace=marketplace)
+        return recorded
+
+    @staticmethod
+    def _change(
+        change_id: int,
+        marketplace: str,
+        asin: str,
+        current: OfferSnapshot,
+        previous: OfferSnapshot,
+        detected_at: float
+    ) -> Dict[str, Any]:
+        return {
+            'cursor': change_id,
+            'marketplace': marketplace,
+            'asin': asin,
+            'price': current.price,
+            'sale_price': current.sale_price,
+            'availability': current.availability,
+            'changed': _changed_fields(previous, current),
+            'previous': previous._asdict(),
+            'detected_at': detected_at,
+        }
+
+    def _fetch_failed(self, marketplace: str, batch: List[str], error: BaseException) -> None:
+        logger.warning("Price refresh of %d %s products failed: %s", len(batch), marketplace, error)
+        metrics.inc('amazon_price_refresh_items_total', len(batch), result='failed', marketplace=marketplace)
+
+    def refresh(
+        self,
+        marketplace: Optional[str] = None,
+        feed: Optional[str] = None,
+        force: bool = False,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Poll the products due and record their changes (blocking, one batch after another).
+
+        Failed batches stay due and are polled again on the next refresh;
+        an open circuit breaker or a batch shed by admission control ends the
+        refresh of its marketplace.
+
+        Returns:
+            Dict: polled, failed and changes (see `record`).
+        """
+        from .lib_amazon import AmazonPAAPI
+        from .models import APIError, CircuitOpenError, OverloadedError, ResourceProfile
+
+        changes: List[Dict[str, Any]] = []
+        polled = failed = 0
+        for mp, batches in self.plan(marketplace, feed, force, limit).items():
+            client = AmazonPAAPI(mp)
+            for index, batch in enumerate(batches):
+                try:
+                    items = client.get_items(batch, resources=ResourceProfile.PRICE_REFRESH)
+                except APIError as error:
+                    self._fetch_failed(mp, batch, error)
+                    if isinstance(error, (CircuitOpenError, OverloadedError)):
+                        failed += sum(len(rest) for rest in batches[index:])
+                        break
+                    failed += len(batch)
+                    continue
+                polled += len(batch)
+                changes.extend(self.record(mp, batch, items))
+        self.prune()
+        return {'polled': polled, 'failed': failed, 'changes': changes}
+
+    async def refresh_async(
+        self,
+        marketplace: Optional[str] = None,
+        feed: Optional[str] = None,
+        force: bool = False,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Async version of `refresh`: the batches of each marketplace are
+        requested in parallel (at most the client `max_workers` at a time)
+        and paced by its rate limiter; SQLite work runs off the event loop.
+        As in `refresh`, an open circuit breaker or a batch shed by admission
+        control stops the batches of its marketplace that were not sent yet.
+        """
+        import asyncio
+        from .lib_amazon import AmazonPAAPI
+        from .models import APIError, CircuitOpenError, OverloadedError, ResourceProfile
+
+        plan = await asyncio.to_thread(self.plan, marketplace, feed, force, limit)
+        changes: List[Dict[str, Any]] = []
+        polled = failed = 0
+        for mp, batches in plan.items():
+            client = AmazonPAAPI(mp)
+            semaphore = asyncio.Semaphore(client.max_workers)
+            stopped = asyncio.Event()
+
+            async def fetch(batch: List[str]) -> Optional[List[Any]]:
+                async with semaphore:
+                    if stopped.is_set():
+                        return None
+                    try:
+                        return await client.get_items_async(batch, resources=ResourceProfile.PRICE_REFRESH)
+                    except (CircuitOpenError, OverloadedError):
+                        stopped.set()
+                        raise
+
+            results = await asyncio.gather(*(fetch(batch) for batch in batches), return_exceptions=True)
+            for batch, result in zip(batches, results):
+                if result is None:
+                    failed += len(batch)  # Not sent: the refresh of this marketplace was stopped
+                    continue
+                if isinstance(result, APIError):
+                    self._fetch_failed(mp, batch, result)
+                    failed += len(batch)
+                    continue
+                if isinstance(result, BaseException):
+                    raise result
+                polled += len(batch)
+                changes.extend(await asyncio.to_thread(self.record, mp, batch, result))
+        await asyncio.to_thread(self.prune)
+        return {'polled': polled, 'failed': failed, 'changes': changes}
+
+    # ------------------------------------------------------------------ #
+    # Change log
+    # ------------------------------------------------------------------ #
+
+    def changes(
+        self,
+        feed: Optional[str] = None,
+        marketplace: Optional[str] = None,
+        since: int = 0,
+        limit: int = 500
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Changes recorded after the change `since`, oldest first.
+
+        Args:
+            feed (str, optional): Only the products of this feed.
+            marketplace (str, optional): Only this marketplace.
+            since (int): Cursor returned by the previous call (0 for every kept change).
+            limit (int): Maximum number of changes.
+
+        Returns:
+            Tuple[List[Dict], int]: The changes (cursor, marketplace, asin, price, sale_price,
+            availability, changed, previous, detected_at) and the cursor to pass next time.
+        """
+        conditions = ["c.id > ?"]
+        parameters: List[Any] = [int(since or 0)]
+        if marketplace:
+            conditions.append("c.marketplace = ?")
+            parameters.append(marketplace)
+        if feed:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM tracked t WHERE t.feed = ? AND t.marketplace = c.marketplace AND t.asin = c.asin)"
+            )
+            parameters.append(feed)
+        parameters.append(int(limit))
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT c.id, c.marketplace, c.asin, c.price, c.sale_price, c.availability, c.previous_price, "
+                "c.previous_sale_price, c.previous_availability, c.detected_at FROM changes c "
+                f"WHERE {' AND '.join(conditions)} ORDER BY c.id LIMIT ?",
+                parameters
+            ).fetchall()
+        changes = [
+            self._change(
+                change_id, mp, asin, OfferSnapshot(price, sale_price, availability),
+                OfferSnapshot(previous_price, previous_sale_price, previous_availability), detected_at
+            )
+            for (change_id, mp, asin, price, sale_price, availability,
+                 previous_price, previous_sale_price, previous_availability, detected_at) in rows
+        ]
+        return changes, (changes[-1]['cursor'] if changes else int(since or 0))
+
+    def prune(self) -> int:
+        """Drop the changes older than `changes_ttl`. Returns the number dropped."""
+        self._configure()
+        with self._lock:
+            connection = self.connection
+            with connection:
+                return connection.execute(
+                    "DELETE FROM changes WHERE detected_at < ?", (time.time() - self.changes_ttl,)
+                ).rowcount
+
+    # ------------------------------------------------------------------ #
+    # Stats
+    # ------------------------------------------------------------------ #
+
+    def feeds(self) -> List[Dict[str, Any]]:
+        """Summary of every tracked feed: products, products due and last poll."""
+        now = time.time()
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT t.feed, t.marketplace, COUNT(*), SUM(o.next_check_at <= ?), MAX(o.checked_at), MAX(o.changed_at) "
+                "FROM tracked t JOIN offers o ON o.marketplace = t.marketplace AND o.asin = t.asin "
+                "GROUP BY t.feed, t.marketplace ORDER BY t.feed, t.marketplace",
+                (now,)
+            ).fetchall()
+        return [
+            {
+                'feed': feed,
+                'marketplace': marketplace,
+                'products': products,
+                'due': due or 0,
+                'last_checked_at': checked_at,
+                'last_changed_at': changed_at,
+            }
+            for feed, marketplace, products, due, checked_at, changed_at in rows
+        ]
+
+    def _collect_metrics(self) -> List[Tuple[str, Dict[str, Any], float, str]]:
+        # Never open the database just for a metrics scrape
+        if self._connection is None:
+            return []
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT marketplace, COUNT(*), SUM(next_check_at <= ?) FROM offers GROUP BY marketplace", (time.time(),)
+            ).fetchall()
+        samples = []
+        for marketplace, tracked, due in rows:
+            samples.append(('amazon_price_refresh_tracked', {'marketplace': marketplace}, tracked, 'gauge'))
+            samples.append(('amazon_price_refresh_due', {'marketplace': marketplace}, due or 0, 'gauge'))
+        return samples
+
+    # ------------------------------------------------------------------ #
+    # Schedule
+    # ------------------------------------------------------------------ #
+
+    def start(self, interval: float) -> None:
+        """
+        Refresh the due products every `interval` seconds in a daemon thread
+        until `stop`. Its PA-API calls have the background priority, so they
+        only use the quota left by tool calls.
+        """
+        from .admission import BACKGROUND, priority
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    with priority(BACKGROUND):
+                        result = self.refresh()
+                    if result['polled'] or result['failed']:
+                        logger.info(
+                            "Price refresh: %d products polled, %d changed, %d failed",
+                            result['polled'], len(result['changes']), result['failed']
+                        )
+                except Exception as e:
+                    logger.error("Scheduled price refresh failed: %s", e)
+
+        self._thread = threading.Thread(target=run, name="amazon-price-refresh", daemon=True)
+        self._thread.start()
+        logger.info("Scheduled price refresh every %.0f s", interval)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the scheduled refresh (waits for a refresh in progress up to `timeout` seconds)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self) -> None:
+        """Stop the scheduled refresh and close the database connection."""
+        self.stop()
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+# Process-wide refresher: tracked products are shared by every marketplace client and tool call
+price_refresher = PriceRefresher()
+metrics.register_collector('amazon_price_refresh', price_refresher._collect_metrics)
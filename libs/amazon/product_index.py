@@ -0,0 +1,346 @@
+"""
+Local full-text index of the products returned by the search tools.
+SQLite FTS5 over title, brand, features and categories, so a keyword query
+over products already seen in a campaign is answered without calling Amazon.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from .models import ProductRecord
+
+logger = logging.getLogger(__name__)
+
+# Project root (/app inside the Docker image)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_INDEX_PATH = os.path.join(PROJECT_ROOT, "data", "amazon_products.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    asin TEXT NOT NULL UNIQUE,
+    record_json TEXT NOT NULL,
+    price REAL,
+    discount REAL NOT NULL DEFAULT 0,
+    has_ean INTEGER NOT NULL DEFAULT 0,
+    search_indexes TEXT NOT NULL DEFAULT ' ',
+    node_ids TEXT NOT NULL DEFAULT ' ',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_roots (
+    search_index TEXT NOT NULL,
+    root_id TEXT NOT NULL,
+    PRIMARY KEY (search_index, root_id)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    title, brand, features, categories,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Relevance weight of each FTS column: title, brand, features, categories
+_COLUMN_WEIGHTS = (10.0, 4.0, 1.0, 2.0)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that say nothing about the product (Spanish first, plus common English ones)
+STOPWORDS = frozenset("""
+a al con de del el en la las lo los o para por sin su sus un una unas unos y e u que se es mas muy
+the and for with of to in on or by
+""".split())
+
+_PRICE_SORTS = {
+    'Price:LowToHigh': "p.price IS NULL, p.price ASC",
+    'Price:HighToLow': "p.price IS NULL, p.price DESC",
+}
+
+
+def _fold(text: str) -> str:
+    """Lowercase without accents."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _stem(word: str) -> str:
+    """
+    Light Spanish stemmer: plural and gender endings only, so "zapatillas",
+    "zapatilla" and "zapatillo" share a term, and "luces" matches "luz".
+    """
+    if word.isdigit() or len(word) <= 3:
+        return word
+    if word.endswith('ces') and len(word) > 4:
+        word = word[:-3] + 'z'
+    elif word.endswith('es') and len(word) > 4 and word[-3] not in 'aeiou':
+        word = word[:-2]
+    elif word.endswith('s'):
+        word = word[:-1]
+    if len(word) > 4 and word[-1] in 'aoe':
+        word = word[:-1]
+    return word
+
+
+def search_terms(text: Optional[str]) -> List[str]:
+    """
+    Index terms of a text: folded, without stopwords and stemmed.
+
+    Args:
+        text (str): Title, query or any other text.
+
+    Returns:
+        List[str]: The terms, in text order.
+    """
+    if not text:
+        return []
+    return [_stem(word) for word in _TOKEN_PATTERN.findall(_fold(text)) if word not in STOPWORDS]
+
+
+def _terms_text(text: Optional[str]) -> str:
+    return " ".join(search_terms(text))
+
+
+class ProductIndex:
+    """
+    SQLite FTS5 product index.
+
+    Each product is stored once (by ASIN) as its ProductRecord, with price,
+    discount and EAN presence as columns for local filtering. Titles, brands,
+    features and category names are indexed as light-stemmed Spanish terms
+    and ranked with BM25, titles weighing most. The search indexes and browse
+    nodes of the queries that returned a product are kept too, so category
+    filters also work locally.
+
+    A search index filter also matches products that no search in that index
+    returned. The index learns which root categories each search index
+    covers from the products its searches return. A product whose category
+    path starts at one of those roots is in the index, whatever search
+    returned it.
+
+    The database is opened lazily on first use.
+
+    Args:
+        path (str): SQLite database file path.
+        max_age (float): Seconds a product stays eligible for local results
+            (its price is as old as the last time Amazon returned it).
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, max_age: float = 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Open the database on first use (lock must be held)."""
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            learned_roots = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'index_roots'"
+            ).fetchone()
+            connection.executescript(_SCHEMA)
+            if learned_roots is None:
+                self._learn_stored_roots(connection)
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _learn_stored_roots(connection: sqlite3.Connection) -> None:
+        """Learn the roots of the search indexes from the products of an index created by an older version."""
+        roots = set()
+        for record_json, search_indexes in connection.execute(
+            "SELECT record_json, search_indexes FROM products WHERE search_indexes != ' '"
+        ):
+            categories = json.loads(record_json).get('categories') or []
+            if categories and categories[0].get('id'):
+                roots.update((search_index, categories[0]['id']) for search_index in search_indexes.split())
+        if roots:
+            with connection:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO index_roots (search_index, root_id) VALUES (?, ?)", sorted(roots)
+                )
+
+    # ------------------------------------------------------------------ #
+    # Indexing
+    # ------------------------------------------------------------------ #
+
+    def add(
+        self,
+        records: Iterable[ProductRecord],
+        search_index: Optional[str] = None,
+        browse_node_id: Optional[str] = None
+    ) -> int:
+        """
+        Add or refresh products.
+
+        Args:
+            records: Products returned by Amazon.
+            search_index (str, optional): Search index of the query that returned them.
+            browse_node_id (str, optional): Browse node filter of that query.
+
+        Returns:
+            int: Number of products written.
+        """
+        if search_index in (None, '', 'All'):
+            search_index = None
+        now = time.time()
+        written = 0
+        roots = set()
+        with self._lock:
+            connection = self.connection
+            with connection:
+                for record in records:
+                    if not record.asin:
+                        continue
+                    if search_index and record.categories and record.categories[0].id:
+                        roots.add(record.categories[0].id)
+                    row = connection.execute(
+                        "SELECT id, search_indexes, node_ids FROM products WHERE asin = ?", (record.asin,)
+                    ).fetchone()
+                    search_indexes = set((row[1] if row else "").split())
+                    node_ids = set((row[2] if row else "").split())
+                    if search_index:
+                        search_indexes.add(search_index)
+                    if browse_node_id:
+                        node_ids.add(str(browse_node_id))
+                    node_ids.update(node_id for _, node_id in record.categories if node_id)
+                    values = (
+                        json.dumps(record.to_dict(), ensure_ascii=False),
+                        record.price,
+                        record.discount or 0,
+                        int(bool(record.eans)),
+                        f" {' '.join(sorted(search_indexes))} ",
+                        f" {' '.join(sorted(node_ids))} ",
+                        now,
+                    )
+                    if row is None:
+                        cursor = connection.execute(
+                            "INSERT INTO products (record_json, price, discount, has_ean, search_indexes, node_ids, "
+                            "updated_at, asin) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            values + (record.asin,)
+                        )
+                        row_id = cursor.lastrowid
+                    else:
+                        row_id = row[0]
+                        connection.execute(
+                            "UPDATE products SET record_json = ?, price = ?, discount = ?, has_ean = ?, "
+                            "search_indexes = ?, node_ids = ?, updated_at = ? WHERE id = ?",
+                            values + (row_id,)
+                        )
+                        connection.execute("DELETE FROM products_fts WHERE rowid = ?", (row_id,))
+                    connection.execute(
+                        "INSERT INTO products_fts (rowid, title, brand, features, categories) VALUES (?, ?, ?, ?, ?)",
+                        (
+                            row_id,
+                            _terms_text(record.title),
+                            _terms_text(record.brand),
+                            _terms_text(record.description),
+                            _terms_text(" ".join(name for name, _ in record.categories if name)),
+                        )
+                    )
+                    written += 1
+                connection.executemany(
+                    "INSERT OR IGNORE INTO index_roots (search_index, root_id) VALUES (?, ?)",
+                    [(search_index, root_id) for root_id in sorted(roots)]
+                )
+        return written
+
+    # ------------------------------------------------------------------ #
+    # Search
+    # ------------------------------------------------------------------ #
+
+    def search(
+        self,
+        keywords: str,
+        limit: int = 10,
+        offset: int = 0,
+        search_index: Optional[str] = None,
+        browse_node_id: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_discount: Optional[float] = None,
+        only_with_ean: bool = False,
+        sort_by: Optional[str] = None,
+        max_age: Optional[float] = None
+    ) -> List[ProductRecord]:
+        """
+        Find indexed products that contain every term of `keywords`.
+
+        Args:
+            keywords (str): Words to look for in title, brand, features and categories.
+            limit (int): Maximum number of products.
+            offset (int): Products to skip (paging).
+            search_index (str, optional): Only products in this index ("All" for any): returned by a
+                search in it, or under a root category its searches returned.
+            browse_node_id (str, optional): Only products in this browse node.
+            min_price / max_price (float, optional): Price range in the marketplace currency (not cents).
+            min_discount (float, optional): Minimum discount percentage.
+            only_with_ean (bool): Only products with EANs.
+            sort_by (str, optional): "Price:LowToHigh" or "Price:HighToLow"; anything else ranks by relevance.
+            max_age (float, optional): Seconds since the product was last returned by Amazon (default is `max_age`).
+
+        Returns:
+            List[ProductRecord]: The products, best match first.
+        """
+        terms = search_terms(keywords)
+        if not terms or limit <= 0:
+            return []
+        # Every term must match; terms are quoted so FTS5 syntax in the query is inert
+        match = " ".join(f'"{term}"' for term in dict.fromkeys(terms))
+        conditions = ["products_fts MATCH ?", "p.updated_at >= ?"]
+        parameters: List[Any] = [match, time.time() - (self.max_age if max_age is None else max_age)]
+        if search_index and search_index != 'All':
+            conditions.append(
+                "(p.search_indexes LIKE ? OR EXISTS (SELECT 1 FROM index_roots r "
+                "WHERE r.search_index = ? AND p.node_ids LIKE '% ' || r.root_id || ' %'))"
+            )
+            parameters.extend([f"% {search_index} %", search_index])
+        if browse_node_id:
+            conditions.append("p.node_ids LIKE ?")
+            parameters.append(f"% {browse_node_id} %")
+        if min_price:
+            conditions.append("p.price >= ?")
+            parameters.append(float(min_price))
+        if max_price:
+            conditions.append("p.price <= ?")
+            parameters.append(float(max_price))
+        if min_discount:
+            conditions.append("p.discount >= ?")
+            parameters.append(float(min_discount))
+        if only_with_ean:
+            conditions.append("p.has_ean = 1")
+        relevance = f"bm25(products_fts, {', '.join(str(weight) for weight in _COLUMN_WEIGHTS)})"
+        order = _PRICE_SORTS.get(sort_by or '', relevance)
+        if order != relevance:
+            order = f"{order}, {relevance}"
+        query = (
+            f"SELECT p.record_json FROM products_fts JOIN products p ON p.id = products_fts.rowid "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ? OFFSET ?"
+        )
+        parameters.extend([int(limit), int(offset)])
+        with self._lock:
+            rows = self.connection.execute(query, parameters).fetchall()
+        return [ProductRecord.from_dict(json.loads(record_json)) for (record_json,) in rows]
+
+    def count(self) -> int:
+        """Number of indexed products."""
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,208 @@
+"""
+Compact tool output for product records: field selection, length caps and
+a columnar table format.
+
+Tool results end up in the context of the model that called the tool, so
+every byte counts. The default output (one `to_dict()` per product) repeats
+every key per product, the whole feature text and the category path of
+every product. A field list drops what the caller does not need, caps bound
+the long texts, and the table format sends the keys once and each distinct
+category path once.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .models import CategoryRef, ProductRecord
+
+# Fields of ProductRecord.to_dict(), in output order ('features' is always empty, kept for old clients)
+PRODUCT_FIELDS = (
+    'title', 'asin', 'affiliate_link', 'price', 'old_price', 'image_url',
+    'description', 'features', 'brand', 'discount', 'categories', 'eans',
+)
+
+OUTPUT_FORMATS = ('json', 'table')
+
+ELLIPSIS = "…"
+
+
+def truncate(text: Optional[str], max_chars: Optional[int]) -> Optional[str]:
+    """
+    Cut a text to at most `max_chars` characters, at a word boundary when
+    there is one in the last fifth, ending with an ellipsis.
+    """
+    if not text or not max_chars or len(text) <= max_chars:
+        return text
+    cut = text[:max(max_chars - len(ELLIPSIS), 0)]
+    space = cut.rfind(' ')
+    if space >= len(cut) * 4 // 5:
+        cut = cut[:space]
+    return cut.rstrip(" .,;:|") + ELLIPSIS
+
+
+def _category_list(categories: Tuple[CategoryRef, ...]) -> List[Dict[str, str]]:
+    return [{'name': name, 'id': node_id} for name, node_id in categories]
+
+
+@dataclass(frozen=True)
+class OutputOptions:
+    """
+    How tool results present products.
+
+    Args:
+        fields: Fields to include, in PRODUCT_FIELDS order (None for all of them).
+        max_title_chars: Maximum title length (None for no cap).
+        max_description_chars: Maximum description length (None for no cap).
+        format: "json" (one object per product) or "table" (columns and value rows).
+    """
+    fields: Optional[Tuple[str, ...]] = None
+    max_title_chars: Optional[int] = None
+    max_description_chars: Optional[int] = None
+    format: str = 'json'
+
+    @classmethod
+    def parse(
+        cls,
+        fields: Union[str, Sequence[str], None] = None,
+        max_title_chars: Optional[int] = None,
+        max_description_chars: Optional[int] = None,
+        format: Optional[str] = None
+    ) -> 'OutputOptions':
+        """
+        Validate tool arguments.
+
+        Args:
+            fields: Field names, as a list or comma-separated ("asin, title, price").
+            max_title_chars / max_description_chars: Length caps (0 or None for no cap).
+            format: "json" or "table" (default is "json").
+
+        Raises:
+            ValueError: If a field or the format is unknown, or a cap is negative.
+        """
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        selected = None
+        if fields:
+            names = {name.strip() for name in fields if name and name.strip()}
+            unknown = sorted(names.difference(PRODUCT_FIELDS))
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}. Fields are: {', '.join(PRODUCT_FIELDS)}.")
+            # 'asin' always goes along: without it the rows cannot be told apart or looked up again
+            names.add('asin')
+            selected = tuple(name for name in PRODUCT_FIELDS if name in names)
+        format = (format or 'json').lower()
+        if format not in OUTPUT_FORMATS:
+            raise ValueError(f"Format must be one of: {', '.join(OUTPUT_FORMATS)}.")
+        for cap in (max_title_chars, max_description_chars):
+            if cap is not None and cap < 0:
+                raise ValueError("Length caps must not be negative.")
+        return cls(selected, max_title_chars or None, max_description_chars or None, format)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return self.fields or PRODUCT_FIELDS
+
+    @property
+    def is_default(self) -> bool:
+        return (
+            self.fields is None and self.max_title_chars is None
+            and self.max_description_chars is None and self.format == 'json'
+        )
+
+    def _value(self, record: ProductRecord, field: str) -> Any:
+        if field == 'title':
+            return truncate(record.title, self.max_title_chars)
+        if field == 'description':
+            return truncate(record.description, self.max_description_chars)
+        if field == 'features':
+            return ""
+        if field == 'eans':
+            return list(record.eans)
+        return getattr(record, field)
+
+    def project(self, record: ProductRecord) -> Dict[str, Any]:
+        """The selected fields of a product, as in ProductRecord.to_dict()."""
+        if self.is_default:
+            return record.to_dict()
+        return {
+            field: _category_list(record.categories) if field == 'categories' else self._value(record, field)
+            for field in self.columns
+        }
+
+    def table(
+        self,
+        records: Iterable[ProductRecord],
+        extra: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Products as a table.
+
+        The categories column holds an index into `category_paths` (None for
+        a product without categories), so each distinct path is sent once.
+        Records share their category path tuples (see BrowseNodeIndex), so a
+        path is found by identity before comparing names and ids.
+
+        Args:
+            records: The products.
+            extra: Per product values of extra columns (e.g. marketplace), appended after the product columns.
+
+        Returns:
+            Dict: format ("table"), columns, rows (one list of values per product) and category_paths
+            (lists of [name, id] from the root category).
+        """
+        columns = list(self.columns)
+        extra_columns = list(extra[0]) if extra else []
+        path_indexes: Dict[int, int] = {}
+        path_by_value: Dict[Tuple[CategoryRef, ...], int] = {}
+        category_paths: List[List[List[str]]] = []
+        rows = []
+        for position, record in enumerate(records):
+            row = []
+            for field in columns:
+                if field != 'categories':
+                    row.append(self._value(record, field))
+                    continue
+                path = record.categories
+                if not path:
+                    row.append(None)
+                    continue
+                index = path_indexes.get(id(path))
+                if index is None:
+                    index = path_by_value.get(path)
+                    if index is None:
+                        index = path_by_value[path] = len(category_paths)
+                        category_paths.append([[name, node_id] for name, node_id in path])
+                    path_indexes[id(path)] = index
+                row.append(index)
+            if extra_columns:
+                row.extend(extra[position].get(column) for column in extra_columns)
+            rows.append(row)
+        table: Dict[str, Any] = {
+            'format': 'table',
+            'columns': columns + extra_columns,
+            'rows': rows,
+        }
+        if 'categories' in columns:
+            table['category_paths'] = category_paths
+        return table
+
+    def render(
+        self,
+        records: List[ProductRecord],
+        extra: Optional[List[Dict[str, Any]]] = None
+    ) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Products in the selected format: a list of dicts ("json") or a table ("table").
+
+        Args:
+            records: The products.
+            extra: Per product extra values, merged into each dict or appended as columns.
+        """
+        if self.format == 'table':
+            return self.table(records, extra)
+        if extra is None:
+            return [self.project(record) for record in records]
+        return [{**self.project(record), **values} for record, values in zip(records, extra)]
+
+
+DEFAULT_OUTPUT = OutputOptions()
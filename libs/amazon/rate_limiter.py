@@ -0,0 +1,88 @@
+"""
+Token bucket rate limiter for Amazon PA-API calls.
+Shared by every outgoing request of an AmazonPAAPI client so we stay inside the
+per associate tag quota instead of wasting calls on TooManyRequests errors.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket.
+
+    The bucket only takes tokens that are available right now and tells how
+    long until the next one is. Waiting for a token, and the order in which
+    waiting calls get them, is up to the AdmissionScheduler in front of it
+    (by priority class, then first come, first served).
+
+    Args:
+        rate (float): Tokens added per second (requests per second allowed).
+        burst (int): Maximum number of tokens that can be accumulated.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("Rate must be greater than 0.")
+        if burst < 1:
+            raise ValueError("Burst must be at least 1.")
+        self.rate = float(rate)
+        self.burst = int(burst)
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens generated since the last update (lock must be held)."""
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def try_acquire(self, keep: float = 0.0) -> bool:
+        """
+        Take a token only if one is available right now.
+
+        Args:
+            keep (float): Tokens that must stay in the bucket after taking one
+                (kept for callers with a higher priority, see AdmissionScheduler).
+
+        Returns:
+            bool: True if a token was taken.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1 + keep:
+                return False
+            self._tokens -= 1
+            return True
+
+    def time_to_token(self, keep: float = 0.0) -> float:
+        """Seconds until `try_acquire(keep)` can succeed (0 if it can right now)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = 1 + keep - self._tokens
+            return max(missing, 0.0) / self.rate
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Push back every future reservation by `seconds`.
+
+        Used when Amazon answers with TooManyRequests, so the waiting requests
+        back off instead of hitting the API again right away.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the limiter state."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'available_tokens': max(self._tokens, 0.0),
+            }
@@ -0,0 +1,151 @@
+"""
+Failure handling for PA-API calls: jittered exponential retry and a circuit
+breaker that fails fast while the upstream is degraded.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .models import APIError, CircuitOpenError
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for retryable errors.
+
+    The n-th retry waits a random time between 0 and min(max_delay,
+    base_delay * 2^(n-1)), so clients throttled together do not retry
+    together. A `retry_after` hint of the error is honoured as a minimum.
+
+    Args:
+        max_attempts (int): Attempts per request, the first one included (1 disables retries).
+        base_delay (float): Backoff cap of the first retry, in seconds.
+        max_delay (float): Maximum backoff, in seconds.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        if max_attempts < 1:
+            raise ValueError("Max attempts must be at least 1.")
+        self.max_attempts = int(max_attempts)
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self._random = random.Random()
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """Whether a failed attempt (1-based) is retried."""
+        return isinstance(error, APIError) and error.retryable and attempt < self.max_attempts
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Seconds to wait after the failed attempt number `attempt` (1-based)."""
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = self._random.uniform(0, cap)
+        retry_after = getattr(error, 'retry_after', None)
+        return max(delay, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    - closed: calls go through; `failure_threshold` consecutive failures open it.
+    - open: calls are rejected with CircuitOpenError for `reset_timeout` seconds.
+    - half-open: one probe call goes through; its success closes the circuit,
+      its failure opens it again.
+
+    Only upstream failures (5xx, network) should be recorded as failures:
+    throttling is handled by the rate limiter and invalid requests say
+    nothing about the upstream health.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit (0 disables it).
+        reset_timeout (float): Seconds the circuit stays open before a probe.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._rejected = 0
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> bool:
+        """
+        Let a call through or reject it.
+
+        Returns:
+            bool: True if the call is the half-open probe. A probe that never
+            reaches the upstream must give its slot back with `release_probe`.
+
+        Raises:
+            CircuitOpenError: If the circuit is open (or half-open with a probe in flight).
+        """
+        if self.failure_threshold <= 0:
+            return False
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            now = time.monotonic()
+            if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            retry_after = max(self.reset_timeout - (now - self._opened_at), 0.0)
+        raise CircuitOpenError(
+            f"PA-API is failing, requests are paused for {retry_after:.1f} s",
+            error_code='CircuitOpen',
+            retry_after=retry_after
+        )
+
+    def release_probe(self) -> None:
+        """
+        Give back the slot of a half-open probe that was not sent (shed by
+        admission control or cancelled), so the next call probes instead.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the breaker state."""
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'rejected': self._rejected,
+                'opened': self._opened,
+            }
@@ -0,0 +1,346 @@
+"""
+Registry of the products (ASINs and EANs) already used, by campaign.
+
+Active campaigns keep the exact set of keys in memory and in SQLite, so a
+product is never returned twice while a feed is being built. Archived
+(historical) campaigns are compacted into a Bloom filter of a few bits per
+key, so excluding every product used in past seasons stays cheap: a Bloom
+filter never misses a used product, and only wrongly excludes a new one with
+probability `error_rate`.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Project root (/app inside the Docker image)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_REGISTRY_PATH = os.path.join(PROJECT_ROOT, "data", "amazon_seen.sqlite3")
+
+DEFAULT_ERROR_RATE = 0.001
+MAX_CAMPAIGN_NAME_CHARS = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'active',
+    created_at REAL NOT NULL,
+    archived_at REAL,
+    product_count INTEGER NOT NULL DEFAULT 0,
+    bloom BLOB
+);
+CREATE TABLE IF NOT EXISTS seen (
+    campaign TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (campaign, key)
+) WITHOUT ROWID;
+"""
+
+ACTIVE = 'active'
+ARCHIVED = 'archived'
+
+_BLOOM_HEADER = struct.Struct('>QIQ')  # bits, hashes, keys added
+
+
+class BloomFilter:
+    """
+    Bloom filter with double hashing over one BLAKE2b digest per key.
+
+    Args:
+        bits (int): Size of the bit array.
+        hashes (int): Bit positions per key.
+        data (bytearray, optional): Existing bit array.
+        count (int): Keys already added.
+    """
+
+    def __init__(self, bits: int, hashes: int, data: Optional[bytearray] = None, count: int = 0):
+        self.bits = max(8, int(bits))
+        self.hashes = max(1, int(hashes))
+        self.data = data if data is not None else bytearray((self.bits + 7) // 8)
+        self.count = count
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = DEFAULT_ERROR_RATE) -> 'BloomFilter':
+        """Filter sized for `capacity` keys at the given false positive rate."""
+        capacity = max(1, int(capacity))
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        hashes = round(bits / capacity * math.log(2))
+        return cls(bits, hashes)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        step = int.from_bytes(digest[8:], 'big') | 1
+        return ((first + index * step) % self.bits for index in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.data[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.data[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def to_bytes(self) -> bytes:
+        return _BLOOM_HEADER.pack(self.bits, self.hashes, self.count) + bytes(self.data)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> 'BloomFilter':
+        bits, hashes, count = _BLOOM_HEADER.unpack_from(payload)
+        return cls(bits, hashes, bytearray(payload[_BLOOM_HEADER.size:]), count)
+
+
+def product_keys(asin: Optional[str], eans: Iterable[str] = ()) -> List[str]:
+    """Registry keys of a product: its ASIN and each of its EANs."""
+    keys = [f"asin:{asin}"] if asin else []
+    keys.extend(f"ean:{ean}" for ean in eans or () if ean)
+    return keys
+
+
+def record_keys(record: Any) -> List[str]:
+    """Registry keys of a ProductRecord (or anything with `asin` and `eans`)."""
+    return product_keys(getattr(record, 'asin', None), getattr(record, 'eans', ()))
+
+
+def parse_campaigns(campaigns: Union[str, Iterable[str], None]) -> List[str]:
+    """
+    Campaign names from "summer_2025" or "summer_2025, summer_2024" (the first one is the active one).
+
+    Raises:
+        ValueError: If a name is longer than MAX_CAMPAIGN_NAME_CHARS.
+    """
+    if not campaigns:
+        return []
+    if isinstance(campaigns, str):
+        campaigns = campaigns.split(',')
+    names = list(dict.fromkeys(name.strip() for name in campaigns if name and name.strip()))
+    for name in names:
+        if len(name) > MAX_CAMPAIGN_NAME_CHARS:
+            raise ValueError(f"Campaign names must be at most {MAX_CAMPAIGN_NAME_CHARS} characters.")
+    return names
+
+
+class SeenRegistry:
+    """
+    SQLite-backed registry of used products per campaign.
+
+    Campaigns are loaded into memory on first use: the exact key set of an
+    active campaign, or the Bloom filter of an archived one. Lookups only
+    touch memory; marks are written through to SQLite.
+
+    Args:
+        path (str, optional): SQLite database file path (default is AMAZON_SEEN_REGISTRY_PATH
+            or data/amazon_seen.sqlite3, read when the database is opened).
+        error_rate (float, optional): False positive rate of the Bloom filters built on
+            archive (default is AMAZON_SEEN_BLOOM_ERROR_RATE or 0.001).
+    """
+
+    def __init__(self, path: Optional[str] = None, error_rate: Optional[float] = None):
+        self.path = path
+        self.error_rate = error_rate
+        self._connection: Optional[sqlite3.Connection] = None
+        self._loaded: Dict[str, Union[Set[str], BloomFilter]] = {}
+        # Campaigns looked up that do not exist yet, so lookups do not hit SQLite per product
+        self._absent: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Open the database on first use (lock must be held)."""
+        if self._connection is None:
+            # Read on first use, after the server has loaded its .env
+            if self.path is None:
+                self.path = os.getenv('AMAZON_SEEN_REGISTRY_PATH', DEFAULT_REGISTRY_PATH)
+            if self.error_rate is None:
+                self.error_rate = float(os.getenv('AMAZON_SEEN_BLOOM_ERROR_RATE', DEFAULT_ERROR_RATE))
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _campaign(self, name: str) -> Optional[Union[Set[str], BloomFilter]]:
+        """Keys of a campaign, loaded on first use; None if it does not exist (lock must be held)."""
+        keys = self._loaded.get(name)
+        if keys is not None or name in self._absent:
+            return keys
+        row = self.connection.execute("SELECT state, bloom FROM campaigns WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            self._absent.add(name)
+            return None
+        state, bloom = row
+        if state == ARCHIVED and bloom is not None:
+            keys = BloomFilter.from_bytes(bloom)
+        else:
+            keys = {key for (key,) in self.connection.execute("SELECT key FROM seen WHERE campaign = ?", (name,))}
+        self._loaded[name] = keys
+        return keys
+
+    # ------------------------------------------------------------------ #
+    # Lookups
+    # ------------------------------------------------------------------ #
+
+    def load(self, campaigns: List[str]) -> None:
+        """Load campaigns into memory ahead of the lookups (reads SQLite, so call it off the event loop)."""
+        with self._lock:
+            for name in campaigns:
+                self._campaign(name)
+
+    def contains(self, campaigns: List[str], keys: List[str]) -> bool:
+        """Whether any of `keys` was used in any of `campaigns`."""
+        with self._lock:
+            for name in campaigns:
+                seen = self._campaign(name)
+                if seen is not None and any(key in seen for key in keys):
+                    return True
+        return False
+
+    def is_seen(self, campaigns: List[str], record: Any) -> bool:
+        """Whether the ASIN or an EAN of a product was used in any of `campaigns`."""
+        return self.contains(campaigns, record_keys(record))
+
+    # ------------------------------------------------------------------ #
+    # Changes
+    # ------------------------------------------------------------------ #
+
+    def mark(self, campaign: str, products: Iterable[Union[Any, Tuple[str, Iterable[str]]]]) -> int:
+        """
+        Record products as used in an active campaign (created on first use).
+
+        Args:
+            campaign (str): Campaign name.
+            products: ProductRecords, or (asin, eans) pairs.
+
+        Returns:
+            int: Number of products that were not in the campaign yet.
+
+        Raises:
+            ValueError: If the campaign is archived.
+        """
+        now = time.time()
+        added = 0
+        with self._lock:
+            connection = self.connection
+            seen = self._campaign(campaign)
+            if isinstance(seen, BloomFilter):
+                raise ValueError(f"Campaign '{campaign}' is archived; use a new campaign name.")
+            with connection:
+                if seen is None:
+                    connection.execute(
+                        "INSERT INTO campaigns (name, state, created_at) VALUES (?, ?, ?)", (campaign, ACTIVE, now)
+                    )
+                    seen = self._loaded[campaign] = set()
+                    self._absent.discard(campaign)
+                for product in products:
+                    keys = product_keys(*product) if isinstance(product, tuple) else record_keys(product)
+                    new_keys = [key for key in keys if key not in seen]
+                    if not new_keys:
+                        continue
+                    if keys and keys[0] in new_keys and keys[0].startswith('asin:'):
+                        added += 1
+                    seen.update(new_keys)
+                    connection.executemany(
+                        "INSERT OR IGNORE INTO seen (campaign, key, seen_at) VALUES (?, ?, ?)",
+                        [(campaign, key, now) for key in new_keys]
+                    )
+                if added:
+                    connection.execute(
+                        "UPDATE campaigns SET product_count = product_count + ? WHERE name = ?", (added, campaign)
+                    )
+        return added
+
+    def archive(self, campaign: str) -> Dict[str, Any]:
+        """
+        Compact an active campaign into a Bloom filter (it can still be excluded, not extended).
+
+        Raises:
+            ValueError: If the campaign does not exist.
+        """
+        with self._lock:
+            connection = self.connection
+            seen = self._campaign(campaign)
+            if seen is None:
+                raise ValueError(f"Campaign '{campaign}' does not exist.")
+            if isinstance(seen, set):
+                bloom = BloomFilter.for_capacity(len(seen), self.error_rate)
+                for key in seen:
+                    bloom.add(key)
+                with connection:
+                    connection.execute(
+                        "UPDATE campaigns SET state = ?, archived_at = ?, bloom = ? WHERE name = ?",
+                        (ARCHIVED, time.time(), bloom.to_bytes(), campaign)
+                    )
+                    connection.execute("DELETE FROM seen WHERE campaign = ?", (campaign,))
+                self._loaded[campaign] = bloom
+                logger.info("Campaign %s archived: %d keys in %d bytes", campaign, bloom.count, len(bloom.data))
+        return self.campaign_stats(campaign)
+
+    def forget(self, campaign: str) -> bool:
+        """Delete a campaign and its keys. Returns False if it did not exist."""
+        with self._lock:
+            connection = self.connection
+            with connection:
+                deleted = connection.execute("DELETE FROM campaigns WHERE name = ?", (campaign,)).rowcount
+                connection.execute("DELETE FROM seen WHERE campaign = ?", (campaign,))
+            self._loaded.pop(campaign, None)
+        return bool(deleted)
+
+    # ------------------------------------------------------------------ #
+    # Stats
+    # ------------------------------------------------------------------ #
+
+    def campaign_stats(self, campaign: str) -> Optional[Dict[str, Any]]:
+        """Summary of a campaign: state, products, keys and memory size; None if unknown."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT name, state, created_at, archived_at, product_count FROM campaigns WHERE name = ?", (campaign,)
+            ).fetchone()
+            if row is None:
+                return None
+            seen = self._campaign(campaign)
+        name, state, created_at, archived_at, product_count = row
+        if isinstance(seen, BloomFilter):
+            keys, size = seen.count, len(seen.data)
+        else:
+            keys, size = len(seen), sum(len(key) + 50 for key in seen)  # Rough CPython str + set slot size
+        return {
+            'campaign': name,
+            'state': state,
+            'products': product_count,
+            'keys': keys,
+            'memory_bytes': size,
+            'created_at': created_at,
+            'archived_at': archived_at,
+        }
+
+    def campaigns(self) -> List[Dict[str, Any]]:
+        """Summary of every campaign, newest first."""
+        with self._lock:
+            names = [name for (name,) in self.connection.execute("SELECT name FROM campaigns ORDER BY created_at DESC")]
+        return [stats for stats in (self.campaign_stats(name) for name in names) if stats is not None]
+
+    def close(self) -> None:
+        """Close the database connection and drop the loaded campaigns."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._loaded.clear()
+            self._absent.clear()
+
+
+# Process-wide registry: campaigns are shared by every marketplace client and tool call
+seen_registry = SeenRegistry()
@@ -4,34 +4,35 @@ Servidor MCP Simple con FastMCP - Herramienta para buscar productos en Amazon
 ========================================================
 """
 
+import asyncio
+import functools
+import inspect
+import json
 import logging
-import sys
 import os
+import signal
+import sys
+import threading
+import time
 from mcp.server.fastmcp import FastMCP
-from typing import List
-from amazon_paapi.models import SortBy, Availability
-from libs.amazon import AmazonAPISingleton
-from libs.amazon.models import AmazonProductPrettyResponse, SearchIndex
-from tools.amazon.tool_amazon_search_items import extract_categories
+from typing import Any, Callable, Dict, List, Sequence
+from mcp.server.fastmcp.exceptions import ToolError
+from libs.amazon.admission import BATCH, INTERACTIVE, priority
+from libs.amazon.extractor import extract_items
+from libs.amazon.metrics import metrics
+from utils.logging_setup import configure_logging
+from libs.amazon.models import APIError, AmazonProductPrettyResponse, SearchIndex, SearchSpec
 
-# Configuración de logging - CRÍTICO: enviar logs a stderr, NO stdout
-# para evitar contaminar las respuestas JSON del MCP
-logging.basicConfig(
-    level=logging.ERROR,  # Solo errores críticos
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stderr,  # IMPORTANTE: logs van a stderr, no stdout
-    force=True  # Forzar reconfiguración de logging
-)
+# Arranque rápido: el SDK de PA-API (amazon_paapi) y los módulos de tools se
+# importan en la primera llamada a una tool, no al arrancar, para que
+# initialize/list_tools respondan cuanto antes (ver benchmarks/startup_time.py).
+# El cliente AmazonPAAPI también se crea en la primera llamada (o en segundo
+# plano con AMAZON_WARMUP=true).
 
-# Configurar todos los loggers conocidos para que vayan a stderr
-for logger_name in ['libs.amazon', 'httpx', 'amazon_paapi', 'agno', 'urllib3']:
-    specific_logger = logging.getLogger(logger_name)
-    specific_logger.handlers.clear()
-    stderr_handler = logging.StreamHandler(sys.stderr)
-    stderr_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    specific_logger.addHandler(stderr_handler)
-    specific_logger.setLevel(logging.ERROR)
-    specific_logger.propagate = False
+# Configuración de logging - CRÍTICO: enviar logs a stderr, NO stdout
+# para evitar contaminar las respuestas JSON del MCP. Una sola configuración
+# para todo el proceso: cola + hilo escritor, JSON estructurado (ver utils/logging_setup.py)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -41,29 +42,170 @@ try:
     env_path = os.path.join(os.path.dirname(__file__), '.env')
     if os.path.exists(env_path):
         load_dotenv(env_path)
-        logger.warning(f"✅ Variables de entorno cargadas desde {env_path}")
+        logger.warning("✅ Variables de entorno cargadas desde %s", env_path)
     else:
-        logger.warning(f"⚠️ No se encontró archivo .env en {env_path}")
+        logger.warning("⚠️ No se encontró archivo .env en %s", env_path)
 except ImportError:
     logger.warning("⚠️ python-dotenv no disponible, usando variables del sistema")
 
+class InstrumentedFastMCP(FastMCP):
+    """
+    FastMCP server that records latency and upstream calls of every tool call
+    and caps how many tool calls run at the same time.
+
+    In HTTP mode one process serves every client, so they all share the PA-API
+    client: search cache, rate limiter (one quota budget per associate tag),
+    worker pool and item store.
+
+    Tool calls have a priority class (see libs/amazon/admission.py): the long
+    jobs of BATCH_TOOLS are batch, the rest interactive. Batch calls take at
+    most MCP_MAX_BATCH_TOOLS of the tool slots and their PA-API calls only get
+    the rate limiter tokens interactive calls do not need, so single searches
+    stay fast while a campaign job runs. Dict results report the time the call
+    spent waiting for a slot and for tokens as queue_wait_ms.
+    """
+
+    # Tool calls running at the same time (MCP_MAX_CONCURRENT_TOOLS); the rest wait
+    DEFAULT_MAX_CONCURRENT_TOOLS = 16
+    # Tools that run long jobs with many PA-API calls: batch priority class
+    BATCH_TOOLS = frozenset({
+        'tool_amazon_bulk_search',
+        'tool_amazon_build_merchant_feed',
+        'tool_amazon_export_feed',
+        'tool_amazon_price_refresh',
+    })
+    # Seconds given to the requests in flight on shutdown (MCP_SHUTDOWN_TIMEOUT)
+    DEFAULT_SHUTDOWN_TIMEOUT = 30.0
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_concurrent_tools = max(1, int(os.getenv('MCP_MAX_CONCURRENT_TOOLS', self.DEFAULT_MAX_CONCURRENT_TOOLS)))
+        self._tool_slots = asyncio.Semaphore(self.max_concurrent_tools)
+        # Batch calls leave at least one slot to interactive calls (MCP_MAX_BATCH_TOOLS)
+        max_batch_tools = int(os.getenv('MCP_MAX_BATCH_TOOLS', self.max_concurrent_tools // 2))
+        self.max_batch_tools = min(max(1, max_batch_tools), max(1, self.max_concurrent_tools - 1))
+        self._batch_slots = asyncio.Semaphore(self.max_batch_tools)
+        self.active_tool_calls = 0
+        self.draining = False
+
+    def add_tool(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        super().add_tool(metrics.timed_tool(self._report_queue_wait(fn)), *args, **kwargs)
+
+    @staticmethod
+    def _report_queue_wait(fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a tool function so its dict results include queue_wait_ms."""
+        def with_queue_wait(result: Any) -> Any:
+            invocation = metrics.current_invocation()
+            if isinstance(result, dict) and invocation is not None and 'queue_wait_ms' not in result:
+                # A copy: the tool may return a dict it keeps (e.g. a cached one)
+                return {**result, 'queue_wait_ms': round(invocation.queue_seconds * 1000, 1)}
+            return result
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                return with_queue_wait(await fn(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return with_queue_wait(fn(*args, **kwargs))
+        return wrapper
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Sequence[Any]:
+        if self.draining:
+            raise ToolError("The server is shutting down; retry the call")
+        is_batch = name in self.BATCH_TOOLS
+        self.active_tool_calls += 1
+        try:
+            with metrics.tool_invocation(name) as invocation, priority(BATCH if is_batch else INTERACTIVE):
+                queued_at = time.perf_counter()
+                if is_batch:
+                    await self._batch_slots.acquire()
+                try:
+                    async with self._tool_slots:
+                        invocation.add_queue_wait(time.perf_counter() - queued_at)
+                        return await super().call_tool(name, arguments)
+                finally:
+                    if is_batch:
+                        self._batch_slots.release()
+        finally:
+            self.active_tool_calls -= 1
+
+    async def drain(self, timeout: float) -> None:
+        """Stop admitting tool calls and wait (up to `timeout` seconds) for the ones in flight."""
+        self.draining = True
+        deadline = asyncio.get_running_loop().time() + timeout
+        while self.active_tool_calls and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.1)
+        if self.active_tool_calls:
+            logger.warning("⚠️ %d llamadas a tools sin terminar al apagar", self.active_tool_calls)
+
+    def run_http(self, transport: str = "streamable-http") -> None:
+        """
+        Serve many MCP clients from this process over HTTP until SIGINT/SIGTERM.
+
+        On shutdown, new tool calls are rejected and the ones in flight get
+        MCP_SHUTDOWN_TIMEOUT seconds to finish before the connections are
+        closed. Host and port come from FASTMCP_HOST and FASTMCP_PORT
+        (default 127.0.0.1:8000).
+
+        Args:
+            transport (str): "streamable-http" (endpoint /mcp) or "sse" (endpoints /sse and /messages/).
+        """
+        import uvicorn
+        from utils.http_serving import DrainingServer
+
+        if transport == "streamable-http":
+            app = self.streamable_http_app()
+        elif transport == "sse":
+            app = self.sse_app()
+        else:
+            raise ValueError(f"Unknown HTTP transport: {transport}")
+        max_connections = int(os.getenv('MCP_HTTP_MAX_CONNECTIONS', 0))
+        shutdown_timeout = float(os.getenv('MCP_SHUTDOWN_TIMEOUT', self.DEFAULT_SHUTDOWN_TIMEOUT))
+        config = uvicorn.Config(
+            app,
+            host=self.settings.host,
+            port=self.settings.port,
+            # Above this many open connections uvicorn answers 503
+            limit_concurrency=max_connections or None,
+            # The tool calls were already drained; this only bounds closing the streams
+            timeout_graceful_shutdown=5,
+            # Keep the process-wide logging setup (JSON on stderr)
+            log_config=None,
+        )
+        if threading.current_thread() is threading.main_thread():
+            # uvicorn re-raises the shutdown signal once it has stopped: turn SIGTERM
+            # into SystemExit so the caller's cleanup (closing the PA-API client) runs
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        logger.warning("🌐 Servidor MCP %s en http://%s:%d", transport, self.settings.host, self.settings.port)
+        DrainingServer(config, drain=lambda: self.drain(shutdown_timeout)).run()
+
 # Crear servidor FastMCP
-mcp = FastMCP("dog-server")
+mcp = InstrumentedFastMCP("dog-server")
 
 @mcp.tool(
     name="tool_amazon_search_discovery",
 )
-def tool_amazon_search_items(
+async def tool_amazon_search_items(
     keywords: str,
     item_count: int = 10,
     search_index: str = SearchIndex.ALL,
-    sort_by: str = SortBy.RELEVANCE,
+    sort_by: str = "Relevance",
     min_price: int = None,
     max_price: int = None,
     only_with_ean: bool = True,
     browse_node_id: str = None,
-    availability: str = Availability.AVAILABLE  # Optional filter for item availability
-) -> List[AmazonProductPrettyResponse]:
+    availability: str = "Available",  # Optional filter for item availability
+    marketplace: str = None,
+    source: str = "amazon",
+    exclude_seen: str = None,
+    fields: List[str] = None,
+    max_title_chars: int = None,
+    max_description_chars: int = None,
+    format: str = "json"
+) -> Any:
     """
     Search for items based on keywords and search index.
 
@@ -109,7 +251,7 @@ def tool_amazon_search_items(
             - (str) "Vehicles": Translate: Coche - renting
             - (str) "VideoGames": Translate: Videojuegos
             - (str) "Watches": Translate: Relojes
-        item_count (int): Number of items to return (default is 10, maximum is 10 due to Amazon API limitations).
+        item_count (int): Number of items to return (default is 10, maximum is 100). Amazon returns 10 items per page, so pages are requested until enough items pass the filters (e.g. only_with_ean).
         sort_by (SortBy): Sorting criteria for the results (default is SortBy.RELEVANCE).
             - (str) "AvgCustomerReviews": Sorts results according to average customer reviews
             - (str) "Featured": Sorts results with featured items having higher rank. Recomended for search with search_index and without keywords.
@@ -124,6 +266,17 @@ def tool_amazon_search_items(
         availability (Availability): Filter for item availability (default is Availability.AVAILABLE).
             - (str) "Available": Translate: "Disponible"
             - (str) "IncludeOutOfStock": Translate: "Incluir sin stock"
+        marketplace (str, optional): Amazon marketplace code, e.g. "ES", "DE", "FR", "IT", "UK", "US" (default is the server default marketplace, usually "ES"). Each marketplace uses its own associate account and quota.
+        source (str): Where the products come from (default is "amazon").
+            - (str) "amazon": Search Amazon. Every product found is also saved in the server's local product index.
+            - (str) "local": Search only the local product index (products found by earlier searches, by default up to 24 hours old). No Amazon API call, so it is instant and free, but it only knows products seen before.
+            - (str) "hybrid": Search the local product index first and Amazon only for the products still missing. Recommended when running many related searches for the same campaign.
+            The local index matches every keyword (Spanish plurals and accents are ignored) in the title, brand, features and categories, and applies search_index, browse_node_id, min_price, max_price, only_with_ean and the price sorts.
+        exclude_seen (str, optional): Campaign name, e.g. "verano_playa_2025", to never get the same product twice in a campaign (default is None). Products already used in the campaign (same ASIN or EAN) are skipped and more result pages are requested until item_count new products are found; the products returned are recorded as used in the campaign, which is created on first use. Several campaigns can be given separated by commas, e.g. "verano_2025, verano_2024": products used in any of them are skipped and the new ones are recorded in the first one.
+        fields (List[str], optional): Only return these product fields, e.g. ["asin", "title", "price", "eans"] (default is all of them). Fields: title, asin, affiliate_link, price, old_price, image_url, description, features, brand, discount, categories, eans. asin is always included.
+        max_title_chars (int, optional): Cut titles to this many characters (default is no limit).
+        max_description_chars (int, optional): Cut descriptions to this many characters (default is no limit). Descriptions are the product features joined with " ||| " and often run to 1000+ characters; 200 is usually enough to choose products.
+        format (str): "json" (default): one object per product. "table": much smaller for many products: {"format": "table", "columns": [field names], "rows": [[values in column order], ...], "category_paths": [[[name, id], ...], ...]}, where the categories value of a row is the index of its path in category_paths.
 
     Returns:
         AmazonProductPrettyResponse: Search results containing items matching the criteria.
@@ -142,122 +295,527 @@ def tool_amazon_search_items(
                     - name: str = {name of the category}
                     - id: str = {ID of the category}
             - eans: List[str] = {list of EANs (European Article Numbers) of the product, if available}
+        An empty list (or a table without rows) means that nothing matched the search.
+
+    Raises:
+        ToolError: If Amazon failed; the message is a JSON summary with type, error_code, retryable and retry_after.
     """
 
+    from libs.amazon.projection import OutputOptions
+    from tools.amazon.tool_amazon_search_items import search_pretty_items
+
+    output = OutputOptions.parse(fields, max_title_chars, max_description_chars, format)
     try:
-        # Validate the search index
-        if not keywords:
-            raise ValueError("Keywords must not be empty.")
-        if min_price:
-            min_price = int(min_price)*100  # Convert to cents
-        if max_price:
-            max_price = int(max_price)*100  # Convert to cents
-        if min_price and max_price and min_price > max_price:
-            raise ValueError("Minimum price cannot be greater than maximum price.")
-
-        client = AmazonAPISingleton()
-        response = client.search_items(
+        pretty_items = await search_pretty_items(
             keywords=keywords,
-            search_index=search_index,
             item_count=item_count,
+            search_index=search_index,
             sort_by=sort_by,
             min_price=min_price,
             max_price=max_price,
+            only_with_ean=only_with_ean,
             browse_node_id=browse_node_id,
-            availability=availability
+            availability=availability,
+            marketplace=marketplace,
+            source=source,
+            exclude_seen=exclude_seen
         )
-
-        pretty_response: List[AmazonProductPrettyResponse] = []
-        for item in response.items:
-            # Safely extract price information
-            _price = None
-            if (item.offers
-                and item.offers.listings
-                and len(item.offers.listings) > 0 
-                and item.offers.listings[0].price
-                and item.offers.listings[0].price.amount
-            ):
-                _price = item.offers.listings[0].price.amount
-            
-            # Safely extract discount information
-            _discount = 0
-            if (item.offers
-                and item.offers.listings
-                and len(item.offers.listings) > 0
-                and item.offers.listings[0].price.savings
-                and item.offers.listings[0].price.savings.percentage
-                and item.offers.listings[0].price.savings.percentage > 0
-            ):
-                _discount = item.offers.listings[0].price.savings.percentage
-            
-            # Safely extract old price
-            _old_price = 0
-            if (item.offers 
-                and item.offers.listings 
-                and len(item.offers.listings) > 0 
-                and item.offers.listings[0].saving_basis 
-                and item.offers.listings[0].saving_basis.amount
-                and item.offers.listings[0].saving_basis.amount > 0
-            ):
-                _old_price = item.offers.listings[0].saving_basis.amount
-            
-            # Safely extract description
-            _description = ""
-            if (item.item_info 
-                and item.item_info.features 
-                and item.item_info.features.display_values
-            ):
-                _description = " ||| ".join(item.item_info.features.display_values)
-            
-            # Safely extract brand
-            _brand = None
-            if (item.item_info 
-                and item.item_info.by_line_info 
-                and item.item_info.by_line_info.brand 
-                and item.item_info.by_line_info.brand.display_value
-            ):
-                _brand = item.item_info.by_line_info.brand.display_value
-
-            _eans = []
-            if (item.item_info 
-                and item.item_info.external_ids 
-                and item.item_info.external_ids.ea_ns 
-                and item.item_info.external_ids.ea_ns.display_values
-            ):
-                _eans = item.item_info.external_ids.ea_ns.display_values
-
-            # Create the dataclass instance
-            pretty_item = AmazonProductPrettyResponse(
-                title=item.item_info.title.display_value if item.item_info and item.item_info.title else "",
-                asin=item.asin if item.asin else "",
-                affiliate_link=item.detail_page_url if item.detail_page_url else "",
-                price=_price,
-                old_price=_old_price,
-                image_url=item.images.primary.large.url if item.images and item.images.primary and item.images.primary.large else None,
-                description=_description,
-                features="",
-                brand=_brand,
-                discount=_discount,
-                categories=extract_categories(item.browse_node_info).categories if item.browse_node_info else [],
-                eans=_eans
-            )
-            if only_with_ean and len(_eans) == 0:
-                logger.info(f"Skipping item (ASIN: {pretty_item.asin}) due to no EANs.")
-                continue
-            pretty_response.append(pretty_item.to_dict())
-        if not pretty_response:
+        if not pretty_items:
             logger.info("No items found for the given search criteria.")
-            return []
         else:
-            logger.info(f"Found {len(pretty_response)} items matching the search criteria.")
-            return pretty_response
+            logger.info("Found %d items matching the search criteria.", len(pretty_items))
+        return output.render(pretty_items)
+
+    except APIError as e:
+        # Un fallo de Amazon no es "sin resultados": se devuelve como error de la tool
+        logger.error("Error during Amazon search: %s", e)
+        raise amazon_tool_error(e) from e
+
+@mcp.tool(
+    name="tool_amazon_get_items",
+)
+async def tool_amazon_get_items(
+    asins: List[str],
+    only_with_ean: bool = False,
+    marketplace: str = None,
+    fields: List[str] = None,
+    max_title_chars: int = None,
+    max_description_chars: int = None,
+    format: str = "json"
+) -> Dict[str, Any]:
+    """
+    Get the details of many products by ASIN in a single call.
+
+    The ASINs are split into batches of 10 (Amazon GetItems limit) that are requested
+    in parallel under the API rate limit, so hundreds of ASINs can be refreshed at once.
+
+    Args:
+        asins (List[str]): ASINs (Amazon Standard Identification Numbers) to look up. Any amount is accepted.
+        only_with_ean (bool): If True, only returns items with EANs (European Article Numbers) (default is False).
+        marketplace (str, optional): Amazon marketplace code, e.g. "ES", "DE", "FR", "IT", "UK", "US" (default is the server default marketplace, usually "ES"). Each marketplace uses its own associate account and quota.
+        fields (List[str], optional): Only return these product fields, e.g. ["asin", "title", "price", "eans"] (default is all of them). Fields: title, asin, affiliate_link, price, old_price, image_url, description, features, brand, discount, categories, eans. asin is always included.
+        max_title_chars (int, optional): Cut titles to this many characters (default is no limit).
+        max_description_chars (int, optional): Cut descriptions to this many characters (default is no limit). Descriptions are the product features joined with " ||| " and often run to 1000+ characters; 200 is usually enough to choose products.
+        format (str): Format of items. "json" (default): one object per product. "table": much smaller for many products: {"format": "table", "columns": [field names], "rows": [[values in column order], ...], "category_paths": [[[name, id], ...], ...]}, where the categories value of a row is the index of its path in category_paths.
+
+    Returns:
+        Dict: Lookup results.
+            - items: List[AmazonProductPrettyResponse] = {products found, in the same order as the input ASINs; a table with format="table"}
+            - missing: List[str] = {valid ASINs that Amazon did not return (not found or not available)}
+            - invalid: List[str] = {values that are not valid ASINs}
+            - skipped_without_ean: List[str] = {ASINs dropped because they have no EANs (only with only_with_ean=True)}
+            - queue_wait_ms: float = {milliseconds waited for a free tool slot and for the Amazon rate limit, summed over the Amazon requests (which may run in parallel)}
+
+    Raises:
+        ToolError: If Amazon failed; the message is a JSON summary with type, error_code, retryable and retry_after.
+    """
+    from libs.amazon import AmazonAPISingleton, AmazonPAAPI
+    from libs.amazon.projection import OutputOptions
+
+    output = OutputOptions.parse(fields, max_title_chars, max_description_chars, format)
+    valid_asins, invalid_asins = AmazonPAAPI.split_asins(asins)
+    result = {
+        'items': output.render([]),
+        'missing': [],
+        'invalid': invalid_asins,
+        'skipped_without_ean': [],
+    }
+    if not valid_asins:
+        return result
+
+    try:
+        client = AmazonAPISingleton(marketplace)
+        items = await client.get_items_async(valid_asins)
+
+        returned_asins = set()
+        found = []
+        with metrics.timer('amazon_transform_seconds', source='get_items'):
+            records = extract_items(items, client.marketplace)
+        for pretty_item in records:
+            returned_asins.add(pretty_item.asin)
+            if only_with_ean and len(pretty_item.eans) == 0:
+                result['skipped_without_ean'].append(pretty_item.asin)
+                metrics.inc('amazon_items_dropped_total', reason='no_ean', source='get_items')
+                continue
+            found.append(pretty_item)
+        result['items'] = output.render(found)
+        result['missing'] = [asin for asin in valid_asins if asin not in returned_asins]
+        logger.info("Found %d of %d requested items.", len(found), len(valid_asins))
+        return result
+
+    except APIError as e:
+        logger.error("Error during Amazon get items: %s", e)
+        raise amazon_tool_error(e) from e
+
+@mcp.tool(
+    name="tool_amazon_bulk_search",
+)
+async def tool_amazon_bulk_search(
+    searches: List[SearchSpec],
+    only_with_ean: bool = True,
+    marketplace: str = None,
+    exclude_seen: str = None,
+    fields: List[str] = None,
+    max_title_chars: int = None,
+    max_description_chars: int = None,
+    format: str = "json"
+) -> Dict[str, Any]:
+    """
+    Run many searches in one call and get a single merged, de-duplicated result set.
+
+    The searches run concurrently under the Amazon API quota of their marketplace (searches of
+    different marketplaces run in parallel). Products are de-duplicated across searches of the same
+    marketplace by ASIN and EAN, so the same product is never returned twice.
+
+    Args:
+        searches (List[SearchSpec]): The searches to run. Each search accepts:
+            - keywords (str): Keywords to search for (required).
+            - search_index (str): The category to search in (default is "All"). Same values as tool_amazon_search_discovery.
+            - sort_by (str): Sorting criteria (default is "Relevance"). Same values as tool_amazon_search_discovery.
+            - min_price (int, optional): Minimum price € filter.
+            - max_price (int, optional): Maximum price € filter.
+            - item_count (int): Number of items to return for this search (default is 10).
+            - browse_node_id (str, optional): Specific browse node ID to filter results.
+            - availability (str): "Available" or "IncludeOutOfStock" (default is "Available").
+            - marketplace (str, optional): Marketplace of this search (default is the marketplace argument).
+        only_with_ean (bool): If True, only returns items with EANs (European Article Numbers) (default is True).
+        marketplace (str, optional): Amazon marketplace code, e.g. "ES", "DE", "FR", "IT", "UK", "US" for the searches that do not set one (default is the server default marketplace, usually "ES"). Each marketplace uses its own associate account and quota.
+        exclude_seen (str, optional): Campaign name(s) whose already used products are skipped; the products returned are recorded as used. Same as in tool_amazon_search_items (default is None).
+        fields, max_title_chars, max_description_chars, format: Fields, length caps and format of items, same as in tool_amazon_search_discovery. In the table format, marketplace and queries are the last two columns.
+
+    Returns:
+        Dict: Merged results.
+            - items: List[AmazonProductPrettyResponse] = {unique products; each one has its 'marketplace' and a 'queries' list with the indexes of the searches that returned it; a table with format="table"}
+            - queries: List[Dict] = {one summary per search: keywords, search_index, marketplace, returned, new, duplicates, error, retryable}
+            - total_unique: int = {number of unique products}
+            - queue_wait_ms: float = {milliseconds waited for a free tool slot and for the Amazon rate limit, summed over the Amazon requests (which may run in parallel)}
+    """
+    from libs.amazon.projection import OutputOptions
+
+    output = OutputOptions.parse(fields, max_title_chars, max_description_chars, format)
+    if not searches:
+        return {'items': output.render([]), 'queries': [], 'total_unique': 0}
+
+    from tools.amazon.tool_amazon_bulk_search import bulk_search
+
+    result = await bulk_search(
+        searches, only_with_ean=only_with_ean, marketplace=marketplace, exclude_seen=exclude_seen, output=output
+    )
+    logger.info("Bulk search of %d queries found %d unique items.", len(searches), result['total_unique'])
+    return result
+
+@mcp.tool(
+    name="tool_amazon_build_merchant_feed",
+)
+async def tool_amazon_build_merchant_feed(
+    feed_name: str,
+    searches: List[SearchSpec],
+    target_count: int = 200,
+    only_with_ean: bool = True,
+    restart: bool = False,
+    marketplace: str = None
+) -> Dict[str, Any]:
+    """
+    Build a Google Merchant Center CSV feed for a whole campaign on the server.
+
+    Runs the searches, converts every product into a Merchant row (id, title, description, link,
+    image_link, availability, price, sale_price, brand, gtin, condition, product_type) and appends
+    it to the feed file until target_count unique products are written. Products never repeat
+    (by ASIN or EAN). Progress is checkpointed after every search: calling the tool again with
+    the same feed_name resumes where a failed run stopped. Only a summary is returned, not the products.
+    Written products are tracked under feed_name, so tool_amazon_price_refresh can later return just the rows
+    whose price or availability changed.
+
+    Args:
+        feed_name (str): Name of the feed, e.g. "verano_playa". The file is written as <feed_name>.csv.
+        searches (List[SearchSpec]): Searches of the campaign. Same fields as tool_amazon_bulk_search.
+        target_count (int): Number of products wanted in the feed (default is 200).
+        only_with_ean (bool): If True, only products with EAN (gtin) are added (default is True).
+        restart (bool): If True, deletes the existing feed and starts from scratch (default is False).
+        marketplace (str, optional): Amazon marketplace code, e.g. "ES", "DE", "FR", "IT", "UK", "US" of the whole feed: links, prices and currency (default is the server default marketplace, usually "ES").
+
+    Returns:
+        Dict: Summary of the run.
+            - feed_path: str = {path of the CSV feed}
+            - rows_written: int = {products added in this call}
+            - total_rows: int = {products in the feed}
+            - target_reached: bool = {True if the feed has target_count products}
+            - searches_completed / searches_pending: int = {progress over the searches}
+            - failed_searches: List[Dict] = {searches that failed in this call (keywords, error, retryable), retried on the next call}
+            - price_tracking: bool = {True if the written products are tracked for price refreshes}
+            - queue_wait_ms: float = {milliseconds waited for a free tool slot and for the Amazon rate limit, summed over the Amazon requests (which may run in parallel)}
+    """
+    if not feed_name:
+        raise ValueError("Feed name must not be empty.")
+
+    from tools.amazon.tool_amazon_merchant_feed import build_merchant_feed
+
+    summary = await build_merchant_feed(
+        feed_name=feed_name,
+        specs=searches,
+        target_count=target_count,
+        only_with_ean=only_with_ean,
+        restart=restart,
+        marketplace=marketplace
+    )
+    logger.info("Merchant feed %s: %d/%d rows.", summary['feed_path'], summary['total_rows'], target_count)
+    return summary
+
+@mcp.tool(
+    name="tool_amazon_export_feed",
+)
+async def tool_amazon_export_feed(
+    feed_name: str,
+    format: str = "csv",
+    compress: bool = False,
+    marketplace: str = None,
+    only_with_ean: bool = True,
+    max_offers_age_hours: float = 24,
+    max_file_rows: int = 0
+) -> Dict[str, Any]:
+    """
+    Export every product the server has already fetched (tens of thousands if needed) as Google Merchant Center feed files.
+
+    Unlike tool_amazon_build_merchant_feed, no search is run and no Amazon API call is made: the products come from the
+    server's item store, filled by every earlier search and lookup of the marketplace. Files are written on the server
+    and only a summary is returned. Files above the Merchant Center size limit (4 GB) or max_file_rows are split into
+    numbered parts: <feed_name>.csv, <feed_name>-2.csv...
+
+    Args:
+        feed_name (str): Name of the feed, e.g. "catalogo_es". Used for the file names.
+        format (str): "csv" (default), "tsv" or "xml" (RSS 2.0 with the g: Google product namespace).
+        compress (bool): If True, files are gzipped (.gz) (default is False).
+        marketplace (str, optional): Amazon marketplace code, e.g. "ES", "DE", "FR", "IT", "UK", "US" whose products are exported (default is the server default marketplace, usually "ES").
+        only_with_ean (bool): If True, only products with EAN (gtin) are exported (default is True).
+        max_offers_age_hours (float): Skip products whose price is older than this many hours (default is 24, as required by the Amazon Associates program; 0 exports every product).
+        max_file_rows (int): Products per file before a new part starts (default is 0, no limit).
+
+    Returns:
+        Dict: Summary of the export.
+            - files: List[Dict] = {path, rows, bytes (uncompressed) and file_bytes (on disk) of each file}
+            - rows: int = {products exported}
+            - skipped: Dict[str, int] = {products left out by reason: no_ean, no_price}
+    """
+    from tools.amazon.tool_amazon_feed_export import export_feed
+
+    if not feed_name:
+        raise ValueError("Feed name must not be empty.")
+    summary = await asyncio.to_thread(
+        export_feed,
+        feed_name=feed_name,
+        format=format,
+        compress=compress,
+        marketplace=marketplace,
+        only_with_ean=only_with_ean,
+        max_offers_age=max_offers_age_hours * 3600 or None,
+        max_file_rows=max(0, max_file_rows)
+    )
+    logger.info("Feed export %s: %d rows in %d files.", feed_name, summary['rows'], len(summary['files']))
+    return summary
+
+@mcp.tool(
+    name="tool_amazon_categories",
+)
+async def tool_amazon_categories(
+    browse_node_id: str = None,
+    query: str = None,
+    marketplace: str = None,
+    refresh: bool = False,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """
+    Find Amazon categories (browse nodes) to use as browse_node_id in the search tools.
+
+    Answers from the categories the server has already seen in search and product results, so
+    it usually costs no Amazon API call. A browse_node_id that is not known yet is looked up in
+    Amazon (one API call), which also returns all of its subcategories.
+
+    Use it to:
+        - resolve a browse_node_id: pass browse_node_id to get its full path and its subcategories.
+        - find categories by name: pass query, e.g. "auriculares" or "camping tiendas".
+        - list the top-level categories seen so far: pass neither.
+
+    Args:
+        browse_node_id (str, optional): Category to resolve (default is None).
+        query (str, optional): Words to look for in the category names, case and accent insensitive (default is None).
+        marketplace (str, optional): Amazon marketplace code, e.g. "ES", "DE", "FR", "IT", "UK", "US" (default is the server default marketplace, usually "ES"). Category ids are different in each marketplace.
+        refresh (bool): If True, browse_node_id is requested from Amazon even if it is known, to get all of its subcategories (default is False).
+        limit (int): Maximum number of categories returned by a name search or the top-level list (default is 20, maximum is 100).
+
+    Returns:
+        Dict: Categories found.
+            - marketplace: str = {marketplace of the categories}
+            - source: str = {"index" if answered from the categories already seen, "api" if Amazon was called}
+            - nodes: List[Dict] = {categories: id, name, display_name, path (list of {name, id} from the root to the category), parent_id, is_root, children (list of {id, name}), children_complete (True if children lists all the subcategories)}
+            - queue_wait_ms: float = {milliseconds waited for a free tool slot and for the Amazon rate limit, summed over the Amazon requests (which may run in parallel)}
+
+    Raises:
+        ToolError: If Amazon failed; the message is a JSON summary with type, error_code, retryable and retry_after.
+    """
+    from tools.amazon.tool_amazon_categories import browse_categories
+
+    try:
+        return await browse_categories(
+            browse_node_id=browse_node_id,
+            query=query,
+            marketplace=marketplace,
+            refresh=refresh,
+            limit=limit
+        )
+    except APIError as e:
+        logger.error("Error during Amazon category lookup: %s", e)
+        raise amazon_tool_error(e) from e
+
+@mcp.tool(
+    name="tool_amazon_campaigns",
+)
+async def tool_amazon_campaigns(
+    action: str = "list",
+    campaign: str = None,
+    asins: List[str] = None
+) -> Dict[str, Any]:
+    """
+    Manage the campaigns that record which products were already used (see exclude_seen in the search tools).
+
+    Args:
+        action (str): What to do (default is "list").
+            - (str) "list": Summary of every campaign, or of `campaign` if given.
+            - (str) "mark": Record `asins` as used in `campaign`, e.g. products chosen without exclude_seen.
+            - (str) "archive": Close `campaign` at the end of the season. Its products are still excluded when it is named in exclude_seen, stored in a compact form (a few bytes per product, with about 1 in 1000 new products wrongly excluded), but no products can be added to it anymore.
+            - (str) "forget": Delete `campaign` and its products.
+        campaign (str, optional): Campaign name (required for mark, archive and forget).
+        asins (List[str], optional): ASINs to record (only for mark).
+
+    Returns:
+        Dict: campaigns: List[Dict] = {campaign, state ("active" or "archived"), products, keys (ASINs and EANs), memory_bytes, created_at, archived_at}, plus marked (int) for "mark" and forgotten (bool) for "forget".
+    """
+    from libs.amazon.seen_registry import seen_registry
+
+    if action not in ("list", "mark", "archive", "forget"):
+        raise ValueError("Action must be one of: list, mark, archive, forget.")
+    if action != "list" and not campaign:
+        raise ValueError(f"A campaign name is required for {action}.")
+
+    result: Dict[str, Any] = {}
+    if action == "mark":
+        from libs.amazon import AmazonPAAPI
+        valid_asins, _ = AmazonPAAPI.split_asins(asins or [])
+        result['marked'] = await asyncio.to_thread(seen_registry.mark, campaign, [(asin, ()) for asin in valid_asins])
+    elif action == "archive":
+        await asyncio.to_thread(seen_registry.archive, campaign)
+    elif action == "forget":
+        result['forgotten'] = await asyncio.to_thread(seen_registry.forget, campaign)
+
+    if campaign and action != "forget":
+        stats = await asyncio.to_thread(seen_registry.campaign_stats, campaign)
+        result['campaigns'] = [stats] if stats else []
+    else:
+        result['campaigns'] = await asyncio.to_thread(seen_registry.campaigns)
+    return result
+
+@mcp.tool(
+    name="tool_amazon_price_refresh",
+)
+async def tool_amazon_price_refresh(
+    action: str = "refresh",
+    feed: str = None,
+    asins: List[str] = None,
+    marketplace: str = None,
+    since: int = 0,
+    force: bool = False,
+    limit: int = 500
+) -> Dict[str, Any]:
+    """
+    Keep published feeds up to date: report only the products whose price, sale price or availability changed.
+
+    Products written by tool_amazon_build_merchant_feed are tracked under the feed name with the offer they were
+    published with. A refresh asks Amazon for the current offers of the tracked products that are due (a product
+    that did not change is checked less and less often, up to once a day; one that changed is checked again within
+    the hour) and returns just the changed rows, ready for a Merchant Center supplemental feed.
+
+    Args:
+        action (str): What to do (default is "refresh").
+            - (str) "refresh": Check the products that are due now (all of them with force=True) and return the changed rows.
+            - (str) "changes": Changed rows recorded since `since`, including the ones found by the server's scheduled refreshes. Pass the returned cursor as `since` next time.
+            - (str) "track": Track `asins` under `feed` (their current offer is recorded on the next refresh, without reporting it as a change).
+            - (str) "untrack": Stop tracking `asins` of `feed`, or the whole feed if no asins are given.
+            - (str) "list": Tracked feeds with their number of products and products due.
+        feed (str, optional): Feed name (required for track and untrack; for the other actions, only products of this feed).
+        asins (List[str], optional): ASINs to track or untrack.
+        marketplace (str, optional): Amazon marketplace code, e.g. "ES", "DE", "FR", "IT", "UK", "US" (track and untrack default to the server default marketplace; the other actions cover every marketplace unless given).
+        since (int): Cursor returned by the previous "changes" call (default is 0, every change of the last 7 days).
+        force (bool): If True, "refresh" checks every tracked product, due or not (default is False).
+        limit (int): Maximum products checked per marketplace ("refresh") or changed rows returned ("changes") (default is 500).
+
+    Returns:
+        Dict: Result of the action.
+            - changes: List[Dict] = {changed rows: id (ASIN), price, sale_price ("" without a deal), availability ("in_stock", "out_of_stock", "preorder", "backorder"), marketplace, changed (names of the fields that changed)} for "refresh" and "changes"
+            - polled / failed: int = {products checked / products whose check failed and stay due} for "refresh"
+            - cursor: int = {value to pass as since next time} for "changes"
+            - feeds: List[Dict] = {feed, marketplace, products, due, last_checked_at, last_changed_at} for "track", "untrack" and "list"
+            - queue_wait_ms: float = {milliseconds waited for a free tool slot and for the Amazon rate limit, summed over the Amazon requests (which may run in parallel)}
+    """
+    from tools.amazon.tool_amazon_price_refresh import price_refresh
+
+    try:
+        return await price_refresh(
+            action=action,
+            feed=feed,
+            asins=asins,
+            marketplace=marketplace,
+            since=since,
+            force=force,
+            limit=limit
+        )
+    except APIError as e:
+        logger.error("Error during price refresh: %s", e)
+        raise amazon_tool_error(e) from e
+
+@mcp.tool(
+    name="tool_amazon_metrics",
+)
+def tool_amazon_metrics(format: str = "json") -> Any:
+    """
+    Get the server performance metrics: where the time of the tool calls goes and how the PA-API quota is used.
 
+    Includes latency histograms per stage (request signing, HTTP round trip to Amazon, SDK deserialization,
+    item transform, tool body and MCP serialization), upstream PA-API calls per tool call, throttled and failed
+    requests, cache and item store hits and items dropped by only_with_ean.
+
+    Args:
+        format (str): "json" for a structured summary (default) or "prometheus" for the Prometheus text format.
+
+    Returns:
+        Dict | str: The metrics. In json format: counters, histograms (count, sum, avg, p50, p95, p99 bucket bounds in seconds) and gauges.
+    """
+    if format == "prometheus":
+        return metrics.to_prometheus()
+    return metrics.snapshot()
+
+@mcp.resource(
+    "metrics://amazon/prometheus",
+    name="amazon_metrics_prometheus",
+    description="Server performance metrics in the Prometheus text format.",
+    mime_type="text/plain"
+)
+def resource_amazon_metrics() -> str:
+    return metrics.to_prometheus()
+
+def amazon_tool_error(error: APIError) -> ToolError:
+    """
+    Tool error for a failed PA-API call. The message is the JSON error summary
+    (type, message, error_code, retryable, retry_after), so the client can tell
+    "nothing found" (an empty result) from a failure and knows whether to retry.
+    """
+    return ToolError(json.dumps(error.to_dict(), ensure_ascii=False))
+
+def warm_up_amazon_client() -> None:
+    """
+    Create the PA-API client and open its HTTP connection in the background,
+    so the first tool call does not pay for the imports and the TLS handshake.
+    """
+    try:
+        from libs.amazon import AmazonAPISingleton
+        AmazonAPISingleton().warm_up()
     except Exception as e:
-        # Handle exceptions and return an empty SearchResult
-        logger.error(f"Error during Amazon search: {e}")
-        return []
+        logger.warning("⚠️ Warm-up del cliente de Amazon fallido: %s", e)
+
+def start_price_refresh() -> None:
+    """
+    Refresh the prices of the tracked products every AMAZON_PRICE_REFRESH_INTERVAL
+    seconds in the background (0, the default, leaves it to tool_amazon_price_refresh).
+    """
+    interval = float(os.getenv('AMAZON_PRICE_REFRESH_INTERVAL', 0))
+    if interval <= 0:
+        return
+    from libs.amazon.price_refresh import price_refresher
+    if price_refresher.enabled:
+        price_refresher.start(interval)
+
+def close_amazon_client() -> None:
+    """Close the PA-API clients that tool calls (or the warm-up) created."""
+    price_refresh = sys.modules.get('libs.amazon.price_refresh')
+    if price_refresh is not None:
+        price_refresh.price_refresher.close()
+    lib_amazon = sys.modules.get('libs.amazon.lib_amazon')
+    if lib_amazon is not None:
+        lib_amazon.AmazonPAAPI.close_all()
 
 if __name__ == "__main__":
     # Solo logs críticos van a stderr - no contaminar stdout del MCP
     logger.warning("🐕 Iniciando servidor MCP FastMCP")
-    mcp.run()
\ No newline at end of file
+    if os.getenv('AMAZON_WARMUP', 'false').lower() in ('1', 'true', 'yes'):
+        threading.Thread(target=warm_up_amazon_client, name="amazon-warmup", daemon=True).start()
+    # Refresco programado de precios de los productos seguidos (AMAZON_PRICE_REFRESH_INTERVAL)
+    start_price_refresh()
+
+    # MCP_TRANSPORT: "stdio" (por defecto, un proceso por cliente como en Claude Desktop),
+    # "streamable-http" o "sse" (un proceso compartido por muchos clientes)
+    transport = os.getenv('MCP_TRANSPORT', 'stdio').lower()
+    try:
+        if transport == "stdio":
+            mcp.run()
+        else:
+            mcp.run_http(transport)
+    finally:
+        close_amazon_client()
\ No newline at end of file
@@ -23,7 +23,7 @@ fi
 
 # Probar el contenedor (debe responder a stdin/stdout)
 echo "🧪 Probando comunicación MCP..."
-echo '{"jsonrpc": "2.0", "method": "tools/list", "id": 1}' | docker run -i --rm mcp/${MCP_NAME} mcp-server
+echo '{"jsonrpc": "2.0", "method": "tools/list", "id": 1}' | docker run -i --rm -v mcp_amazon_data:/app/data mcp/${MCP_NAME} mcp-server
 
 echo ""
 echo "📋 Configuración para Claude Desktop:"
@@ -0,0 +1,34 @@
+"""Shared fixtures of the test suite."""
+
+import pytest
+
+
+class FakeClock:
+    """
+    Stand-in for the `time` module of the modules under test, so TTLs and
+    backoffs can be checked without sleeping.
+    """
+
+    def __init__(self, monkeypatch):
+        self.now = 1_700_000_000.0
+        self._monkeypatch = monkeypatch
+
+    def install(self, *modules) -> 'FakeClock':
+        """Make `modules` read this clock through their `time` global."""
+        for module in modules:
+            self._monkeypatch.setattr(module, 'time', self)
+        return self
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    return FakeClock(monkeypatch)
@@ -0,0 +1,29 @@
+"""Builders shared by the tests."""
+
+from libs.amazon.models import CategoryRef, ProductRecord
+
+
+def product_record(
+    asin,
+    title="",
+    price=None,
+    discount=0,
+    brand=None,
+    description="",
+    categories=(),
+    eans=()
+):
+    """ProductRecord with the given values; categories as (name, node_id) pairs."""
+    return ProductRecord(
+        asin=asin,
+        title=title,
+        affiliate_link=f"https://www.amazon.es/dp/{asin}",
+        price=price,
+        old_price=0,
+        image_url=None,
+        description=description,
+        brand=brand,
+        discount=discount,
+        categories=tuple(CategoryRef(name, node_id) for name, node_id in categories),
+        eans=tuple(eans)
+    )
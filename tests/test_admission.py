@@ -0,0 +1,244 @@
+"""Tests of the priority-aware admission control in front of the rate limiter."""
+
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from libs.amazon.admission import AdmissionScheduler, BACKGROUND, BATCH, INTERACTIVE, priority
+from libs.amazon.lib_amazon import AmazonPAAPI
+from libs.amazon.models import OverloadedError
+from libs.amazon.rate_limiter import TokenBucketRateLimiter
+from libs.amazon.resilience import CircuitBreaker, RetryPolicy
+
+MAX_QUEUE = {'interactive': 8, 'batch': 8, 'background': 8}
+DEADLINES = {'interactive': 5.0, 'batch': 5.0, 'background': 5.0}
+
+
+class FakeLimiter:
+    """Token bucket whose tokens are handed in by the test instead of by the clock."""
+
+    def __init__(self, tokens=0, rate=100.0, burst=1, refill_in=0.005):
+        self.tokens = tokens
+        self.rate = rate
+        self.burst = burst
+        self.refill_in = refill_in
+        self._lock = threading.Lock()
+
+    def add(self, tokens=1):
+        with self._lock:
+            self.tokens += tokens
+
+    def try_acquire(self, keep=0.0):
+        with self._lock:
+            if self.tokens < 1 + keep:
+                return False
+            self.tokens -= 1
+            return True
+
+    def time_to_token(self, keep=0.0):
+        with self._lock:
+            return 0.0 if self.tokens >= 1 + keep else self.refill_in
+
+
+def _wait_for(condition, timeout=2.0):
+    """Poll `condition` until it holds; fail the test if it never does."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.005)
+
+
+def _start(scheduler, level, order, name):
+    """Acquire a token in a thread under `level` and record `name` once admitted."""
+    def run():
+        with priority(level):
+            scheduler.acquire()
+        order.append(name)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_reserve_is_clamped_to_the_burst_with_a_warning(caplog):
+    limiter = TokenBucketRateLimiter(rate=1.0, burst=1)
+    with caplog.at_level(logging.WARNING, logger='libs.amazon.admission'):
+        scheduler = AdmissionScheduler(limiter, MAX_QUEUE, DEADLINES, interactive_reserve=1.0, name='ES')
+    assert scheduler.interactive_reserve == 0
+    assert "Interactive reserve lowered from 1.0 to 0" in caplog.text
+
+
+def test_batch_calls_leave_the_reserve_to_interactive_ones():
+    limiter = TokenBucketRateLimiter(rate=0.01, burst=2)
+    scheduler = AdmissionScheduler(limiter, MAX_QUEUE, DEADLINES, interactive_reserve=1.0)
+    with priority(BATCH):
+        assert scheduler.try_acquire()
+        assert not scheduler.try_acquire()
+    assert scheduler.try_acquire()
+
+
+def test_interactive_call_overtakes_a_batch_backlog():
+    limiter = TokenBucketRateLimiter(rate=20.0, burst=2)
+    scheduler = AdmissionScheduler(limiter, MAX_QUEUE, DEADLINES, interactive_reserve=1.0)
+    while limiter.try_acquire():
+        pass  # Start with an empty bucket so the batch calls queue
+    order = []
+    threads = [_start(scheduler, BATCH, order, f'batch-{n}') for n in range(5)]
+    _wait_for(lambda: scheduler.queue_depth == 5)
+
+    with priority(INTERACTIVE):
+        scheduler.acquire()
+    order.append('interactive')
+
+    for thread in threads:
+        thread.join(timeout=5)
+    # The backlog needs a full token per call plus the reserve, the
+    # interactive call only the next token: at most one batch call gets
+    # through first
+    assert order.index('interactive') <= 1
+    assert len(order) == 6
+
+
+def test_free_tokens_go_to_the_highest_class_first():
+    limiter = FakeLimiter()
+    scheduler = AdmissionScheduler(limiter, MAX_QUEUE, DEADLINES)
+    order = []
+    threads = []
+    # Queue them lowest class first, so arrival order alone would be wrong
+    for n, level in enumerate([BACKGROUND, BATCH, BACKGROUND, BATCH, INTERACTIVE]):
+        threads.append(_start(scheduler, level, order, f'{level}-{n}'))
+        _wait_for(lambda: scheduler.queue_depth == n + 1)
+
+    for admitted in range(1, 6):
+        limiter.add()
+        _wait_for(lambda: len(order) == admitted)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == ['interactive-4', 'batch-1', 'batch-3', 'background-0', 'background-2']
+
+
+def test_call_is_shed_when_its_queue_is_full():
+    limiter = FakeLimiter()
+    scheduler = AdmissionScheduler(limiter, dict(MAX_QUEUE, batch=1), DEADLINES)
+    order = []
+    thread = _start(scheduler, BATCH, order, 'queued')
+    _wait_for(lambda: scheduler.queue_depth == 1)
+
+    with priority(BATCH), pytest.raises(OverloadedError) as error:
+        scheduler.acquire()
+    assert error.value.retryable
+    assert scheduler.stats()['shed'] == {(BATCH, 'queue_full'): 1}
+
+    limiter.add()
+    thread.join(timeout=5)
+    assert order == ['queued']
+
+
+def test_call_is_shed_when_its_estimated_wait_exceeds_the_deadline():
+    limiter = FakeLimiter(rate=1.0, refill_in=0.5)
+    scheduler = AdmissionScheduler(limiter, MAX_QUEUE, dict(DEADLINES, batch=2.0))
+    order = []
+    threads = [_start(scheduler, BATCH, order, f'batch-{n}') for n in range(2)]
+    _wait_for(lambda: scheduler.queue_depth == 2)
+
+    # 0.5 s to the next token plus one second per call ahead of it
+    with priority(BATCH), pytest.raises(OverloadedError) as error:
+        scheduler.acquire()
+    assert error.value.retry_after == pytest.approx(0.5)
+    assert scheduler.stats()['shed'] == {(BATCH, 'deadline'): 1}
+    assert scheduler.queue_depth == 2
+
+    limiter.add(2)
+    for thread in threads:
+        thread.join(timeout=5)
+
+
+def test_call_is_shed_when_it_waits_past_the_deadline():
+    limiter = FakeLimiter()
+    scheduler = AdmissionScheduler(limiter, MAX_QUEUE, dict(DEADLINES, interactive=0.1))
+    started_at = time.monotonic()
+    with pytest.raises(OverloadedError):
+        scheduler.acquire()
+    assert time.monotonic() - started_at >= 0.1
+    assert scheduler.stats()['shed'] == {(INTERACTIVE, 'timeout'): 1}
+    assert scheduler.queue_depth == 0
+
+
+def test_cancelled_async_call_leaves_the_queue():
+    limiter = FakeLimiter()
+    scheduler = AdmissionScheduler(limiter, MAX_QUEUE, DEADLINES)
+
+    async def scenario():
+        task = asyncio.create_task(scheduler.acquire_async())
+        while scheduler.queue_depth == 0:
+            await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler.queue_depth == 0
+
+        # The token the cancelled call waited for goes to the next one
+        limiter.add()
+        await asyncio.wait_for(scheduler.acquire_async(), timeout=1)
+        assert limiter.tokens == 0
+
+    asyncio.run(scenario())
+
+
+def _upstream_client(scheduler, breaker):
+    """AmazonPAAPI with only the parts `_call_upstream` uses (no credentials, no PA-API)."""
+    client = object.__new__(AmazonPAAPI)
+    client.marketplace = 'ES'
+    client.admission = scheduler
+    client.rate_limiter = scheduler.limiter
+    client.circuit_breaker = breaker
+    client.retry_policy = RetryPolicy(max_attempts=1)
+    client.hedge_delay = 0.0
+    client._executor = None  # The event loop's default executor
+    return client
+
+
+def test_shed_half_open_probe_gives_its_slot_back():
+    limiter = FakeLimiter(refill_in=60.0)
+    scheduler = AdmissionScheduler(limiter, MAX_QUEUE, DEADLINES)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    client = _upstream_client(scheduler, breaker)
+    calls = []
+
+    # The probe would wait a minute for a token: shed before reaching Amazon
+    with pytest.raises(OverloadedError):
+        client._call_upstream('get_items', calls.append, 'probe')
+    assert calls == []
+
+    limiter.add()
+    client._call_upstream('get_items', calls.append, 'next')
+    assert calls == ['next']
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_async_half_open_probe_gives_its_slot_back():
+    limiter = FakeLimiter(refill_in=60.0)
+    scheduler = AdmissionScheduler(limiter, MAX_QUEUE, dict(DEADLINES, interactive=120.0))
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    client = _upstream_client(scheduler, breaker)
+    calls = []
+
+    async def scenario():
+        probe = asyncio.create_task(client._call_upstream_async('get_items', calls.append, 'probe'))
+        while scheduler.queue_depth == 0:
+            await asyncio.sleep(0.005)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        limiter.add()
+        await client._call_upstream_async('get_items', calls.append, 'next')
+
+    asyncio.run(scenario())
+    assert calls == ['next']
+    assert breaker.state == CircuitBreaker.CLOSED
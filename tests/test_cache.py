@@ -0,0 +1,155 @@
+"""Tests of the in-memory PA-API response cache."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from libs.amazon import cache as cache_module
+from libs.amazon.cache import ResponseCache
+
+
+@pytest.fixture
+def clock(clock):
+    return clock.install(cache_module)
+
+
+def test_concurrent_misses_share_one_loader_call():
+    cache = ResponseCache()
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(2)
+        return 'value'
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load('key', loader)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while cache.stats()['coalesced'] < 4 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert calls == [1]
+    assert results == ['value'] * 5
+    assert cache.stats()['coalesced'] == 4
+
+
+def test_concurrent_async_misses_share_one_loader_call():
+    cache = ResponseCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'value'
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load_async('key', loader) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ['value'] * 5
+    assert calls == [1]
+
+
+def test_loader_error_reaches_every_waiter_and_is_not_cached():
+    cache = ResponseCache()
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load('key', failing)
+    assert cache.get_or_load('key', lambda: 'value') == 'value'
+
+
+def test_values_rejected_by_should_cache_are_loaded_again():
+    cache = ResponseCache()
+    cache.get_or_load('key', lambda: [], should_cache=bool)
+    assert cache.get_or_load('key', lambda: ['item'], should_cache=bool) == ['item']
+    assert cache.stats()['misses'] == 2
+
+
+def test_entries_expire_after_ttl_and_stale_ttl(clock):
+    cache = ResponseCache(ttl=10, stale_ttl=0)
+    cache.get_or_load('key', lambda: 'old')
+    clock.advance(5)
+    assert cache.get_or_load('key', lambda: 'new') == 'old'
+    clock.advance(10)
+    assert cache.get_or_load('key', lambda: 'new') == 'new'
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_entries=2)
+    cache.get_or_load('a', lambda: 'a')
+    cache.get_or_load('b', lambda: 'b')
+    cache.get_or_load('a', lambda: 'reloaded')  # 'b' is now the least recently used
+    cache.get_or_load('c', lambda: 'c')
+
+    assert cache.get_or_load('a', lambda: 'reloaded') == 'a'
+    assert cache.get_or_load('b', lambda: 'reloaded') == 'reloaded'
+    assert cache.stats()['evictions'] == 2
+
+
+def test_byte_bound_evicts_and_skips_oversized_values():
+    cache = ResponseCache(max_bytes=100)
+    cache.get_or_load('a', lambda: 'a', sizeof=lambda value: 60)
+    cache.get_or_load('b', lambda: 'b', sizeof=lambda value: 60)
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == 60
+
+    cache.get_or_load('huge', lambda: 'huge', sizeof=lambda value: 500)
+    assert cache.stats()['entries'] == 1
+    assert cache.get_or_load('huge', lambda: 'again', sizeof=lambda value: 500) == 'again'
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock):
+    cache = ResponseCache(ttl=10, stale_ttl=60)
+    cache.get_or_load('key', lambda: 'old')
+    clock.advance(30)
+
+    refreshed = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        refreshed.wait(2)
+        return 'new'
+
+    assert cache.get_or_load('key', loader) == 'old'
+    assert cache.get_or_load('key', loader) == 'old'
+    refreshed.set()
+    deadline = time.monotonic() + 2
+    while cache.stats()['inflight'] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    assert calls == [1]
+    assert cache.stats()['stale_hits'] == 2
+    assert cache.get_or_load('key', loader) == 'new'
+
+
+def test_failed_refresh_keeps_serving_the_stale_value(clock):
+    cache = ResponseCache(ttl=10, stale_ttl=60)
+    cache.get_or_load('key', lambda: 'old')
+    clock.advance(30)
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        value = await cache.get_or_load_async('key', failing)
+        await asyncio.sleep(0.01)  # Let the refresh task fail
+        return value
+
+    assert asyncio.run(scenario()) == 'old'
+    assert cache.get_or_load('key', lambda: 'unused') == 'old'
@@ -0,0 +1,90 @@
+"""Tests of the split, atomically renamed feed files of the Merchant feed export."""
+
+import gzip
+import os
+
+from tools.amazon.tool_amazon_feed_export import CsvFeedFormat, RssFeedFormat, SplitFeedWriter
+
+COLUMNS = ['id', 'title', 'price']
+
+
+def _row(n):
+    return {'id': f"B{n:03d}", 'title': f"Producto {n}", 'price': "10.00 EUR"}
+
+
+def _write(writer, feed_format, rows):
+    for n in range(rows):
+        writer.write(feed_format.row(_row(n)))
+    return writer.close()
+
+
+def test_files_are_split_by_row_count(tmp_path):
+    feed_format = CsvFeedFormat(COLUMNS)
+    writer = SplitFeedWriter(str(tmp_path / "feed"), feed_format, "feed", max_rows=4)
+    files = _write(writer, feed_format, 10)
+
+    assert [os.path.basename(file['path']) for file in files] == ["feed.csv", "feed-2.csv", "feed-3.csv"]
+    assert [file['rows'] for file in files] == [4, 4, 2]
+    for file in files:
+        lines = open(file['path'], encoding='utf-8').read().splitlines()
+        assert lines[0] == "id,title,price"
+        assert len(lines) == file['rows'] + 1
+        assert file['bytes'] == os.path.getsize(file['path'])
+
+
+def test_files_are_split_before_the_byte_limit(tmp_path):
+    feed_format = RssFeedFormat(COLUMNS, site_url="https://www.amazon.es")
+    row_bytes = len(feed_format.row(_row(0)))
+    max_bytes = len(feed_format.header("feed")) + len(feed_format.footer()) + 3 * row_bytes
+    writer = SplitFeedWriter(str(tmp_path / "feed"), feed_format, "feed", max_bytes=max_bytes)
+    files = _write(writer, feed_format, 7)
+
+    assert [file['rows'] for file in files] == [3, 3, 1]
+    assert all(file['bytes'] <= max_bytes for file in files)
+    for file in files:
+        text = open(file['path'], encoding='utf-8').read()
+        assert text.startswith('<?xml') and text.endswith("</rss>\n")
+
+
+def test_an_oversized_row_still_gets_its_own_file(tmp_path):
+    feed_format = CsvFeedFormat(COLUMNS)
+    writer = SplitFeedWriter(str(tmp_path / "feed"), feed_format, "feed", max_bytes=10)
+    assert [file['rows'] for file in _write(writer, feed_format, 2)] == [1, 1]
+
+
+def test_files_are_renamed_only_when_complete(tmp_path):
+    feed_format = CsvFeedFormat(COLUMNS)
+    writer = SplitFeedWriter(str(tmp_path / "feed"), feed_format, "feed", max_rows=2)
+    for n in range(3):
+        writer.write(feed_format.row(_row(n)))
+
+    assert sorted(os.listdir(tmp_path)) == ["feed-2.csv.tmp", "feed.csv"]
+    writer.close()
+    assert sorted(os.listdir(tmp_path)) == ["feed-2.csv", "feed.csv"]
+
+
+def test_abort_drops_only_the_partial_file(tmp_path):
+    feed_format = CsvFeedFormat(COLUMNS)
+    writer = SplitFeedWriter(str(tmp_path / "feed"), feed_format, "feed", max_rows=2)
+    for n in range(3):
+        writer.write(feed_format.row(_row(n)))
+    writer.abort()
+    assert os.listdir(tmp_path) == ["feed.csv"]
+
+
+def test_empty_feed_gets_one_file_with_header_and_footer(tmp_path):
+    feed_format = RssFeedFormat(COLUMNS)
+    files = SplitFeedWriter(str(tmp_path / "feed"), feed_format, "feed").close()
+    assert [file['rows'] for file in files] == [0]
+    assert "<channel>" in open(files[0]['path'], encoding='utf-8').read()
+
+
+def test_compressed_parts_count_uncompressed_bytes(tmp_path):
+    feed_format = CsvFeedFormat(COLUMNS)
+    writer = SplitFeedWriter(str(tmp_path / "feed"), feed_format, "feed", compress=True, max_rows=50)
+    files = _write(writer, feed_format, 60)
+
+    assert [os.path.basename(file['path']) for file in files] == ["feed.csv.gz", "feed-2.csv.gz"]
+    with gzip.open(files[0]['path'], 'rb') as feed:
+        assert len(feed.read()) == files[0]['bytes']
+    assert files[0]['file_bytes'] < files[0]['bytes']
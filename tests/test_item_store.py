@@ -0,0 +1,125 @@
+"""Tests of the on-disk PA-API item store."""
+
+import json
+
+import pytest
+
+from libs.amazon import item_store as item_store_module
+from libs.amazon.item_store import ItemStore
+from libs.amazon.models import RESOURCE_PROFILE_RANK, ResourceProfile
+
+DISCOVERY = RESOURCE_PROFILE_RANK[ResourceProfile.DISCOVERY]
+FEED = RESOURCE_PROFILE_RANK[ResourceProfile.FEED]
+
+
+@pytest.fixture
+def clock(clock):
+    return clock.install(item_store_module)
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = ItemStore(str(tmp_path / "items.sqlite3"), static_ttl=1000, offers_ttl=100, search_ttl=500)
+    yield store
+    store.close()
+
+
+def _item(asin, price=10.0):
+    return {
+        'ASIN': asin,
+        'ItemInfo': {'Title': {'DisplayValue': f"Item {asin}"}},
+        'Offers': {'Listings': [{'Price': {'Amount': price}}]},
+    }
+
+
+def test_items_stay_fresh_until_the_offers_ttl(store, clock):
+    store.put_items([_item('A1'), _item('A2')])
+    assert set(store.get_items(['A1', 'A2', 'MISSING'])) == {'A1', 'A2'}
+
+    clock.advance(101)
+    assert store.get_items(['A1']) == {}
+    assert store.count() == 2
+
+
+def test_offer_refresh_extends_freshness_but_not_the_static_ttl(store, clock):
+    store.put_items([_item('A1')])
+    clock.advance(90)
+    assert store.update_offers([_item('A1', price=8.0), _item('UNKNOWN')]) == 1
+
+    clock.advance(90)
+    stored = json.loads(store.get_items(['A1'])['A1'])
+    assert stored['Offers']['Listings'][0]['Price']['Amount'] == 8.0
+    assert stored['ItemInfo']['Title']['DisplayValue'] == "Item A1"
+
+    clock.advance(850)  # Offers refreshed recently, but the static data is too old
+    store.update_offers([_item('A1')])
+    assert store.get_items(['A1']) == {}
+
+
+def test_items_of_a_lower_profile_are_upgraded_when_fetched_again(store):
+    store.put_items([_item('A1')], profile_rank=DISCOVERY)
+    assert store.get_items(['A1'], min_rank=DISCOVERY)
+    assert store.get_items(['A1'], min_rank=FEED) == {}
+
+    store.put_items([_item('A1')], profile_rank=FEED)
+    assert store.get_items(['A1'], min_rank=FEED)
+
+
+def test_search_is_served_while_the_query_and_its_items_are_fresh(store, clock):
+    store.put_search('q', [_item('A1'), _item('A2')], 42, 'https://example.com/s', source_query='q')
+    asins, items, total, url = store.get_search('q')
+    assert asins == ['A1', 'A2']
+    assert set(items) == {'A1', 'A2'}
+    assert (total, url) == (42, 'https://example.com/s')
+
+    clock.advance(101)  # Items' offers expired
+    assert store.get_search('q') is None
+
+
+def test_search_expires_after_its_ttl_and_needs_the_profile(store, clock):
+    store.put_search('q', [_item('A1')], 1, None, profile_rank=DISCOVERY)
+    assert store.get_search('q', min_rank=FEED) is None
+
+    clock.advance(501)
+    store.update_offers([_item('A1')])
+    assert store.get_search('q') is None
+
+
+def test_iter_items_pages_in_asin_order_and_filters_offers_age(store, clock):
+    store.put_items([_item(f'B{n:02d}') for n in range(5)])
+    clock.advance(50)
+    store.put_items([_item('A00')])
+
+    assert [asin for asin, _ in store.iter_items(batch_size=2)] == ['A00'] + [f'B{n:02d}' for n in range(5)]
+    assert [asin for asin, _ in store.iter_items(max_offers_age=10)] == ['A00']
+
+
+def test_prune_removes_items_older_than_the_cutoff(store, clock):
+    store.put_items([_item('OLD')])
+    clock.advance(200)
+    store.put_items([_item('NEW')])
+    assert store.prune(older_than=100) == 1
+    assert [asin for asin, _ in store.iter_items()] == ['NEW']
+
+
+
+def test_writes_prune_old_items_at_most_once_per_interval(tmp_path, clock):
+    store = ItemStore(str(tmp_path / "items.sqlite3"), static_ttl=1000, max_age=2000, prune_interval=5000)
+    store.put_items([_item('OLD')])
+    clock.advance(2100)
+    store.put_items([_item('NEW')])  # OLD is too old, but the store was pruned on the first write
+    assert store.count() == 2
+
+    clock.advance(3000)
+    store.put_items([_item('NEWER')])
+    assert [asin for asin, _ in store.iter_items()] == ['NEWER']
+    store.close()
+
+
+def test_max_age_zero_keeps_items_forever(tmp_path, clock):
+    store = ItemStore(str(tmp_path / "items.sqlite3"), max_age=0, prune_interval=0)
+    store.put_items([_item('OLD')])
+    clock.advance(10 ** 9)
+    store.put_items([_item('NEW')])
+    assert store.count() == 2
+    store.close()
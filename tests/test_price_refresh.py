@@ -0,0 +1,174 @@
+"""Tests of the incremental price refresh: change detection and adaptive polling."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from libs.amazon import lib_amazon
+from libs.amazon import price_refresh as price_refresh_module
+from libs.amazon.models import CircuitOpenError, OverloadedError
+from libs.amazon.price_refresh import (
+    IN_STOCK, OUT_OF_STOCK, OfferSnapshot, PriceRefresher, offer_prices, offer_snapshot
+)
+
+HOUR = 3600.0
+
+
+def _item(asin, amount, saving_basis=None, availability='Now'):
+    """PA-API Item with one listing, as the SDK models expose it (by attribute)."""
+    listing = SimpleNamespace(
+        price=SimpleNamespace(amount=amount),
+        saving_basis=SimpleNamespace(amount=saving_basis) if saving_basis else None,
+        availability=SimpleNamespace(type=availability) if availability else None,
+    )
+    return SimpleNamespace(asin=asin, offers=SimpleNamespace(listings=[listing]))
+
+
+@pytest.fixture
+def clock(clock):
+    return clock.install(price_refresh_module)
+
+
+@pytest.fixture
+def refresher(tmp_path, clock):
+    refresher = PriceRefresher(
+        str(tmp_path / "refresh.sqlite3"), min_interval=HOUR, max_interval=8 * HOUR,
+        max_items=100, changes_ttl=24 * HOUR
+    )
+    yield refresher
+    refresher.close()
+
+
+def _interval(refresher, asin, marketplace='ES'):
+    with refresher._lock:
+        return refresher.connection.execute(
+            "SELECT interval FROM offers WHERE marketplace = ? AND asin = ?", (marketplace, asin)
+        ).fetchone()[0]
+
+
+def test_offer_snapshot_reads_sale_prices_and_availability():
+    assert offer_prices(80.0, 100.0) == (100.0, 80.0)
+    assert offer_prices(80.0, 70.0) == (80.0, None)
+    assert offer_snapshot(_item('B1', 80.0, saving_basis=100.0)) == OfferSnapshot(100.0, 80.0, IN_STOCK)
+    assert offer_snapshot(_item('B1', 10.0, availability='Preorder')).availability == 'preorder'
+    assert offer_snapshot(_item('B1', 0)) == OfferSnapshot(None, None, OUT_OF_STOCK)
+    assert offer_snapshot(None) == OfferSnapshot(None, None, OUT_OF_STOCK)
+
+
+def test_only_changed_offers_are_recorded(refresher):
+    refresher.track('feed', 'ES', [
+        ('SAME', OfferSnapshot(10.0, None, IN_STOCK)),
+        ('PRICE', OfferSnapshot(20.0, None, IN_STOCK)),
+        ('DEAL', OfferSnapshot(30.0, None, IN_STOCK)),
+    ])
+    changes = refresher.record('ES', ['SAME', 'PRICE', 'DEAL'], [
+        _item('SAME', 10.001),  # Same price in cents
+        _item('PRICE', 18.5),
+        _item('DEAL', 25.0, saving_basis=30.0),
+    ])
+    assert [(change['asin'], change['changed']) for change in changes] == [
+        ('PRICE', ['price']),
+        ('DEAL', ['sale_price']),
+    ]
+    assert changes[0]['previous']['price'] == 20.0
+
+
+def test_missing_item_is_out_of_stock_with_its_last_price(refresher):
+    refresher.track('feed', 'ES', [('GONE', OfferSnapshot(15.0, 12.0, IN_STOCK))])
+    [change] = refresher.record('ES', ['GONE'], [])
+    assert change['changed'] == ['availability']
+    assert (change['price'], change['sale_price'], change['availability']) == (15.0, 12.0, OUT_OF_STOCK)
+
+
+def test_first_poll_of_a_bare_asin_is_a_baseline(refresher):
+    refresher.track('feed', 'ES', ['NEW'])
+    assert refresher.plan() == {'ES': [['NEW']]}
+    assert refresher.record('ES', ['NEW'], [_item('NEW', 9.99)]) == []
+    assert refresher.record('ES', ['NEW'], [_item('NEW', 8.99)])[0]['changed'] == ['price']
+
+
+def test_stable_products_back_off_and_changes_reset_the_interval(refresher, clock):
+    refresher.track('feed', 'ES', [('B1', OfferSnapshot(10.0, None, IN_STOCK))])
+    intervals = []
+    for _ in range(5):
+        refresher.record('ES', ['B1'], [_item('B1', 10.0)])
+        intervals.append(_interval(refresher, 'B1'))
+    assert intervals == [2 * HOUR, 4 * HOUR, 8 * HOUR, 8 * HOUR, 8 * HOUR]
+
+    refresher.record('ES', ['B1'], [_item('B1', 11.0)])
+    assert _interval(refresher, 'B1') == HOUR
+
+
+def test_plan_takes_the_due_products_and_tops_up_the_batch(refresher, clock):
+    refresher.track('feed', 'ES', [(f'B{n:02d}', OfferSnapshot(10.0, None, IN_STOCK)) for n in range(12)])
+    assert refresher.plan() == {}
+
+    clock.advance(HOUR)
+    refresher.record('ES', ['B00', 'B01'], [_item('B00', 10.0), _item('B01', 10.0)])  # Now due in 2 hours
+    plan = refresher.plan()['ES']
+    assert [len(batch) for batch in plan] == [10]
+    assert {'B00', 'B01'}.isdisjoint(plan[0])
+
+    assert [len(batch) for batch in refresher.plan(force=True)['ES']] == [10, 2]
+    # Three due products, topped up with the ones that are not due yet
+    assert refresher.plan(limit=3) == {'ES': [['B02', 'B03', 'B04', 'B00', 'B01']]}
+
+
+def test_change_log_pages_with_a_cursor_and_by_feed(refresher):
+    refresher.track('summer', 'ES', [('B1', OfferSnapshot(10.0, None, IN_STOCK))])
+    refresher.track('winter', 'ES', [('B2', OfferSnapshot(10.0, None, IN_STOCK))])
+    refresher.record('ES', ['B1', 'B2'], [_item('B1', 9.0), _item('B2', 9.0)])
+
+    first, cursor = refresher.changes(limit=1)
+    rest, last_cursor = refresher.changes(since=cursor)
+    assert [change['asin'] for change in first + rest] == ['B1', 'B2']
+    assert refresher.changes(since=last_cursor) == ([], last_cursor)
+    assert [change['asin'] for change in refresher.changes(feed='winter')[0]] == ['B2']
+
+
+def test_untracked_products_are_no_longer_polled(refresher):
+    refresher.track('summer', 'ES', ['B1', 'B2'])
+    refresher.track('winter', 'ES', ['B2'])
+    assert refresher.untrack('summer') == 2
+    assert refresher.plan() == {'ES': [['B2']]}
+
+
+class FailingClient:
+    """PA-API client whose GetItems calls fail with `error`, counting them."""
+
+    max_workers = 1
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def get_items(self, asins, resources=None):
+        self.calls += 1
+        raise self.error
+
+    async def get_items_async(self, asins, resources=None):
+        return self.get_items(asins, resources)
+
+
+@pytest.mark.parametrize('error', [
+    CircuitOpenError("PA-API is failing", retry_after=30.0),
+    OverloadedError("Too many background PA-API calls waiting", retry_after=5.0),
+])
+@pytest.mark.parametrize('run_async', [False, True])
+def test_refresh_stops_a_marketplace_when_the_circuit_is_open_or_calls_are_shed(
+    refresher, monkeypatch, error, run_async
+):
+    client = FailingClient(error)
+    monkeypatch.setattr(lib_amazon, 'AmazonPAAPI', lambda marketplace: client)
+    refresher.track('feed', 'ES', [f'B{n:02d}' for n in range(25)])
+
+    if run_async:
+        result = asyncio.run(refresher.refresh_async())
+    else:
+        result = refresher.refresh()
+
+    assert client.calls == 1
+    assert (result['polled'], result['failed'], result['changes']) == (0, 25, [])
+    # The products stay due for the next refresh
+    assert sum(map(len, refresher.plan()['ES'])) == 25
@@ -0,0 +1,130 @@
+"""Tests of the local FTS5 product index."""
+
+import pytest
+
+from libs.amazon import product_index as product_index_module
+from libs.amazon.product_index import ProductIndex, search_terms
+from tests.helpers import product_record
+
+
+@pytest.fixture
+def clock(clock):
+    return clock.install(product_index_module)
+
+
+@pytest.fixture
+def index(tmp_path, clock):
+    index = ProductIndex(str(tmp_path / "products.sqlite3"), max_age=3600)
+    yield index
+    index.close()
+
+
+def _asins(records):
+    return [record.asin for record in records]
+
+
+@pytest.mark.parametrize('text, terms', [
+    ("Zapatillas", ['zapatill']),
+    ("zapatilla zapatillo", ['zapatill', 'zapatill']),
+    ("Luces LED", ['luz', 'led']),
+    ("Cámara de fotos", ['camar', 'foto']),
+    ("Pack of 2 USB cables", ['pack', '2', 'usb', 'cabl']),
+])
+def test_search_terms_fold_stem_and_drop_stopwords(text, terms):
+    assert search_terms(text) == terms
+
+
+def test_stemmed_and_accent_free_queries_match(index):
+    index.add([
+        product_record('B1', "Zapatillas de running para hombre", brand="Acme"),
+        product_record('B2', "Luces LED para árbol de Navidad"),
+    ])
+    assert _asins(index.search("zapatilla")) == ['B1']
+    assert _asins(index.search("luz led arbol")) == ['B2']
+    assert _asins(index.search("acme")) == ['B1']
+    # Every term must match
+    assert index.search("zapatilla led") == []
+
+
+def test_title_matches_rank_before_category_matches(index):
+    index.add([
+        product_record('CAT', "Soporte de pared", categories=[("Televisores", "1")]),
+        product_record('TITLE', "Televisor 55 pulgadas"),
+    ])
+    assert _asins(index.search("televisor")) == ['TITLE', 'CAT']
+
+
+def test_price_discount_and_ean_filters(index):
+    index.add([
+        product_record('CHEAP', "Auriculares bluetooth", price=20.0, discount=10, eans=['1234567890123']),
+        product_record('MID', "Auriculares bluetooth", price=50.0, discount=40),
+        product_record('DEAR', "Auriculares bluetooth", price=150.0, discount=40, eans=['1234567890124']),
+    ])
+    assert _asins(index.search("auriculares", min_price=30, max_price=100)) == ['MID']
+    assert sorted(_asins(index.search("auriculares", min_discount=30))) == ['DEAR', 'MID']
+    assert sorted(_asins(index.search("auriculares", only_with_ean=True))) == ['CHEAP', 'DEAR']
+    assert _asins(index.search("auriculares", sort_by='Price:HighToLow')) == ['DEAR', 'MID', 'CHEAP']
+    assert _asins(index.search("auriculares", sort_by='Price:LowToHigh', limit=1, offset=1)) == ['MID']
+
+
+def test_browse_node_filter_uses_the_product_categories(index):
+    index.add([
+        product_record('B1', "Cafetera", categories=[("Hogar", "599370031"), ("Cafeteras", "2165363031")]),
+        product_record('B2', "Cafetera de viaje"),
+    ], browse_node_id='123')
+    assert _asins(index.search("cafetera", browse_node_id='2165363031')) == ['B1']
+    assert sorted(_asins(index.search("cafetera", browse_node_id='123'))) == ['B1', 'B2']
+
+
+def test_products_not_seen_recently_are_not_returned(index, clock):
+    index.add([product_record('OLD', "Lámpara de mesa")])
+    clock.advance(3000)
+    index.add([product_record('NEW', "Lámpara de pie")])
+    clock.advance(1000)
+    assert _asins(index.search("lampara")) == ['NEW']
+    assert sorted(_asins(index.search("lampara", max_age=5000))) == ['NEW', 'OLD']
+
+
+def test_readding_a_product_replaces_its_terms(index):
+    index.add([product_record('B1', "Mochila escolar", price=30.0)])
+    index.add([product_record('B1', "Mochila de senderismo", price=25.0)])
+    assert index.count() == 1
+    assert index.search("escolar") == []
+    assert index.search("senderismo")[0].price == 25.0
+
+
+def test_fts_syntax_in_queries_is_inert(index):
+    index.add([product_record('B1', "Cable USB")])
+    assert _asins(index.search('cable OR "usb" NOT*')) == []
+    assert index.search("") == []
+
+
+def test_search_index_filter_matches_the_roots_its_searches_returned(index):
+    appliances = [("Grandes electrodomésticos", "2665360031"), ("Frigoríficos", "2665441031")]
+    index.add([
+        product_record('FRIDGE1', "Nevera combi no frost", categories=appliances),
+        product_record('FRIDGE2', "Nevera americana", categories=appliances),
+        product_record('MINI', "Nevera portátil para coche", categories=[("Coche y moto", "1951051031")]),
+    ])
+    assert len(index.search("nevera")) == 3
+    assert index.search("nevera", search_index='Appliances') == []
+
+    # A search in the index teaches it the root category of its results
+    index.add([product_record('WASHER', "Lavadora carga frontal", categories=appliances[:1])], search_index='Appliances')
+    assert sorted(product.asin for product in index.search("nevera", search_index='Appliances')) == ['FRIDGE1', 'FRIDGE2']
+    assert index.search("nevera", search_index='Automotive') == []
+
+
+def test_roots_are_learned_from_an_index_of_an_older_version(tmp_path):
+    path = str(tmp_path / "products.sqlite3")
+    index = ProductIndex(path)
+    root = [("Informática", "667049031")]
+    index.add([product_record('MOUSE', "Ratón inalámbrico", categories=root)], search_index='Computers')
+    index.add([product_record('PAD', "Alfombrilla ratón", categories=root)])
+    with index._lock:
+        index.connection.execute("DROP TABLE index_roots")
+    index.close()
+
+    reopened = ProductIndex(path)
+    assert sorted(product.asin for product in reopened.search("raton", search_index='Computers')) == ['MOUSE', 'PAD']
+    reopened.close()
@@ -0,0 +1,80 @@
+"""Tests of the field selection, length caps and table format of product results."""
+
+import pytest
+
+from libs.amazon.projection import DEFAULT_OUTPUT, PRODUCT_FIELDS, OutputOptions, truncate
+from tests.helpers import product_record
+
+PATH = (("Hogar", "599370031"), ("Cafeteras", "2165363031"))
+
+
+def test_parse_keeps_field_order_and_always_adds_asin():
+    options = OutputOptions.parse(" price, title ,price")
+    assert options.fields == ('title', 'asin', 'price')
+    assert OutputOptions.parse(['eans']).columns == ('asin', 'eans')
+    assert OutputOptions.parse().columns == PRODUCT_FIELDS
+
+
+@pytest.mark.parametrize('arguments', [
+    {'fields': "title, colour"},
+    {'format': "xml"},
+    {'max_title_chars': -1},
+])
+def test_parse_rejects_invalid_arguments(arguments):
+    with pytest.raises(ValueError):
+        OutputOptions.parse(**arguments)
+
+
+def test_zero_caps_mean_no_cap():
+    assert OutputOptions.parse(max_title_chars=0, format="JSON").is_default
+
+
+def test_truncate_cuts_at_a_word_boundary():
+    assert truncate("Cafetera italiana de aluminio", 100) == "Cafetera italiana de aluminio"
+    assert truncate("Cafetera italiana de aluminio", 20) == "Cafetera italiana…"
+    assert len(truncate("x" * 50, 10)) == 10
+    assert truncate(None, 10) is None
+
+
+def test_default_options_project_the_full_record():
+    record = product_record('B1', "Cafetera", price=25.0, categories=PATH, eans=['8412345678905'])
+    assert DEFAULT_OUTPUT.project(record) == record.to_dict()
+
+
+def test_projection_selects_fields_and_caps_texts():
+    record = product_record(
+        'B1', "Cafetera italiana de aluminio", price=25.0, description="Para 6 tazas. " * 20, categories=PATH
+    )
+    options = OutputOptions.parse("title, description, categories", max_title_chars=20, max_description_chars=30)
+    projected = options.project(record)
+    assert list(projected) == ['title', 'asin', 'description', 'categories']
+    assert projected['title'] == "Cafetera italiana…"
+    assert len(projected['description']) <= 30
+    assert projected['categories'][1] == {'name': "Cafeteras", 'id': "2165363031"}
+
+
+def test_table_sends_keys_and_category_paths_once():
+    shared = product_record('B1', "Cafetera", price=25.0, categories=PATH).categories
+    records = [
+        product_record('B1', "Cafetera", price=25.0, categories=PATH),
+        product_record('B2', "Molinillo", price=30.0, categories=PATH),
+        product_record('B3', "Taza", price=5.0),
+    ]
+    records[1].categories = shared
+    options = OutputOptions.parse("asin, price, categories", format="table")
+    table = options.render(records, extra=[{'marketplace': 'ES'}] * 3)
+
+    assert table['columns'] == ['asin', 'price', 'categories', 'marketplace']
+    assert table['rows'] == [
+        ['B1', 25.0, 0, 'ES'],
+        ['B2', 30.0, 0, 'ES'],
+        ['B3', 5.0, None, 'ES'],
+    ]
+    assert table['category_paths'] == [[["Hogar", "599370031"], ["Cafeteras", "2165363031"]]]
+
+
+def test_json_render_merges_extra_values():
+    records = [product_record('B1', "Cafetera")]
+    assert OutputOptions.parse("title").render(records, extra=[{'marketplace': 'DE'}]) == [
+        {'title': "Cafetera", 'asin': 'B1', 'marketplace': 'DE'}
+    ]
@@ -0,0 +1,55 @@
+"""Tests of the token bucket that paces PA-API calls."""
+
+import pytest
+
+from libs.amazon import rate_limiter as rate_limiter_module
+from libs.amazon.rate_limiter import TokenBucketRateLimiter
+
+
+@pytest.fixture
+def clock(clock):
+    return clock.install(rate_limiter_module)
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        TokenBucketRateLimiter(rate=0)
+    with pytest.raises(ValueError):
+        TokenBucketRateLimiter(burst=0)
+
+
+def test_bucket_starts_full_and_refills_at_the_rate(clock):
+    limiter = TokenBucketRateLimiter(rate=2.0, burst=3)
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert limiter.time_to_token() == pytest.approx(0.5)
+
+    clock.advance(0.5)
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+
+def test_refill_stops_at_the_burst(clock):
+    limiter = TokenBucketRateLimiter(rate=10.0, burst=2)
+    clock.advance(60)
+    assert limiter.stats()['available_tokens'] == 2
+    assert [limiter.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_keep_leaves_tokens_in_the_bucket(clock):
+    limiter = TokenBucketRateLimiter(rate=1.0, burst=2)
+    assert limiter.try_acquire(keep=1)
+    assert not limiter.try_acquire(keep=1)
+    assert limiter.time_to_token(keep=1) == pytest.approx(1.0)
+    assert limiter.time_to_token() == 0
+    assert limiter.try_acquire()
+
+
+def test_penalize_pushes_the_next_token_back(clock):
+    limiter = TokenBucketRateLimiter(rate=1.0, burst=1)
+    limiter.penalize(2.0)
+    assert limiter.time_to_token() == pytest.approx(3.0)
+
+    clock.advance(2.5)
+    assert not limiter.try_acquire()
+    clock.advance(0.5)
+    assert limiter.try_acquire()
@@ -0,0 +1,92 @@
+"""Tests of the retry policy and the circuit breaker of PA-API calls."""
+
+import pytest
+
+from libs.amazon import resilience
+from libs.amazon.models import (
+    CircuitOpenError, InvalidRequestError, ThrottledError, UpstreamError
+)
+from libs.amazon.resilience import CircuitBreaker, RetryPolicy
+
+
+@pytest.fixture
+def clock(clock):
+    return clock.install(resilience)
+
+
+def test_only_retryable_errors_are_retried_up_to_max_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry(ThrottledError("slow down"), attempt=1)
+    assert policy.should_retry(UpstreamError("502"), attempt=2)
+    assert not policy.should_retry(UpstreamError("502"), attempt=3)
+    assert not policy.should_retry(InvalidRequestError("bad keywords"), attempt=1)
+    assert not policy.should_retry(ValueError("not an API error"), attempt=1)
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+    for attempt, cap in [(1, 0.5), (2, 1.0), (3, 2.0), (6, 2.0)]:
+        assert all(0 <= policy.delay(attempt) <= cap for _ in range(50))
+    assert policy.delay(1, ThrottledError("slow down", retry_after=5.0)) == 5.0
+
+
+def test_max_attempts_must_be_positive():
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()  # A success resets the count
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.advance(10)
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == pytest.approx(20)
+    assert breaker.stats()['rejected'] == 1
+    assert breaker.stats()['opened'] == 1
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(30)
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.advance(30)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()['opened'] == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_threshold_zero_disables_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+        breaker.before_call()
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,93 @@
+"""Tests of the per-campaign registry of used products and its Bloom filters."""
+
+import pytest
+
+from libs.amazon.seen_registry import BloomFilter, SeenRegistry, parse_campaigns, product_keys
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = SeenRegistry(str(tmp_path / "seen.sqlite3"), error_rate=0.001)
+    yield registry
+    registry.close()
+
+
+def test_bloom_filter_never_misses_an_added_key():
+    bloom = BloomFilter.for_capacity(1000, error_rate=0.01)
+    keys = [f"asin:B{n:09d}" for n in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positives_stay_near_the_error_rate():
+    bloom = BloomFilter.for_capacity(2000, error_rate=0.01)
+    for n in range(2000):
+        bloom.add(f"asin:A{n}")
+    false_positives = sum(f"asin:Z{n}" in bloom for n in range(10000))
+    assert false_positives < 300  # About 100 (1%) expected
+
+
+def test_bloom_filter_survives_serialization():
+    bloom = BloomFilter.for_capacity(10)
+    bloom.add("ean:8412345678905")
+    restored = BloomFilter.from_bytes(bloom.to_bytes())
+    assert (restored.bits, restored.hashes, restored.count) == (bloom.bits, bloom.hashes, 1)
+    assert "ean:8412345678905" in restored
+    assert "ean:0000000000000" not in restored
+
+
+def test_campaign_names_are_parsed_and_bounded():
+    assert parse_campaigns(" summer_2025, summer_2024,,summer_2025 ") == ['summer_2025', 'summer_2024']
+    assert parse_campaigns(None) == []
+    with pytest.raises(ValueError):
+        parse_campaigns("x" * 101)
+
+
+def test_products_match_by_asin_or_any_ean(registry):
+    assert registry.mark('summer', [('B001', ['8412345678905']), ('B002', [])]) == 2
+    assert registry.contains(['summer'], product_keys('B001'))
+    assert registry.contains(['summer'], product_keys('OTHER', ['8412345678905']))
+    assert not registry.contains(['summer'], product_keys('B003'))
+    assert not registry.contains(['winter'], product_keys('B001'))
+    # Marking again only counts new products
+    assert registry.mark('summer', [('B001', []), ('B003', [])]) == 1
+    assert registry.campaign_stats('summer')['products'] == 3
+
+
+def test_campaigns_are_reloaded_from_disk(tmp_path, registry):
+    registry.mark('summer', [('B001', ['8412345678905'])])
+    registry.close()
+
+    reopened = SeenRegistry(str(tmp_path / "seen.sqlite3"))
+    assert reopened.contains(['summer'], product_keys('B001'))
+    reopened.close()
+
+
+def test_archived_campaign_keeps_excluding_but_cannot_grow(tmp_path, registry):
+    registry.mark('summer', [(f'B{n:03d}', [f'84{n:011d}']) for n in range(50)])
+    stats = registry.archive('summer')
+    assert stats['state'] == 'archived'
+    assert stats['keys'] == 100
+    assert registry.contains(['summer'], product_keys('B007'))
+    with pytest.raises(ValueError):
+        registry.mark('summer', [('B999', [])])
+    registry.close()
+
+    reopened = SeenRegistry(str(tmp_path / "seen.sqlite3"))
+    assert reopened.contains(['summer'], product_keys('OTHER', ['8400000000049']))
+    reopened.close()
+
+
+def test_archiving_an_unknown_campaign_fails(registry):
+    with pytest.raises(ValueError):
+        registry.archive('missing')
+
+
+def test_forget_drops_the_campaign(registry):
+    registry.mark('summer', [('B001', [])])
+    assert registry.forget('summer')
+    assert not registry.contains(['summer'], product_keys('B001'))
+    assert registry.campaigns() == []
+    assert not registry.forget('summer')
@@ -0,0 +1,123 @@
+import os
+import sys
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(project_root)
+
+from libs.amazon import AmazonPAAPI
+from libs.amazon.models import ProductRecord, SearchSpec
+from libs.amazon.projection import DEFAULT_OUTPUT, OutputOptions
+from tools.amazon.tool_amazon_search_items import search_pretty_items
+
+
+async def bulk_search(
+    specs: List[SearchSpec],
+    only_with_ean: bool = True,
+    marketplace: Optional[str] = None,
+    exclude_seen: Optional[str] = None,
+    output: OutputOptions = DEFAULT_OUTPUT
+) -> Dict[str, Any]:
+    """
+    Runs several searches concurrently and merges their results.
+
+    Every search goes through the shared AmazonPAAPI client of its marketplace, so the
+    fan-out is paced by that marketplace's rate limiter (searches of different
+    marketplaces run in parallel) and identical searches are coalesced by the cache.
+    Products are de-duplicated across searches of the same marketplace by ASIN and by
+    EAN, keeping the first occurrence in spec order, and each product is attributed to
+    every search that returned it.
+
+    Args:
+        specs (List[SearchSpec]): The searches to run.
+        only_with_ean (bool): If True, items without EANs are dropped.
+        marketplace (str, optional): Marketplace of the specs that do not set one.
+        exclude_seen (str, optional): Campaign name(s) whose used products are skipped (see search_pretty_items).
+        output (OutputOptions): Fields, length caps and format of the items.
+
+    Returns:
+        Dict: Merged results.
+            - items: List[Dict] | Dict = {unique products, each with its marketplace and a 'queries' list of
+              spec indexes; a table (see OutputOptions.table) with format="table"}
+            - queries: List[Dict] = {per search summary: keywords, returned, new, duplicates, error, retryable}
+            - total_unique: int = {number of unique products}
+    """
+    marketplaces = [AmazonPAAPI.resolve_marketplace(spec.marketplace or marketplace) for spec in specs]
+    results = await asyncio.gather(
+        *(
+            search_pretty_items(
+                keywords=spec.keywords,
+                item_count=spec.item_count,
+                search_index=spec.search_index,
+                sort_by=spec.sort_by,
+                min_price=spec.min_price,
+                max_price=spec.max_price,
+                only_with_ean=only_with_ean,
+                browse_node_id=spec.browse_node_id,
+                availability=spec.availability,
+                marketplace=spec_marketplace,
+                exclude_seen=exclude_seen
+            )
+            for spec, spec_marketplace in zip(specs, marketplaces)
+        ),
+        return_exceptions=True
+    )
+
+    records: List[ProductRecord] = []
+    # Per product values added to the product fields
+    extra: List[Dict[str, Any]] = []
+    # The same product has its own offer (price, link) in each marketplace
+    by_asin: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    by_ean: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    queries: List[Dict[str, Any]] = []
+
+    for index, (spec, spec_marketplace, result) in enumerate(zip(specs, marketplaces, results)):
+        summary = {
+            'keywords': spec.keywords,
+            'search_index': spec.search_index,
+            'marketplace': spec_marketplace,
+            'returned': 0,
+            'new': 0,
+            'duplicates': 0,
+            'error': None,
+            'retryable': False,
+        }
+        queries.append(summary)
+        if isinstance(result, BaseException):
+            logger.error("Bulk search '%s' failed: %s", spec.keywords, result)
+            summary['error'] = str(result)
+            summary['retryable'] = getattr(result, 'retryable', False)
+            continue
+
+        summary['returned'] = len(result)
+        for pretty_item in result:
+            existing = by_asin.get((spec_marketplace, pretty_item.asin))
+            if existing is None:
+                existing = next(
+                    (by_ean[spec_marketplace, ean] for ean in pretty_item.eans or [] if (spec_marketplace, ean) in by_ean),
+                    None
+                )
+            if existing is not None:
+                summary['duplicates'] += 1
+                if index not in existing['queries']:
+                    existing['queries'].append(index)
+                continue
+
+            item = {'marketplace': spec_marketplace, 'queries': [index]}
+            records.append(pretty_item)
+            extra.append(item)
+            by_asin[spec_marketplace, pretty_item.asin] = item
+            for ean in pretty_item.eans or []:
+                by_ean[spec_marketplace, ean] = item
+            summary['new'] += 1
+
+    return {
+        'items': output.render(records, extra),
+        'queries': queries,
+        'total_unique': len(records),
+    }
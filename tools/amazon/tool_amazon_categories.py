@@ -0,0 +1,69 @@
+import os
+import sys
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(project_root)
+
+from libs.amazon import AmazonAPISingleton, AmazonPAAPI
+from libs.amazon.browse_nodes import browse_node_index
+
+
+async def browse_categories(
+    browse_node_id: Optional[str] = None,
+    query: Optional[str] = None,
+    marketplace: Optional[str] = None,
+    refresh: bool = False,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """
+    Looks up categories (browse nodes) in the process-wide browse node index.
+
+    The index is filled by every search and get items answer, so most lookups
+    cost no API call. A browse node that is not in the index yet, or any node
+    with refresh=True, is requested with GetBrowseNodes (one API call), which
+    also lists all of its children.
+
+    Args:
+        browse_node_id (str, optional): Node to resolve: its path from the root and its children.
+        query (str, optional): Words to find in the category names (ignored when browse_node_id is given).
+        marketplace (str, optional): Marketplace code, e.g. "DE" (default is the server default marketplace).
+        refresh (bool): If True, the node is requested with GetBrowseNodes even if it is known.
+        limit (int): Maximum number of categories returned by a name search or a root listing.
+
+    Returns:
+        Dict: marketplace, source ("index" or "api") and nodes (see BrowseNodeIndex.describe).
+    """
+    marketplace = AmazonPAAPI.resolve_marketplace(marketplace)
+    limit = max(1, min(int(limit), 100))
+    source = 'index'
+
+    if browse_node_id:
+        browse_node_id = str(browse_node_id).strip()
+        if refresh or browse_node_index.get(browse_node_id, marketplace) is None:
+            client = AmazonAPISingleton(marketplace)
+            await client.get_browse_nodes_async([browse_node_id])
+            source = 'api'
+        node = browse_node_index.describe(browse_node_id, marketplace)
+        nodes = [node] if node is not None else []
+    elif query:
+        nodes = [
+            browse_node_index.describe(entry.id, marketplace)
+            for entry in browse_node_index.search(query, marketplace, limit)
+        ]
+    else:
+        nodes = [
+            browse_node_index.describe(entry.id, marketplace)
+            for entry in browse_node_index.roots(marketplace)[:limit]
+        ]
+
+    logger.info("Category lookup in %s returned %d nodes from the %s.", marketplace, len(nodes), source)
+    return {
+        'marketplace': marketplace,
+        'source': source,
+        'nodes': nodes,
+    }
@@ -0,0 +1,445 @@
+"""
+Streaming Merchant Center feed export of every product in the item store.
+
+    python tools/amazon/tool_amazon_feed_export.py catalogo_es --format xml --gzip
+
+Products flow through generators, one at a time: stored item -> ProductRecord
+-> Merchant row -> encoded line -> feed file. Memory stays constant whatever
+the catalog size, and a file is split into numbered parts before it reaches
+the Merchant Center file size limit (or a row limit).
+"""
+
+import os
+import re
+import io
+import sys
+import csv
+import gzip
+import json
+import logging
+import argparse
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(project_root)
+
+from libs.amazon.extractor import extract_item
+from libs.amazon.item_store import ItemStore
+from libs.amazon.models import ProductRecord, ResourceProfile
+from libs.amazon.price_refresh import offer_snapshot
+from tools.amazon.tool_amazon_merchant_feed import (
+    MARKETPLACE_CURRENCIES, MERCHANT_FEED_COLUMNS, feed_directory, item_to_merchant_row
+)
+
+EXPORT_FORMATS = ('csv', 'tsv', 'xml')
+
+# Merchant Center rejects feed files above 4 GB (uncompressed)
+MERCHANT_MAX_FILE_BYTES = 4_000_000_000
+
+# Offers older than this are not exported by default: Associates prices must be at most 24 hours old
+DEFAULT_MAX_OFFERS_AGE = 24 * 3600
+
+GOOGLE_NAMESPACE = "http://base.google.com/ns/1.0"
+
+# Columns written as plain RSS elements; the rest go in the g: namespace
+_RSS_ELEMENTS = {'title', 'description', 'link'}
+
+# Characters XML 1.0 does not allow (PA-API texts occasionally carry them)
+_XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_TSV_SEPARATORS = re.compile(r"[\t\r\n]+")
+
+
+# ---------------------------------------------------------------------- #
+# Row pipeline
+# ---------------------------------------------------------------------- #
+
+def stored_products(
+    item_store: ItemStore,
+    marketplace: str,
+    max_offers_age: Optional[float] = DEFAULT_MAX_OFFERS_AGE
+) -> Iterator[Tuple[ProductRecord, str]]:
+    """
+    Products of the item store of a marketplace with their availability.
+
+    Yields:
+        (ProductRecord, availability) pairs, in ASIN order.
+    """
+    from libs.amazon.lib_amazon import iter_store_items
+
+    for item in iter_store_items(item_store, ResourceProfile.DISCOVERY, max_offers_age=max_offers_age):
+        yield extract_item(item, marketplace), offer_snapshot(item).availability
+
+
+def merchant_rows(
+    products: Iterable[Tuple[ProductRecord, str]],
+    currency: str,
+    only_with_ean: bool,
+    skipped: Dict[str, int]
+) -> Iterator[Dict[str, str]]:
+    """
+    Merchant rows of the products that have the required fields.
+
+    Args:
+        products: (ProductRecord, availability) pairs.
+        currency (str): ISO 4217 currency of the prices.
+        only_with_ean (bool): If True, products without EAN (gtin) are skipped.
+        skipped (Dict[str, int]): Counts of skipped products by reason, updated in place.
+    """
+    for record, availability in products:
+        if only_with_ean and not record.eans:
+            skipped['no_ean'] = skipped.get('no_ean', 0) + 1
+            continue
+        row = item_to_merchant_row(record, currency)
+        if row is None:
+            skipped['no_price'] = skipped.get('no_price', 0) + 1
+            continue
+        row['availability'] = availability
+        yield row
+
+
+# ---------------------------------------------------------------------- #
+# Feed formats
+# ---------------------------------------------------------------------- #
+
+class CsvFeedFormat:
+    """Comma separated values with a header row."""
+
+    extension = "csv"
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+    def _line(self, values: Iterable[str]) -> bytes:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(values)
+        return self._buffer.getvalue().encode('utf-8')
+
+    def header(self, feed_name: str) -> bytes:
+        return self._line(self.columns)
+
+    def row(self, row: Dict[str, str]) -> bytes:
+        return self._line(row.get(column, "") for column in self.columns)
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class TsvFeedFormat(CsvFeedFormat):
+    """Tab separated values with a header row (tabs and line breaks inside values become spaces)."""
+
+    extension = "tsv"
+
+    def _line(self, values: Iterable[str]) -> bytes:
+        return ("\t".join(_TSV_SEPARATORS.sub(" ", value or "") for value in values) + "\n").encode('utf-8')
+
+
+class RssFeedFormat:
+    """
+    RSS 2.0 with the Google product namespace (g:id, g:price...).
+
+    Args:
+        columns: Merchant columns, in element order.
+        site_url (str): Channel link, the Amazon site of the marketplace (e.g. https://www.amazon.es).
+    """
+
+    extension = "xml"
+
+    def __init__(self, columns: List[str], site_url: str = "https://www.amazon.com"):
+        self.tags = [(column, column if column in _RSS_ELEMENTS else f"g:{column}") for column in columns]
+        self.site_url = site_url
+
+    def header(self, feed_name: str) -> bytes:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<rss version="2.0" xmlns:g="{GOOGLE_NAMESPACE}">\n<channel>\n'
+            f'<title>{escape(feed_name)}</title>\n'
+            f'<link>{escape(self.site_url)}</link>\n'
+            f'<description>{escape(feed_name)} product feed</description>\n'
+        ).encode('utf-8')
+
+    def row(self, row: Dict[str, str]) -> bytes:
+        elements = "".join(
+            f"<{tag}>{escape(_XML_INVALID_CHARS.sub('', row[column]))}</{tag}>"
+            for column, tag in self.tags if row.get(column)
+        )
+        return f"<item>{elements}</item>\n".encode('utf-8')
+
+    def footer(self) -> bytes:
+        return b"</channel>\n</rss>\n"
+
+
+FEED_FORMATS = {'csv': CsvFeedFormat, 'tsv': TsvFeedFormat, 'xml': RssFeedFormat}
+
+
+def marketplace_site_url(marketplace: str) -> str:
+    """Amazon site of a marketplace, e.g. https://www.amazon.es for ES."""
+    from amazon_paapi.models.regions import DOMAINS
+
+    return f"https://www.amazon.{DOMAINS[marketplace]}"
+
+
+def _part_path(base_path: str, extension: str, compress: bool, part: int) -> str:
+    """File of a feed part: <base>.<ext> for the first one, <base>-<part>.<ext> for the rest."""
+    suffix = "" if part == 1 else f"-{part}"
+    return f"{base_path}{suffix}.{extension}" + (".gz" if compress else "")
+
+
+class SplitFeedWriter:
+    """
+    Writes encoded rows to numbered feed files of bounded size.
+
+    The first file is <name>.<ext>, the next ones <name>-2.<ext>, <name>-3.<ext>...
+    Each file gets the format header and footer, is written under a .tmp
+    name and renamed when complete, so a scheduled fetch never reads a
+    partial file. Sizes are counted uncompressed, as Merchant Center limits them.
+
+    Args:
+        base_path (str): Path of the first file without extension.
+        feed_format: CsvFeedFormat, TsvFeedFormat or RssFeedFormat.
+        feed_name (str): Feed title (RSS channel).
+        compress (bool): If True, files are gzipped (.gz appended to the name).
+        max_bytes (int): Maximum uncompressed bytes per file.
+        max_rows (int): Maximum rows per file (0 for no limit).
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        feed_format: Any,
+        feed_name: str,
+        compress: bool = False,
+        max_bytes: int = MERCHANT_MAX_FILE_BYTES,
+        max_rows: int = 0
+    ):
+        self.base_path = base_path
+        self.format = feed_format
+        self.feed_name = feed_name
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.files: List[Dict[str, Any]] = []
+        self._file: Optional[BinaryIO] = None
+        self._path = ""
+        self._bytes = 0
+        self._rows = 0
+        self._footer = feed_format.footer()
+
+    def _open(self) -> None:
+        self._path = _part_path(self.base_path, self.format.extension, self.compress, len(self.files) + 1)
+        tmp_path = self._path + ".tmp"
+        self._file = gzip.open(tmp_path, 'wb', compresslevel=6) if self.compress else open(tmp_path, 'wb')
+        header = self.format.header(self.feed_name)
+        self._file.write(header)
+        self._bytes = len(header)
+        self._rows = 0
+
+    def _close(self) -> None:
+        self._file.write(self._footer)
+        self._file.close()
+        self._file = None
+        os.replace(self._path + ".tmp", self._path)
+        self.files.append({
+            'path': self._path,
+            'rows': self._rows,
+            'bytes': self._bytes + len(self._footer),
+            'file_bytes': os.path.getsize(self._path),
+        })
+
+    def write(self, data: bytes) -> None:
+        """Append one encoded row, starting a new file first if this one is full."""
+        if self._file is not None and self._rows and (
+            self._bytes + len(data) + len(self._footer) > self.max_bytes
+            or (self.max_rows and self._rows >= self.max_rows)
+        ):
+            self._close()
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self._bytes += len(data)
+        self._rows += 1
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Finish the last file (an empty feed still gets one file) and return every file written."""
+        if self._file is None and not self.files:
+            self._open()
+        if self._file is not None:
+            self._close()
+        return self.files
+
+    def abort(self) -> None:
+        """Drop the file being written (the completed ones are kept)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._path + ".tmp")
+
+
+def _remove_stale_parts(base_path: str, extension: str, compress: bool, keep: int) -> None:
+    """Delete the parts a previous, larger export left after the last one written now."""
+    part = keep + 1
+    while True:
+        path = _part_path(base_path, extension, compress, part)
+        if not os.path.exists(path):
+            return
+        os.remove(path)
+        part += 1
+
+
+# ---------------------------------------------------------------------- #
+# Export
+# ---------------------------------------------------------------------- #
+
+def export_feed(
+    feed_name: str,
+    format: str = "csv",
+    compress: bool = False,
+    marketplace: Optional[str] = None,
+    only_with_ean: bool = True,
+    max_offers_age: Optional[float] = DEFAULT_MAX_OFFERS_AGE,
+    max_file_rows: int = 0,
+    max_file_bytes: int = MERCHANT_MAX_FILE_BYTES,
+    feed_dir: Optional[str] = None,
+    item_store: Optional[ItemStore] = None
+) -> Dict[str, Any]:
+    """
+    Exports every product of the item store of a marketplace as a Merchant Center feed.
+
+    Blocking: the MCP tool runs it in a worker thread. No API call is made
+    and no PA-API credentials are needed: the products are the ones the
+    searches and lookups already fetched, read straight from the store file.
+
+    Args:
+        feed_name (str): Name of the feed (used for the file names and the RSS title).
+        format (str): "csv", "tsv" or "xml" (RSS 2.0).
+        compress (bool): If True, the files are gzipped.
+        marketplace (str, optional): Marketplace whose item store is exported (default is the server default).
+        only_with_ean (bool): If True, products without EAN (gtin) are skipped.
+        max_offers_age (float, optional): Skip products whose price is older than this many seconds (None for all).
+        max_file_rows (int): Rows per file before a new part starts (0 for no limit).
+        max_file_bytes (int): Uncompressed bytes per file before a new part starts.
+        feed_dir (str, optional): Directory where the files are written (default is MERCHANT_FEED_DIR or data/feeds).
+        item_store (ItemStore, optional): Store to export (default is the store file of the marketplace, opened for the export).
+
+    Returns:
+        Dict: Summary: files (path, rows, bytes uncompressed, file_bytes on disk), rows, skipped by reason.
+
+    Raises:
+        ValueError: If the format is unknown or the item store is disabled.
+    """
+    from libs.amazon.lib_amazon import AmazonPAAPI
+
+    format = (format or "csv").lower()
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}.")
+    marketplace = AmazonPAAPI.resolve_marketplace(marketplace)
+    owns_store = item_store is None
+    if owns_store:
+        path = AmazonPAAPI.item_store_path(marketplace)
+        if path is None:
+            raise ValueError("The item store is disabled (AMAZON_ITEM_STORE_PATH is off): there is nothing to export.")
+        item_store = ItemStore(path)
+    try:
+        return _export_store(
+            item_store, marketplace, feed_name, format, compress, only_with_ean,
+            max_offers_age, max_file_rows, max_file_bytes, feed_directory(feed_dir)
+        )
+    finally:
+        if owns_store:
+            item_store.close()
+
+
+def _export_store(
+    item_store: ItemStore,
+    marketplace: str,
+    feed_name: str,
+    format: str,
+    compress: bool,
+    only_with_ean: bool,
+    max_offers_age: Optional[float],
+    max_file_rows: int,
+    max_file_bytes: int,
+    feed_dir: str
+) -> Dict[str, Any]:
+    """Write the feed files of `export_feed` from an open item store."""
+    currency = MARKETPLACE_CURRENCIES.get(marketplace, "EUR")
+    if format == 'xml':
+        feed_format = RssFeedFormat(MERCHANT_FEED_COLUMNS, site_url=marketplace_site_url(marketplace))
+    else:
+        feed_format = FEED_FORMATS[format](MERCHANT_FEED_COLUMNS)
+    os.makedirs(feed_dir, exist_ok=True)
+    base_path = os.path.join(feed_dir, re.sub(r'[^A-Za-z0-9_-]', '_', feed_name) or "feed")
+    writer = SplitFeedWriter(base_path, feed_format, feed_name, compress, max_file_bytes, max_file_rows)
+    skipped: Dict[str, int] = {}
+    rows = 0
+    try:
+        for row in merchant_rows(stored_products(item_store, marketplace, max_offers_age), currency, only_with_ean, skipped):
+            writer.write(feed_format.row(row))
+            rows += 1
+        files = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    _remove_stale_parts(base_path, feed_format.extension, compress, len(files))
+
+    logger.info("Exported %d products of %s to %d %s files.", rows, marketplace, len(files), format)
+    return {
+        'marketplace': marketplace,
+        'format': format,
+        'compressed': compress,
+        'files': files,
+        'rows': rows,
+        'skipped': skipped,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point (amazon-feed-export)."""
+    parser = argparse.ArgumentParser(
+        description="Export every product of the Amazon item store as a Google Merchant Center feed."
+    )
+    parser.add_argument("feed_name", help="feed name, used for the file names")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="feed format (default: csv)")
+    parser.add_argument("--gzip", action="store_true", help="gzip the feed files")
+    parser.add_argument("--marketplace", default=None, help="marketplace code, e.g. ES or DE (default: server default)")
+    parser.add_argument("--include-without-ean", action="store_true", help="also export products without EAN")
+    parser.add_argument("--max-offers-age-hours", type=float, default=DEFAULT_MAX_OFFERS_AGE / 3600,
+                        help="skip products whose price is older (0 exports every product; default: 24)")
+    parser.add_argument("--max-file-rows", type=int, default=0, help="rows per file (default: no limit)")
+    parser.add_argument("--max-file-bytes", type=int, default=MERCHANT_MAX_FILE_BYTES,
+                        help="uncompressed bytes per file (default: the 4 GB Merchant Center limit)")
+    parser.add_argument("--feed-dir", default=None,
+                        help="output directory (default: MERCHANT_FEED_DIR, else data/feeds)")
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(os.path.join(project_root, '.env'))
+    except ImportError:
+        pass
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(levelname)s %(name)s: %(message)s")
+
+    summary = export_feed(
+        feed_name=args.feed_name,
+        format=args.format,
+        compress=args.gzip,
+        marketplace=args.marketplace,
+        only_with_ean=not args.include_without_ean,
+        max_offers_age=args.max_offers_age_hours * 3600 or None,
+        max_file_rows=args.max_file_rows,
+        max_file_bytes=args.max_file_bytes,
+        # Resolved after load_dotenv, so MERCHANT_FEED_DIR can come from .env
+        feed_dir=feed_directory(args.feed_dir)
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+import os
+import re
+import sys
+import csv
+import json
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(project_root)
+
+from libs.amazon import AmazonPAAPI
+from libs.amazon.models import ProductRecord, ResourceProfile, SearchSpec
+from libs.amazon.price_refresh import IN_STOCK, OfferSnapshot, offer_prices, price_refresher
+from tools.amazon.tool_amazon_search_items import search_pretty_items
+
+# Feeds are written under the data volume so they survive container restarts
+DEFAULT_FEED_DIR = os.path.join(project_root, "data", "feeds")
+
+
+def feed_directory(feed_dir: Optional[str] = None) -> str:
+    """
+    Directory where feeds are written: `feed_dir`, else MERCHANT_FEED_DIR, else DEFAULT_FEED_DIR.
+
+    Read on each call, not at import time, so a .env loaded afterwards (e.g. by a CLI) is honoured.
+    """
+    return feed_dir or os.getenv('MERCHANT_FEED_DIR') or DEFAULT_FEED_DIR
+
+# Google Merchant Center product data specification (subset we can fill from PA-API)
+MERCHANT_FEED_COLUMNS = [
+    'id',
+    'title',
+    'description',
+    'link',
+    'image_link',
+    'availability',
+    'price',
+    'sale_price',
+    'brand',
+    'gtin',
+    'condition',
+    'product_type',
+]
+
+# Currency of the prices of each marketplace (the rest use euros)
+MARKETPLACE_CURRENCIES = {
+    'AE': "AED", 'AU': "AUD", 'BR': "BRL", 'CA': "CAD", 'IN': "INR", 'JP': "JPY", 'MX': "MXN",
+    'PL': "PLN", 'SA': "SAR", 'SE': "SEK", 'SG': "SGD", 'TR': "TRY", 'UK': "GBP", 'US': "USD",
+}
+
+MERCHANT_TITLE_MAX_LENGTH = 150
+MERCHANT_DESCRIPTION_MAX_LENGTH = 5000
+
+
+def _format_price(amount: Optional[float], currency: str = "EUR") -> str:
+    return f"{amount:.2f} {currency}" if amount else ""
+
+
+def item_to_merchant_row(pretty_item: ProductRecord, currency: str = "EUR") -> Optional[Dict[str, str]]:
+    """
+    Converts a ProductRecord into a Google Merchant Center feed row.
+
+    Args:
+        pretty_item (ProductRecord): The product to convert.
+        currency (str): ISO 4217 currency of the prices.
+
+    Returns:
+        Dict[str, str]: The feed row, or None when the product lacks a required field (price).
+    """
+    if not pretty_item.price:
+        return None
+
+    # With a saving basis the original price is the regular price and the current one the sale price
+    price, sale_price = offer_prices(pretty_item.price, pretty_item.old_price)
+
+    description = (pretty_item.description or pretty_item.title).replace(" ||| ", ". ")
+    return {
+        'id': pretty_item.asin,
+        'title': pretty_item.title[:MERCHANT_TITLE_MAX_LENGTH],
+        'description': description[:MERCHANT_DESCRIPTION_MAX_LENGTH],
+        'link': pretty_item.affiliate_link or "",
+        'image_link': pretty_item.image_url or "",
+        'availability': IN_STOCK,
+        'price': _format_price(price, currency),
+        'sale_price': _format_price(sale_price, currency),
+        'brand': pretty_item.brand or "",
+        'gtin': pretty_item.eans[0] if pretty_item.eans else "",
+        'condition': "new",
+        'product_type': " > ".join(name for name, _ in pretty_item.categories),
+    }
+
+
+def _feed_paths(feed_name: str, feed_dir: str) -> Tuple[str, str]:
+    safe_name = re.sub(r'[^A-Za-z0-9_-]', '_', feed_name) or "feed"
+    return (
+        os.path.join(feed_dir, f"{safe_name}.csv"),
+        os.path.join(feed_dir, f"{safe_name}.checkpoint.json"),
+    )
+
+
+def _spec_key(spec: SearchSpec) -> str:
+    return json.dumps([
+        spec.keywords, spec.search_index, spec.sort_by, spec.min_price,
+        spec.max_price, spec.item_count, spec.browse_node_id, spec.availability
+    ])
+
+
+def _load_feed_state(csv_path: str, checkpoint_path: str) -> Tuple[Set[str], Set[str], int, Set[str]]:
+    """Rebuild the already written ids/GTINs from the CSV and the completed specs from the checkpoint."""
+    seen_ids: Set[str] = set()
+    seen_gtins: Set[str] = set()
+    rows = 0
+    if os.path.exists(csv_path):
+        with open(csv_path, newline='', encoding='utf-8') as feed_file:
+            for row in csv.DictReader(feed_file):
+                rows += 1
+                seen_ids.add(row['id'])
+                if row.get('gtin'):
+                    seen_gtins.add(row['gtin'])
+    completed_specs: Set[str] = set()
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding='utf-8') as checkpoint_file:
+            completed_specs = set(json.load(checkpoint_file).get('completed_specs', []))
+    return seen_ids, seen_gtins, rows, completed_specs
+
+
+def _remove_feed(csv_path: str, checkpoint_path: str) -> None:
+    for path in (csv_path, checkpoint_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _open_feed(csv_path: str) -> Tuple[TextIO, csv.DictWriter]:
+    """Open the CSV for appending, writing the header if the file is new or empty."""
+    write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    feed_file = open(csv_path, 'a', newline='', encoding='utf-8')
+    writer = csv.DictWriter(feed_file, fieldnames=MERCHANT_FEED_COLUMNS)
+    if write_header:
+        writer.writeheader()
+    return feed_file, writer
+
+
+def _append_window(
+    feed_file: TextIO,
+    writer: csv.DictWriter,
+    rows: List[Dict[str, str]],
+    checkpoint_path: str,
+    checkpoint: Dict[str, Any]
+) -> None:
+    """Append the rows of a window, sync them to disk and then record the checkpoint."""
+    writer.writerows(rows)
+    feed_file.flush()
+    os.fsync(feed_file.fileno())
+    _write_checkpoint(checkpoint_path, checkpoint)
+
+
+def _write_checkpoint(checkpoint_path: str, data: Dict[str, Any]) -> None:
+    """Atomically replace the checkpoint file."""
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as checkpoint_file:
+        json.dump(data, checkpoint_file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, checkpoint_path)
+
+
+async def build_merchant_feed(
+    feed_name: str,
+    specs: List[SearchSpec],
+    target_count: int = 200,
+    only_with_ean: bool = True,
+    restart: bool = False,
+    concurrency: int = 4,
+    feed_dir: Optional[str] = None,
+    marketplace: Optional[str] = None,
+    track_prices: bool = True
+) -> Dict[str, Any]:
+    """
+    Runs a whole campaign and writes a Google Merchant Center CSV feed on disk.
+
+    Searches are run `concurrency` at a time and their rows appended in spec order. After
+    each window of searches the CSV is flushed and a checkpoint records the completed
+    searches, so a failed run resumes where it stopped: completed searches are skipped and
+    products already in the feed (by id or GTIN) are not written twice. A search cut short
+    by target_count is not completed, so a later run with a higher target goes on with it.
+    File work runs in worker threads, so the fsync of a window does not stall other tool calls.
+
+    Written rows are tracked by the price refresher under the feed name, with
+    the offer they were published with, so `tool_amazon_price_refresh` can
+    later report just the rows whose price or availability changed.
+
+    Args:
+        feed_name (str): Name of the feed (used for the CSV and checkpoint file names).
+        specs (List[SearchSpec]): Searches of the campaign.
+        target_count (int): Number of products wanted in the feed.
+        only_with_ean (bool): If True, products without EAN (gtin) are not added.
+        restart (bool): If True, the existing feed and checkpoint are discarded.
+        concurrency (int): Number of searches run at the same time.
+        feed_dir (str, optional): Directory where the feed is written (default is MERCHANT_FEED_DIR or data/feeds).
+        marketplace (str, optional): Marketplace of the whole feed (links and prices are per
+            marketplace), e.g. "DE". Default is the server default marketplace.
+        track_prices (bool): If True, written rows are tracked for price refreshes.
+
+    Returns:
+        Dict: Summary of the run (no product data).
+    """
+    marketplace = AmazonPAAPI.resolve_marketplace(marketplace)
+    currency = MARKETPLACE_CURRENCIES.get(marketplace, "EUR")
+    feed_dir = feed_directory(feed_dir)
+    os.makedirs(feed_dir, exist_ok=True)
+    csv_path, checkpoint_path = _feed_paths(feed_name, feed_dir)
+    track_prices = track_prices and price_refresher.enabled
+    if restart:
+        await asyncio.to_thread(_remove_feed, csv_path, checkpoint_path)
+        if track_prices:
+            try:
+                await asyncio.to_thread(price_refresher.untrack, feed_name, marketplace)
+            except Exception as e:
+                logger.warning("Price tracking of feed %s failed: %s", feed_name, e)
+
+    seen_ids, seen_gtins, total_rows, completed_specs = await asyncio.to_thread(
+        _load_feed_state, csv_path, checkpoint_path
+    )
+    rows_at_start = total_rows
+    failed_specs: List[Dict[str, str]] = []
+    pending = [spec for spec in specs if _spec_key(spec) not in completed_specs]
+
+    feed_file, writer = await asyncio.to_thread(_open_feed, csv_path)
+    with feed_file:
+        for start in range(0, len(pending), max(1, concurrency)):
+            if total_rows >= target_count:
+                break
+            window = pending[start:start + max(1, concurrency)]
+            window_rows: List[Dict[str, str]] = []
+            published: List[Tuple[str, OfferSnapshot]] = []
+            results = await asyncio.gather(
+                *(
+                    search_pretty_items(
+                        keywords=spec.keywords,
+                        item_count=spec.item_count,
+                        search_index=spec.search_index,
+                        sort_by=spec.sort_by,
+                        min_price=spec.min_price,
+                        max_price=spec.max_price,
+                        only_with_ean=only_with_ean,
+                        browse_node_id=spec.browse_node_id,
+                        availability=spec.availability,
+                        resources=ResourceProfile.FEED,
+                        marketplace=marketplace
+                    )
+                    for spec in window
+                ),
+                return_exceptions=True
+            )
+
+            for spec, result in zip(window, results):
+                if isinstance(result, BaseException):
+                    logger.error("Feed search '%s' failed: %s", spec.keywords, result)
+                    failed_specs.append({
+                        'keywords': spec.keywords,
+                        'error': str(result),
+                        'retryable': getattr(result, 'retryable', False)
+                    })
+                    continue
+                exhausted = True
+                for pretty_item in result:
+                    if total_rows >= target_count:
+                        exhausted = False
+                        break
+                    row = item_to_merchant_row(pretty_item, currency)
+                    if row is None or row['id'] in seen_ids or (row['gtin'] and row['gtin'] in seen_gtins):
+                        continue
+                    window_rows.append(row)
+                    published.append((
+                        row['id'], OfferSnapshot(*offer_prices(pretty_item.price, pretty_item.old_price), IN_STOCK)
+                    ))
+                    seen_ids.add(row['id'])
+                    if row['gtin']:
+                        seen_gtins.add(row['gtin'])
+                    total_rows += 1
+                # Cut short by the target: its remaining products are still to be used
+                if exhausted:
+                    completed_specs.add(_spec_key(spec))
+
+            await asyncio.to_thread(_append_window, feed_file, writer, window_rows, checkpoint_path, {
+                'feed_name': feed_name,
+                'marketplace': marketplace,
+                'target_count': target_count,
+                'rows': total_rows,
+                'completed_specs': sorted(completed_specs),
+            })
+            if track_prices and published:
+                try:
+                    await asyncio.to_thread(price_refresher.track, feed_name, marketplace, published)
+                except Exception as e:
+                    logger.warning("Price tracking of feed %s failed: %s", feed_name, e)
+
+    return {
+        'feed_path': csv_path,
+        'marketplace': marketplace,
+        'rows_written': total_rows - rows_at_start,
+        'total_rows': total_rows,
+        'target_count': target_count,
+        'target_reached': total_rows >= target_count,
+        'searches_completed': sum(1 for spec in specs if _spec_key(spec) in completed_specs),
+        'searches_pending': sum(1 for spec in specs if _spec_key(spec) not in completed_specs),
+        'failed_searches': failed_specs,
+        'price_tracking': track_prices,
+    }
@@ -0,0 +1,108 @@
+import os
+import sys
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(project_root)
+
+from libs.amazon import AmazonPAAPI
+from libs.amazon.price_refresh import price_refresher
+from tools.amazon.tool_amazon_merchant_feed import MARKETPLACE_CURRENCIES, _format_price
+
+# Columns of a Merchant Center supplemental feed that updates the offers of a published feed
+PRICE_UPDATE_COLUMNS = ['id', 'price', 'sale_price', 'availability']
+
+PRICE_REFRESH_ACTIONS = ("refresh", "changes", "track", "untrack", "list")
+
+
+def change_to_update_row(change: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts a recorded offer change into a supplemental feed row.
+
+    Args:
+        change (Dict): A change of PriceRefresher.changes or PriceRefresher.refresh.
+
+    Returns:
+        Dict: id, price, sale_price and availability (Merchant formats), plus the marketplace
+        and the names of the fields that changed.
+    """
+    currency = MARKETPLACE_CURRENCIES.get(change['marketplace'], "EUR")
+    return {
+        'id': change['asin'],
+        'price': _format_price(change['price'], currency),
+        'sale_price': _format_price(change['sale_price'], currency),
+        'availability': change['availability'],
+        'marketplace': change['marketplace'],
+        'changed': change['changed'],
+    }
+
+
+async def price_refresh(
+    action: str = "refresh",
+    feed: Optional[str] = None,
+    asins: Optional[List[str]] = None,
+    marketplace: Optional[str] = None,
+    since: int = 0,
+    force: bool = False,
+    limit: int = 500
+) -> Dict[str, Any]:
+    """
+    Tracks products and reports the ones whose offer changed.
+
+    Args:
+        action (str): "refresh" (poll the products due now and return their changes),
+            "changes" (page through the recorded changes from `since`), "track",
+            "untrack" (`asins`, or the whole feed without them) or "list" (tracked feeds).
+        feed (str, optional): Feed name; required for track and untrack, a filter otherwise.
+        asins (List[str], optional): ASINs to track or untrack.
+        marketplace (str, optional): Marketplace code; track and untrack default to the
+            server default marketplace, the rest cover every marketplace.
+        since (int): Cursor of the last change already read (only for "changes").
+        force (bool): Poll every tracked product, due or not (only for "refresh").
+        limit (int): Products polled per marketplace ("refresh") or changes returned ("changes").
+
+    Returns:
+        Dict: The result of the action (see tool_amazon_price_refresh).
+    """
+    if action not in PRICE_REFRESH_ACTIONS:
+        raise ValueError(f"Action must be one of: {', '.join(PRICE_REFRESH_ACTIONS)}.")
+    if not price_refresher.enabled:
+        raise ValueError("Price refresh is disabled on this server (AMAZON_PRICE_REFRESH_PATH is off).")
+    if action in ("track", "untrack") and not feed:
+        raise ValueError(f"A feed name is required for {action}.")
+    limit = max(1, min(int(limit), 5000))
+    if marketplace or action in ("track", "untrack"):
+        marketplace = AmazonPAAPI.resolve_marketplace(marketplace)
+
+    result: Dict[str, Any] = {}
+    if action == "track":
+        valid_asins, invalid_asins = AmazonPAAPI.split_asins(asins or [])
+        result['tracked'] = await asyncio.to_thread(price_refresher.track, feed, marketplace, valid_asins)
+        result['invalid_asins'] = invalid_asins
+    elif action == "untrack":
+        valid_asins = AmazonPAAPI.split_asins(asins)[0] if asins else None
+        result['untracked'] = await asyncio.to_thread(price_refresher.untrack, feed, marketplace, valid_asins)
+    elif action == "refresh":
+        refreshed = await price_refresher.refresh_async(marketplace=marketplace, feed=feed, force=force, limit=limit)
+        result['polled'] = refreshed['polled']
+        result['failed'] = refreshed['failed']
+        result['changes'] = [change_to_update_row(change) for change in refreshed['changes']]
+        logger.info(
+            "Price refresh polled %d products: %d changed, %d failed.",
+            refreshed['polled'], len(result['changes']), refreshed['failed']
+        )
+        return result
+    elif action == "changes":
+        changes, cursor = await asyncio.to_thread(price_refresher.changes, feed, marketplace, since, limit)
+        result['changes'] = [change_to_update_row(change) for change in changes]
+        result['cursor'] = cursor
+        return result
+
+    feeds = await asyncio.to_thread(price_refresher.feeds)
+    result['feeds'] = [summary for summary in feeds if not feed or summary['feed'] == feed]
+    return result
@@ -1,29 +1,36 @@
 import os
 import sys
 import json
+import asyncio
+import math
 import logging
+from contextlib import aclosing
 
-# Configure logging to stderr at module level
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=sys.stderr,
-    force=True
-)
 logger = logging.getLogger(__name__)
 
 # Add the project root directory to the Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 sys.path.append(project_root)
 
-from amazon_paapi.models.item_result import ApiBrowseNodeInfo
+from typing import List, Optional
+from amazon_paapi.models import SortBy, Availability
+from amazon_paapi.models.item_result import ApiBrowseNodeInfo, Item
+from libs.amazon import AmazonAPISingleton
+from libs.amazon.extractor import extract_category_path, extract_item, extract_items
+from libs.amazon.metrics import metrics
+from libs.amazon.seen_registry import parse_campaigns, record_keys, seen_registry
 from libs.amazon.models import (
+    AmazonProductPrettyResponse,
+    ProductRecord,
+    ResourceProfile,
+    SearchIndex,
     PrettyCategoriesListModel,
     PrettyCategoryModel
 )
-# from agno.tools import tool
-# from utils.logger_hook import logger_hook
-  
+
+# Where search results come from: Amazon, the local product index, or the index first and Amazon for the rest
+SEARCH_SOURCES = ("amazon", "local", "hybrid")
+
 
 def extract_categories(browse_nodes_info: ApiBrowseNodeInfo) -> PrettyCategoriesListModel:
     """
@@ -35,28 +42,175 @@ def extract_categories(browse_nodes_info: ApiBrowseNodeInfo) -> PrettyCategories
     Returns:
         PrettyCategoriesListModel: A model containing the extracted categories.
     """
-    if (browse_nodes_info
-        and browse_nodes_info.browse_nodes
-        and len(browse_nodes_info.browse_nodes) > 0
-        and browse_nodes_info.browse_nodes[0]
-    ):
-        setted_names = set()
-        categories = []
-        current_node = browse_nodes_info.browse_nodes[0]
-        actual_ancestor = current_node.ancestor
-
-        while actual_ancestor:
-            name = actual_ancestor.context_free_name
-            if name not in setted_names:       # evita duplicados
-                categories.append(PrettyCategoryModel(
-                    name=name,
-                    id=actual_ancestor.id
-                ))
-                setted_names.add(name)
-            actual_ancestor = actual_ancestor.ancestor      # sube un nivel
-    
-    categories.reverse() # Reverses the order to have the root category first
-    return PrettyCategoriesListModel(categories=categories)
+    return PrettyCategoriesListModel(categories=[
+        PrettyCategoryModel(name=name, id=node_id)
+        for name, node_id in extract_category_path(browse_nodes_info)
+    ])
+
+def item_to_pretty_response(item: Item) -> AmazonProductPrettyResponse:
+    """
+    Converts a PA-API Item into an AmazonProductPrettyResponse.
+
+    Batches of items should go through libs.amazon.extractor.extract_items instead.
+
+    Args:
+        item (Item): The item returned by SearchItems or GetItems.
+
+    Returns:
+        AmazonProductPrettyResponse: The pretty product with prices, brand, EANs and categories.
+    """
+    return extract_item(item).to_pretty()
+
+async def search_pretty_items(
+    keywords: str,
+    item_count: int = 10,
+    search_index: str = SearchIndex.ALL,
+    sort_by: str = SortBy.RELEVANCE,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    only_with_ean: bool = True,
+    browse_node_id: Optional[str] = None,
+    availability: str = Availability.AVAILABLE,
+    resources: ResourceProfile = ResourceProfile.DISCOVERY,
+    marketplace: Optional[str] = None,
+    source: str = "amazon",
+    exclude_seen: Optional[str] = None
+) -> List[ProductRecord]:
+    """
+    Searches Amazon and converts the results into ProductRecord items.
+
+    Shared by the search tools of the MCP server. Result pages (10 items each) are
+    requested lazily until `item_count` items pass the filters, so asking for 10 items
+    with only_with_ean=True returns 10 items whenever Amazon has them, and item_count
+    can go above 10. Errors are raised to the caller.
+
+    Every product Amazon returns is added to the local product index. With
+    source="local" the products come only from that index (no API call); with
+    source="hybrid" the index is searched first and Amazon is only asked for
+    the products still missing.
+
+    Args:
+        keywords (str): Keywords to search for.
+        item_count (int): Number of items to return (1-100).
+        search_index (str): The category to search in.
+        sort_by (str): Sorting criteria for the results.
+        min_price (int, optional): Minimum price filter in euros.
+        max_price (int, optional): Maximum price filter in euros.
+        only_with_ean (bool): If True, items without EANs are dropped.
+        browse_node_id (str, optional): Specific browse node ID to filter results.
+        availability (str): Filter for item availability.
+        resources (ResourceProfile): PA-API resources to request (default is the discovery profile).
+        marketplace (str, optional): Marketplace code, e.g. "DE" (default is the server default marketplace).
+        source (str): "amazon" (default), "local" or "hybrid".
+        exclude_seen (str, optional): Campaign name(s), comma separated. Products already used in
+            any of them are skipped (more pages are requested to make up for them) and the products
+            returned are recorded as used in the first one.
+
+    Returns:
+        List[ProductRecord]: The products found.
+    """
+    # Validate the search index
+    if not keywords:
+        raise ValueError("Keywords must not be empty.")
+    if source not in SEARCH_SOURCES:
+        raise ValueError(f"Source must be one of: {', '.join(SEARCH_SOURCES)}.")
+    local_filters = dict(
+        search_index=search_index,
+        browse_node_id=browse_node_id,
+        min_price=min_price,
+        max_price=max_price,
+        only_with_ean=only_with_ean,
+        sort_by=sort_by
+    )
+    if min_price:
+        min_price = int(min_price)*100  # Convert to cents
+    if max_price:
+        max_price = int(max_price)*100  # Convert to cents
+    if min_price and max_price and min_price > max_price:
+        raise ValueError("Minimum price cannot be greater than maximum price.")
+
+    client = AmazonAPISingleton(marketplace)
+    item_count = max(1, min(int(item_count), client.SEARCH_PAGE_SIZE * client.SEARCH_MAX_PAGES))
+    # Without filtering (or local results to skip) every page is fully used, so we know how many pages we need
+    if only_with_ean or source == "hybrid" or exclude_seen:
+        max_pages = client.SEARCH_MAX_PAGES
+    else:
+        max_pages = math.ceil(item_count / client.SEARCH_PAGE_SIZE)
+
+    pretty_response: List[ProductRecord] = []
+    seen_asins = set()
+    # Products used before in the excluded campaigns are skipped; the ones returned are marked as used
+    exclude_campaigns = parse_campaigns(exclude_seen)
+    used_keys = set()
+    if exclude_campaigns:
+        await asyncio.to_thread(seen_registry.load, exclude_campaigns)
+
+    def is_fresh(record: ProductRecord) -> bool:
+        if not exclude_campaigns:
+            return True
+        keys = record_keys(record)
+        if used_keys.intersection(keys) or seen_registry.contains(exclude_campaigns, keys):
+            return False
+        used_keys.update(keys)
+        return True
+
+    if source != "amazon":
+        # Ask for more local matches when some of them may be excluded
+        local_limit = item_count * 3 if exclude_campaigns else item_count
+        local_records = await client.search_local_async(keywords, limit=local_limit, **local_filters)
+        seen_asins.update(record.asin for record in local_records)
+        pretty_response = [record for record in local_records if is_fresh(record)][:item_count]
+        if len(pretty_response) >= item_count:
+            result = 'hit'
+        else:
+            result = 'partial' if pretty_response else 'miss'
+        metrics.inc('amazon_local_search_total', source=source, result=result)
+        logger.info("Local index returned %d of %d items for '%s'.", len(pretty_response), item_count, keywords)
+        if source == "local" or result == 'hit':
+            return await _mark_used(exclude_campaigns, pretty_response)
+
+    pages = client.iter_search_pages_async(
+        keywords=keywords,
+        max_pages=max_pages,
+        search_index=search_index,
+        sort_by=sort_by,
+        min_price=min_price,
+        max_price=max_price,
+        browse_node_id=browse_node_id,
+        availability=availability,
+        resources=resources
+    )
+    async with aclosing(pages):
+        async for page in pages:
+            new_items = []
+            for item in page.items:
+                if item.asin not in seen_asins:
+                    seen_asins.add(item.asin)
+                    new_items.append(item)
+            with metrics.timer('amazon_transform_seconds', source='search'):
+                records = extract_items(new_items, client.marketplace)
+            await client.index_products_async(records, search_index=search_index, browse_node_id=browse_node_id)
+            for pretty_item in records:
+                if only_with_ean and len(pretty_item.eans) == 0:
+                    logger.info("Skipping item (ASIN: %s) due to no EANs.", pretty_item.asin)
+                    metrics.inc('amazon_items_dropped_total', reason='no_ean', source='search')
+                    continue
+                if not is_fresh(pretty_item):
+                    logger.info("Skipping item (ASIN: %s) already used in %s.", pretty_item.asin, exclude_campaigns)
+                    metrics.inc('amazon_items_dropped_total', reason='seen', source='search')
+                    continue
+                pretty_response.append(pretty_item)
+                if len(pretty_response) >= item_count:
+                    break
+            if len(pretty_response) >= item_count:
+                break
+    return await _mark_used(exclude_campaigns, pretty_response)
+
+async def _mark_used(campaigns: List[str], records: List[ProductRecord]) -> List[ProductRecord]:
+    """Record the returned products as used in the first (active) campaign."""
+    if campaigns and records:
+        await asyncio.to_thread(seen_registry.mark, campaigns[0], records)
+    return records
 
 # if __name__ == "__main__":
 #     # Example usage of the tool
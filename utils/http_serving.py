@@ -0,0 +1,58 @@
+"""
+uvicorn server with a drain phase for the MCP HTTP transports.
+
+The MCP streams (SSE and streamable HTTP) close as soon as uvicorn receives
+SIGINT/SIGTERM, which would cut the tool calls still running. This server
+runs a drain coroutine first (stop admitting tool calls, wait for the ones in
+flight) and only then starts uvicorn's own shutdown. A second signal skips
+the drain.
+"""
+
+import asyncio
+import logging
+from types import FrameType
+from typing import Any, Awaitable, Callable, Optional
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn server that awaits `drain()` before shutting down.
+
+    Args:
+        config (uvicorn.Config): Server configuration.
+        drain (Callable[[], Awaitable[None]]): Coroutine function run on the first shutdown signal.
+    """
+
+    def __init__(self, config: uvicorn.Config, drain: Callable[[], Awaitable[None]]):
+        super().__init__(config)
+        self.drain = drain
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._draining = False
+        self._drain_task: Optional[asyncio.Task] = None
+
+    async def serve(self, *args: Any, **kwargs: Any) -> None:
+        self._loop = asyncio.get_running_loop()
+        await super().serve(*args, **kwargs)
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        if self._draining or self._loop is None:
+            super().handle_exit(sig, frame)
+            return
+        self._draining = True
+        logger.warning("Shutdown requested: draining the tool calls in flight")
+        # Signal handlers run between bytecodes of the loop thread: hand over to the loop
+        self._loop.call_soon_threadsafe(self._start_drain, sig, frame)
+
+    def _start_drain(self, sig: int, frame: Optional[FrameType]) -> None:
+        self._drain_task = asyncio.create_task(self._drain_then_exit(sig, frame))
+
+    async def _drain_then_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        try:
+            await self.drain()
+        except Exception as e:
+            logger.error("Drain before shutdown failed: %s", e)
+        super().handle_exit(sig, frame)
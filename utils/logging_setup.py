@@ -0,0 +1,191 @@
+"""
+Process-wide logging setup for the MCP server.
+
+One configuration for every module: records go through a bounded in-memory
+queue and are formatted and written to stderr by a background thread, so
+logging I/O and message formatting stay off the request path. Records are
+emitted as one JSON object per line, long fields are truncated and chatty
+INFO/DEBUG messages are sampled.
+
+stdout is never used: it carries the MCP stdio protocol.
+
+Environment:
+    LOG_LEVEL: Root log level (default ERROR, as the server always used).
+    LOG_FORMAT: "json" (default) or "text".
+    LOG_MAX_FIELD_CHARS: Maximum length of the message and each extra field (default 2000).
+    LOG_SAMPLE_PER_SECOND: INFO/DEBUG records allowed per second for each message template (default 20, 0 disables sampling).
+    LOG_QUEUE_SIZE: Maximum queued records before new ones are dropped (default 10000).
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_LOG_LEVEL = "ERROR"
+DEFAULT_MAX_FIELD_CHARS = 2000
+DEFAULT_SAMPLE_PER_SECOND = 20
+DEFAULT_QUEUE_SIZE = 10000
+
+# Loggers that are too verbose below WARNING
+NOISY_LOGGERS = ('urllib3', 'httpx', 'httpcore', 'amazon_paapi', 'mcp.server.lowlevel')
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def truncate(value: str, max_chars: int) -> str:
+    """Cut a string to `max_chars`, noting how much was left out."""
+    if max_chars <= 0 or len(value) <= max_chars:
+        return value
+    return f"{value[:max_chars]}...(+{len(value) - max_chars} chars)"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON line, truncating the message and the extra fields.
+
+    Args:
+        max_field_chars (int): Maximum length of the message and of each extra field.
+    """
+
+    def __init__(self, max_field_chars: int = DEFAULT_MAX_FIELD_CHARS):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def _field(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        return truncate(value, self.max_field_chars)
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': truncate(record.getMessage(), self.max_field_chars),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = self._field(value)
+        if record.exc_info:
+            entry['exc'] = truncate(self.formatException(record.exc_info), self.max_field_chars * 4)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through at most `per_second` INFO/DEBUG records per message template
+    and second. WARNING and above always pass. The number of records left out
+    is added to the next record of the same template as `sampled_out`.
+    """
+
+    def __init__(self, per_second: int = DEFAULT_SAMPLE_PER_SECOND):
+        super().__init__()
+        self.per_second = per_second
+        self._windows: Dict[Tuple[str, Any], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_second <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        second = int(time.monotonic())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != second:
+                suppressed = window[2] if window else 0
+                if len(self._windows) > 10000:
+                    self._windows.clear()  # Templates built with f-strings never repeat
+                self._windows[key] = [second, 1, 0]
+                if suppressed:
+                    record.sampled_out = suppressed
+                return True
+            if window[1] < self.per_second:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller and defers formatting to the listener.
+
+    The record is queued as is (the message is built by the listener thread),
+    and when the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same process: no need to format or strip the record for pickling
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.dropped:
+            record.dropped_before = self.dropped
+        try:
+            self.queue.put_nowait(record)
+            self.dropped = 0
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """
+    Configure the root logger once for the whole process (later calls only change the level).
+
+    Args:
+        level (str, optional): Log level; LOG_LEVEL or ERROR when not given.
+    """
+    global _listener
+    level = (level or os.getenv('LOG_LEVEL') or DEFAULT_LOG_LEVEL).upper()
+    root = logging.getLogger()
+    with _setup_lock:
+        root.setLevel(level)
+        if _listener is not None:
+            return
+
+        if os.getenv('LOG_FORMAT', 'json').lower() == 'text':
+            formatter: logging.Formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        else:
+            formatter = JsonFormatter(int(os.getenv('LOG_MAX_FIELD_CHARS', DEFAULT_MAX_FIELD_CHARS)))
+        stderr_handler = logging.StreamHandler(sys.stderr)
+        stderr_handler.setFormatter(formatter)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)))
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(int(os.getenv('LOG_SAMPLE_PER_SECOND', DEFAULT_SAMPLE_PER_SECOND))))
+
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        for name in NOISY_LOGGERS:
+            logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+
+        _listener = logging.handlers.QueueListener(log_queue, stderr_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush the queued records and stop the writer thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None